@@ -0,0 +1,222 @@
+"""Аутентификация по JWT с кешем пользователей в памяти процесса.
+
+Пользователь ищется по id из токена сначала в LRU-кеше процесса и только
+при промахе — в базе. Запись кеша удаляется после фиксации сохранения
+или удаления пользователя (сигналы в `api.signals`), а в других
+процессах живёт не дольше `USER_CACHE['TIMEOUT']` секунд.
+
+Кеш хранит значения полей, и каждый запрос получает свой экземпляр
+модели: изменения `request.user` в одном запросе не попадают в другие.
+
+При `JWT_ROLE_CLAIMS = True` токен доступа несёт роль пользователя и
+версию его токенов, а `request.user` — это `RoleTokenUser`, которому база
+не нужна вовсе. Смена роли увеличивает версию в базе, и токены со
+старой версией перестают приниматься. Версия проверяется по кешу Django,
+где живёт не дольше `TOKEN_VERSION_CACHE_TIMEOUT` секунд: с кешем в памяти
+процесса это предельная задержка отзыва в других процессах, с общим кешем
+запись сбрасывается после фиксации изменения сразу для всех. Настоящий
+пользователь загружается только там, где он нужен, через `resolve_user`.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .cache import count_event
+
+# Счётчики сбрасываются в метрики процесса пачками, чтобы не брать их
+# блокировку на каждом запросе.
+STATS_FLUSH_EVERY = 100
+EVENTS = ('user-hits', 'user-misses')
+ROLE_CLAIMS = ('role', 'is_staff', 'is_superuser')
+VERSION_CLAIM = 'ver'
+TOKEN_VERSION_KEY = 'api:token-version:{pk}'
+
+User = get_user_model()
+
+
+class UserCache:
+    """Ограниченный по размеру и времени жизни кеш пользователей."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._events = dict.fromkeys(EVENTS, 0)
+
+    @staticmethod
+    def options():
+        return settings.USER_CACHE['MAX_SIZE'], settings.USER_CACHE['TIMEOUT']
+
+    def get(self, model, pk):
+        """Новый экземпляр пользователя из кеша или None."""
+
+        with self._lock:
+            entry = self._entries.get(pk)
+            if entry is not None and entry[0] <= time.monotonic():
+                del self._entries[pk]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(pk)
+        self.count('user-hits' if entry is not None else 'user-misses')
+        if entry is None:
+            return None
+        _, attnames, values = entry
+        return model.from_db(DEFAULT_DB_ALIAS, attnames, values)
+
+    def set(self, user):
+        max_size, timeout = self.options()
+        if not max_size or not timeout:
+            return
+        attnames = [field.attname for field in user._meta.concrete_fields]
+        values = tuple(getattr(user, attname) for attname in attnames)
+        with self._lock:
+            self._entries[user.pk] = (
+                time.monotonic() + timeout, attnames, values
+            )
+            self._entries.move_to_end(user.pk)
+            while len(self._entries) > max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, pk):
+        with self._lock:
+            self._entries.pop(pk, None)
+
+    def clear(self):
+        """Очищает кеш вместе с ещё не сброшенными счётчиками."""
+
+        with self._lock:
+            self._entries.clear()
+            self._events = dict.fromkeys(EVENTS, 0)
+
+    def count(self, event):
+        with self._lock:
+            self._events[event] += 1
+            if sum(self._events.values()) < STATS_FLUSH_EVERY:
+                return
+            events, self._events = self._events, dict.fromkeys(EVENTS, 0)
+        self.flush_events(events)
+
+    def flush_stats(self):
+        with self._lock:
+            events, self._events = self._events, dict.fromkeys(EVENTS, 0)
+        self.flush_events(events)
+
+    @staticmethod
+    def flush_events(events):
+        for event, delta in events.items():
+            if delta:
+                count_event(event, delta)
+
+
+user_cache = UserCache()
+
+
+def access_token_for(user):
+    """Токен доступа; в режиме JWT_ROLE_CLAIMS — с ролью и версией."""
+
+    token = RefreshToken.for_user(user).access_token
+    if settings.JWT_ROLE_CLAIMS:
+        for claim in ROLE_CLAIMS:
+            token[claim] = getattr(user, claim)
+        token[VERSION_CLAIM] = user.token_version
+    return token
+
+
+def get_token_version(pk):
+    """Текущая версия токенов пользователя или None, если его нет.
+
+    Без кеша (TOKEN_VERSION_CACHE_TIMEOUT = 0) версия каждый раз читается
+    из базы.
+    """
+
+    timeout = settings.TOKEN_VERSION_CACHE_TIMEOUT
+    key = TOKEN_VERSION_KEY.format(pk=pk)
+    version = cache.get(key) if timeout else None
+    if version is None:
+        version = User.objects.filter(pk=pk).values_list(
+            'token_version', flat=True
+        ).first()
+        if version is not None and timeout:
+            cache.add(key, version, timeout)
+    return version
+
+
+def forget_token_version(pk):
+    cache.delete(TOKEN_VERSION_KEY.format(pk=pk))
+
+
+class RoleTokenUser(TokenUser):
+    """Пользователь, восстановленный из утверждений токена, без базы."""
+
+    @cached_property
+    def role(self):
+        return self.token.get('role', User.ROLE_USER)
+
+    @property
+    def is_user(self):
+        return self.role == User.ROLE_USER
+
+    @property
+    def is_admin(self):
+        return self.role == User.ROLE_ADMIN
+
+    @property
+    def is_moderator(self):
+        return self.role == User.ROLE_MODERATOR
+
+
+def resolve_user(request):
+    """Заменяет RoleTokenUser в запросе настоящим пользователем."""
+
+    user = request.user
+    if isinstance(user, RoleTokenUser):
+        user = user_cache.get(User, user.pk)
+        if user is None:
+            user = User.objects.get(pk=request.user.pk)
+            user_cache.set(user)
+        request.user = user
+    return user
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication, которая берёт пользователя из кеша процесса.
+
+    Токен с ролью даёт RoleTokenUser, если его версия совпадает с
+    текущей версией токенов пользователя.
+    """
+
+    def get_user(self, validated_token):
+        if settings.JWT_ROLE_CLAIMS and VERSION_CLAIM in validated_token:
+            return self.get_token_user(validated_token)
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is not None:
+            user = user_cache.get(self.user_model, user_id)
+            if user is not None:
+                return user
+        user = super().get_user(validated_token)
+        user_cache.set(user)
+        return user
+
+    def get_token_user(self, validated_token):
+        user = RoleTokenUser(validated_token)
+        version = get_token_version(user.pk)
+        if version is None:
+            raise AuthenticationFailed(
+                'Пользователь не найден.', code='user_not_found'
+            )
+        if version != validated_token[VERSION_CLAIM]:
+            raise AuthenticationFailed(
+                'Токен отозван: права пользователя изменились.',
+                code='token_revoked'
+            )
+        return user
@@ -0,0 +1,94 @@
+"""Кеш ответов списков с версией модели в ключе.
+
+Версия модели берётся из базы — число записей и последнее значение
+`modified` (reviews.versions), — поэтому после записи в любом процессе
+все процессы сразу читают ответы под новым ключом, а старые вытесняются
+бэкендом сами.
+Работает с любым бэкендом Django: locmem, file, memcached.
+
+Счётчики попаданий и промахов хранятся в метриках процесса (api.metrics)
+и складываются по файлам всех процессов.
+"""
+import re
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.http import urlencode
+
+from reviews import versions
+
+from .metrics import labels_key, store
+
+# Хост, путь и параметры запроса входят в ключ хешем: ключ memcached не
+# длиннее 250 символов и без пробелов.
+RESPONSE_KEY = 'api:list:{label}:{version}:{request}'
+NON_DIGIT_RE = re.compile(r'\D')
+EVENTS_METRIC = 'yamdb_cache_events_total'
+# Событие: (кеш, событие) в метках метрики.
+EVENT_LABELS = {
+    'hits': ('list', 'hit'),
+    'misses': ('list', 'miss'),
+    'user-hits': ('user', 'hit'),
+    'user-misses': ('user', 'miss'),
+}
+EVENTS = ('hits', 'misses')
+
+
+def get_versions(*models):
+    """Версии моделей одним запросом: «число записей-последнее изменение».
+
+    Удаление меняет число записей, создание и изменение — `modified`.
+    Время записывается одними цифрами, без пробелов и разделителей.
+    """
+
+    return [
+        f'{count}-{NON_DIGIT_RE.sub("", str(modified))}'
+        for count, modified in versions.get_versions(*models)
+    ]
+
+
+def get_version(model):
+    return get_versions(model)[0]
+
+
+def response_key(model, request):
+    query = urlencode(sorted(request.query_params.lists()), doseq=True)
+    url = f'{request.get_host()}{request.path}?{query}'
+    return RESPONSE_KEY.format(
+        label=model._meta.label_lower,
+        version=get_version(model),
+        request=md5(url.encode()).hexdigest(),
+    )
+
+
+def get_response(key):
+    data = cache.get(key)
+    count_event('hits' if data is not None else 'misses')
+    return data
+
+
+def set_response(key, data):
+    cache.set(key, data, settings.LIST_CACHE_TIMEOUT)
+
+
+def event_labels(event):
+    cache_name, label = EVENT_LABELS[event]
+    return {'cache': cache_name, 'event': label}
+
+
+def count_event(event, delta=1):
+    store.inc(EVENTS_METRIC, event_labels(event), delta)
+    store.maybe_flush()
+
+
+def get_stats(events=EVENTS):
+    """Счётчики событий кеша всех процессов, по умолчанию — для списков."""
+
+    counters, _ = store.collect()
+    return {
+        event: counters.get(
+            (EVENTS_METRIC, labels_key(event_labels(event))), 0
+        )
+        for event in events
+    }
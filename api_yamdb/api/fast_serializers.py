@@ -0,0 +1,268 @@
+"""Быстрая сериализация для чтения: строки values_list() сразу в словари.
+
+`get_fast_serializer(serializer_class)` один раз разбирает поля
+DRF-сериализатора и строит план: какие поля запросить через
+values_list() и как превратить кортеж в словарь ответа. Значения,
+которым нужно преобразование, проходят через to_representation тех же
+полей DRF, поэтому JSON совпадает с ответом обычного сериализатора до
+байта, но без экземпляров моделей и обхода полей для каждой строки.
+
+Поддерживаются поля модели, SlugRelatedField, вложенный сериализатор
+внешнего ключа и вложенный сериализатор связи «ко многим» (many=True) на
+верхнем уровне: её строки загружаются одним запросом на страницу.
+
+Для рендерера с поддержкой фрагментов (api.renderers) вложенные объекты
+из простых полей отдаются готовым JSON: одинаковые категории и жанры
+кодируются один раз на процесс, а не в каждом произведении.
+"""
+import threading
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.db import models
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.relations import SlugRelatedField
+from rest_framework.settings import api_settings
+
+from .renderers import Fragment, encode
+
+_compiled = {}
+_compiled_lock = threading.Lock()
+# Готовые фрагменты по содержимому объекта; при переполнении кеш
+# очищается целиком.
+FRAGMENTS_MAX = 10000
+_fragments = {}
+_fragments_lock = threading.Lock()
+
+# Такие поля DRF отдают значение из базы без изменений.
+PLAIN_FIELDS = (
+    (serializers.CharField, (models.CharField, models.TextField)),
+    (serializers.IntegerField, (models.IntegerField, models.AutoField)),
+)
+
+
+def converter_for(field, model_field):
+    """Преобразование значения из базы или None, если оно не нужно."""
+
+    for field_class, model_field_classes in PLAIN_FIELDS:
+        if (
+            isinstance(field, field_class)
+            and isinstance(model_field, model_field_classes)
+        ):
+            return None
+    if isinstance(field, serializers.DateTimeField):
+        return datetime_converter(field)
+    return field.to_representation
+
+
+def datetime_converter(field):
+    """DateTimeField.to_representation для дат с часовым поясом из базы.
+
+    Повторяет путь DRF для формата ISO 8601 без его проверок на каждое
+    значение; остальные случаи отдаёт самому полю.
+    """
+
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if (
+        output_format is None or output_format.lower() != ISO_8601
+        or hasattr(field, 'timezone') or not settings.USE_TZ
+    ):
+        return field.to_representation
+
+    def convert(value):
+        if not timezone.is_aware(value):
+            return field.to_representation(value)
+        value = value.astimezone(timezone.get_current_timezone()).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+
+    return convert
+
+
+def fragment_for(data):
+    """Fragment с JSON словаря data из простых значений.
+
+    Ключ кеша — имена, типы и значения полей, поэтому изменённый объект
+    получает новый фрагмент, а старый вытесняется при переполнении.
+    """
+
+    key = tuple(
+        (name, value.__class__, value) for name, value in data.items()
+    )
+    fragment = _fragments.get(key)
+    if fragment is None:
+        fragment = Fragment(encode(data))
+        with _fragments_lock:
+            if len(_fragments) >= FRAGMENTS_MAX:
+                _fragments.clear()
+            _fragments[key] = fragment
+    return fragment
+
+
+def is_plain(steps):
+    """Объект только из простых значений, его можно кешировать."""
+
+    return all(kind == 'value' for _, kind, _ in steps)
+
+
+def add_lookup(lookups, lookup):
+    """Номер колонки lookup в строке values_list."""
+
+    if lookup not in lookups:
+        lookups.append(lookup)
+    return lookups.index(lookup)
+
+
+def compile_fields(serializer, model, lookups, prefix=''):
+    """Шаги (ключ, вид, данные) в порядке полей сериализатора.
+
+    Нужные для них поля values_list() добавляются в lookups.
+    """
+
+    steps = []
+    for name, field in serializer.fields.items():
+        if not field.write_only:
+            steps.append(compile_field(name, field, model, lookups, prefix))
+    return steps
+
+
+def compile_field(name, field, model, lookups, prefix):
+    try:
+        if field.source == '*' or '.' in field.source:
+            raise FieldDoesNotExist
+        model_field = model._meta.get_field(field.source)
+    except FieldDoesNotExist:
+        raise ImproperlyConfigured(
+            f'{type(field).__name__} {name}: поле не из модели '
+            f'{model.__name__} не поддерживается.'
+        )
+    lookup = prefix + model_field.name
+    if not model_field.is_relation:
+        return name, 'value', (
+            add_lookup(lookups, lookup), converter_for(field, model_field)
+        )
+    if isinstance(field, SlugRelatedField) and model_field.many_to_one:
+        return name, 'value', (
+            add_lookup(lookups, f'{lookup}__{field.slug_field}'), None
+        )
+    if (
+        isinstance(field, serializers.ListSerializer) and not prefix
+        and (model_field.many_to_many or model_field.one_to_many)
+    ):
+        child_lookups = []
+        child_steps = compile_fields(
+            field.child, model_field.related_model, child_lookups
+        )
+        return name, 'many', (model_field, child_lookups, child_steps)
+    if isinstance(field, serializers.Serializer) and model_field.many_to_one:
+        index = add_lookup(lookups, prefix + model_field.attname)
+        steps = compile_fields(
+            field, model_field.related_model, lookups, f'{lookup}__'
+        )
+        return name, 'nested', (index, steps, is_plain(steps))
+    raise ImproperlyConfigured(
+        f'{type(field).__name__} {name}: связь не поддерживается.'
+    )
+
+
+def build(steps, row, related, pk=None, fragments=False):
+    """Словарь ответа из строки values_list(); pk — ключ строки.
+
+    С fragments простые вложенные объекты заменяются на Fragment.
+    """
+
+    data = {}
+    for name, kind, step in steps:
+        if kind == 'value':
+            index, converter = step
+            value = row[index]
+            if converter is not None and value is not None:
+                value = converter(value)
+            data[name] = value
+        elif kind == 'nested':
+            index, nested_steps, plain = step
+            if row[index] is None:
+                data[name] = None
+                continue
+            value = build(nested_steps, row, related, fragments=fragments)
+            data[name] = fragment_for(value) if fragments and plain else value
+        else:
+            data[name] = related[name].get(pk, [])
+    return data
+
+
+def fetch_many(model_field, lookups, steps, pks, fragments=False):
+    """Связанные строки страницы одним запросом: {pk родителя: [словари]}."""
+
+    if model_field.many_to_many:
+        parent = model_field.related_query_name()
+    else:
+        parent = model_field.field.name
+    # Порядок тот же, что у prefetch: сортировка связанной модели.
+    rows = model_field.related_model._default_manager.filter(
+        **{f'{parent}__in': pks}
+    ).values_list(*lookups, parent)
+    fragments = fragments and is_plain(steps)
+    result = {}
+    for row in rows:
+        data = build(steps, row, None)
+        result.setdefault(row[-1], []).append(
+            fragment_for(data) if fragments else data
+        )
+    return result
+
+
+class FastSerializer:
+    """Сериализатор для чтения, собранный по полям DRF-сериализатора."""
+
+    def __init__(self, serializer_class):
+        self.model = serializer_class.Meta.model
+        self.lookups = []
+        self.steps = compile_fields(
+            serializer_class(), self.model, self.lookups
+        )
+        self.pk_index = add_lookup(self.lookups, 'pk')
+        self.many = [step for step in self.steps if step[1] == 'many']
+
+    def rows(self, queryset):
+        """Строки queryset в виде именованных кортежей values_list().
+
+        Поля кортежа называются как пути values_list(), поэтому по ним
+        работает и курсорная пагинация (`row.pub_date`, `row.pk`).
+        """
+
+        return queryset.prefetch_related(None).values_list(
+            *self.lookups, named=True
+        )
+
+    def serialize_rows(self, rows, fragments=False):
+        """Список словарей ответа для строк из rows().
+
+        fragments — вложенные объекты готовым JSON для FastJSONRenderer.
+        """
+
+        related = {}
+        if self.many:
+            pks = [row[self.pk_index] for row in rows]
+            for name, _, (model_field, lookups, steps) in self.many:
+                related[name] = fetch_many(
+                    model_field, lookups, steps, pks, fragments
+                )
+        return [
+            build(self.steps, row, related, row[self.pk_index], fragments)
+            for row in rows
+        ]
+
+    def serialize(self, queryset, fragments=False):
+        return self.serialize_rows(list(self.rows(queryset)), fragments)
+
+
+def get_fast_serializer(serializer_class):
+    fast = _compiled.get(serializer_class)
+    if fast is None:
+        fast = FastSerializer(serializer_class)
+        with _compiled_lock:
+            _compiled[serializer_class] = fast
+    return fast
@@ -1,4 +1,5 @@
 from django_filters import rest_framework as filters
+from rest_framework.filters import BaseFilterBackend
 
 from reviews.models import Title
 
@@ -21,3 +22,18 @@ class TitleFilter(filters.FilterSet):
     class Meta:
         model = Title
         fields = '__all__'
+
+
+class IndexSearchFilter(BaseFilterBackend):
+    """Поиск `?search=` по полнотекстовому индексу вьюсета.
+
+    Индекс задаётся атрибутом `search_index` вьюсета (см. reviews.search).
+    """
+
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, '')
+        if not text.strip():
+            return queryset
+        return view.search_index.search(queryset, text)
@@ -0,0 +1,387 @@
+import json
+import os
+import tempfile
+import tracemalloc
+from collections import namedtuple
+from contextlib import contextmanager
+from statistics import mean
+from time import perf_counter
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.tokens import default_token_generator
+from django.core.management import BaseCommand, CommandError, call_command
+from django.db import transaction
+from django.db.models import Count
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from api.authentication import access_token_for
+from api.querylog import QueryLog
+from reviews.models import Category, Comment, Genre, Review, Title
+
+User = get_user_model()
+
+# Сценарий: имя, метод, ожидаемый статус, функция i -> (путь, данные),
+# необязательная уборка после запроса и подготовка i -> None перед ним;
+# уборка и подготовка в замер не входят.
+Scenario = namedtuple(
+    'Scenario', ('name', 'method', 'status', 'request', 'cleanup', 'prepare'),
+    defaults=(None, None)
+)
+LATENCY_METRICS = ('p50', 'p95', 'alloc_kb')
+
+
+def percentile(values, share):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))]
+
+
+@contextmanager
+def run_on_commit():
+    """Выполняет обработчики transaction.on_commit блока при выходе из него.
+
+    Замер идёт внутри откатываемой транзакции, где обработчики не
+    срабатывают, и без них записи стоили бы меньше, чем в бою. Поэтому,
+    как captureOnCommitCallbacks(execute=True) в тестах Django, блок
+    собирает обработчики вместо транзакции и выполняет их сам.
+    """
+
+    callbacks = []
+
+    def on_commit(func, using=None):
+        callbacks.append(func)
+
+    with mock.patch.object(transaction, 'on_commit', on_commit):
+        yield
+        while callbacks:
+            callbacks.pop(0)()
+
+
+def isolated_settings(directory):
+    """Кеш, почта, метрики и профили замера, отдельные от боевых.
+
+    Ответы, построенные на откатываемых данных, не должны остаться в общем
+    кеше, а запросы замера — в метриках и профилях сервера.
+    """
+
+    return override_settings(
+        CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'benchmark_api',
+        }},
+        EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+        METRICS={
+            **settings.METRICS, 'DIR': os.path.join(directory, 'metrics')
+        },
+        PROFILING={
+            **settings.PROFILING, 'DIR': os.path.join(directory, 'profiles')
+        },
+        # Фоновый поток читал бы базу своим соединением, без данных
+        # откатываемой транзакции замера.
+        AUTOCOMPLETE={**settings.AUTOCOMPLETE, 'BACKGROUND': False},
+    )
+
+
+class Command(BaseCommand):
+    """Замер задержки, числа запросов к базе и памяти по маршрутам API."""
+
+    help = ('Прогоняет маршруты API тестовым клиентом DRF внутри '
+            'откатываемой транзакции и сравнивает результат с базовым. '
+            'Кеш, почта, метрики и профили на время замера свои, в памяти '
+            'и во временном каталоге.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50,
+                            help='Запросов на маршрут для замера.')
+        parser.add_argument('--warmup', type=int, default=5,
+                            help='Запросов на маршрут для прогрева.')
+        parser.add_argument('--alloc-requests', type=int, default=5,
+                            help='Запросов на маршрут под tracemalloc.')
+        parser.add_argument('--routes', nargs='*',
+                            help='Только маршруты с этими именами.')
+        parser.add_argument('--output',
+                            help='Записать результат в JSON-файл.')
+        parser.add_argument('--compare',
+                            help='Сравнить с базовым JSON-файлом.')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='Допустимый рост задержки и памяти, доля.')
+        parser.add_argument('--generate', action='store_true',
+                            help='Заполнить пустую базу командой '
+                                 'generate_data перед замером.')
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--titles', type=int, default=500)
+        parser.add_argument('--reviews', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=10000)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('--requests должно быть больше нуля.')
+        with tempfile.TemporaryDirectory() as directory:
+            with isolated_settings(directory):
+                results = self.benchmark(options)
+        self.report(results)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump({'routes': results}, file, indent=2)
+        if options['compare']:
+            self.compare(results, options['compare'], options['tolerance'])
+
+    def benchmark(self, options):
+        # Записи сценариев и сгенерированные данные не остаются в базе.
+        with transaction.atomic():
+            with run_on_commit():
+                if options['generate']:
+                    self.generate(options)
+                scenarios = self.build_scenarios()
+            if options['routes']:
+                scenarios = [
+                    scenario for scenario in scenarios
+                    if scenario.name in options['routes']
+                ]
+            results = {
+                scenario.name: self.measure(scenario, options)
+                for scenario in scenarios
+            }
+            transaction.set_rollback(True)
+        return results
+
+    def generate(self, options):
+        if Title.objects.exists():
+            raise CommandError('--generate работает только с пустой базой.')
+        with tempfile.TemporaryDirectory() as directory:
+            call_command(
+                'generate_data', path=directory, load=True,
+                users=options['users'], titles=options['titles'],
+                reviews=options['reviews'], comments=options['comments'],
+                seed=options['seed'], stdout=self.stdout
+            )
+
+    def build_scenarios(self):
+        title = Title.objects.order_by('-review_count', 'pk').first()
+        review_id = Comment.objects.values('review_id').annotate(
+            count=Count('id')
+        ).order_by('-count', 'review_id').values_list(
+            'review_id', flat=True
+        ).first()
+        if title is None or review_id is None:
+            raise CommandError(
+                'В базе нет произведений с отзывами и комментариями: '
+                'загрузите данные или запустите команду с --generate.'
+            )
+        review = Review.objects.get(pk=review_id)
+        comment = review.comments.order_by('pk').first()
+        genre = title.genre.first()
+        category = title.category or Category.objects.first()
+        genres = list(title.genre.values_list('slug', flat=True))
+        admin = User.objects.create(
+            username='benchmark_admin', email='benchmark_admin@yamdb.fake',
+            role=User.ROLE_ADMIN
+        )
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {access_token_for(admin)}'
+        )
+        code = default_token_generator.make_token(admin)
+        titles = '/api/v1/titles/'
+        reviews = f'{titles}{review.title_id}/reviews/'
+        comments = f'{reviews}{review.pk}/comments/'
+        word = title.name.split()[0]
+
+        def get(name, path):
+            return Scenario(name, 'get', 200, lambda i: (path, None), None)
+
+        return [
+            get('titles-list', titles),
+            get('titles-filter', f'{titles}?genre={genre.slug}'
+                if genre else f'{titles}?year={title.year}'),
+            get('titles-search', f'{titles}?search={word}'),
+            get('titles-detail', f'{titles}{title.pk}/'),
+            get('titles-autocomplete', f'{titles}autocomplete/?q={word[:3]}'),
+            Scenario(
+                'titles-create', 'post', 201,
+                lambda i: (titles, {
+                    'name': f'Замер {i}', 'year': title.year,
+                    'category': category.slug, 'genre': genres,
+                }),
+                lambda response: Title.objects.filter(
+                    pk=response.data['id']
+                ).delete()
+            ),
+            *self.catalog_scenarios('categories', Category),
+            *self.catalog_scenarios('genres', Genre),
+            get('categories-list', '/api/v1/categories/'),
+            get('genres-list', '/api/v1/genres/'),
+            get('reviews-list', f'/api/v1/titles/{title.pk}/reviews/'),
+            get('reviews-detail', f'{reviews}{review.pk}/'),
+            Scenario(
+                'reviews-create', 'post', 201,
+                lambda i: (f'/api/v1/titles/{title.pk}/reviews/',
+                           {'text': 'Замер', 'score': 5}),
+                lambda response: Review.objects.filter(
+                    pk=response.data['id']
+                ).delete()
+            ),
+            get('comments-list', comments),
+            get('comments-detail', f'{comments}{comment.pk}/'),
+            Scenario(
+                'comments-create', 'post', 201,
+                lambda i: (comments, {'text': 'Замер'}), None
+            ),
+            get('users-list', '/api/v1/users/'),
+            get('users-detail', f'/api/v1/users/{admin.username}/'),
+            get('users-me', '/api/v1/users/me/'),
+            Scenario(
+                'users-create', 'post', 201,
+                lambda i: ('/api/v1/users/', {
+                    'username': f'benchmark_new_{i}',
+                    'email': f'benchmark_new_{i}@yamdb.fake',
+                }), None
+            ),
+            Scenario(
+                'auth-signup', 'post', 200,
+                lambda i: ('/api/v1/auth/signup/', {
+                    'username': f'benchmark_signup_{i}',
+                    'email': f'benchmark_signup_{i}@yamdb.fake',
+                }), None
+            ),
+            Scenario(
+                'auth-token', 'post', 200,
+                lambda i: ('/api/v1/auth/token/', {
+                    'username': admin.username, 'confirmation_code': code,
+                }), None
+            ),
+        ]
+
+    @staticmethod
+    def catalog_scenarios(name, model):
+        """Создание и удаление категории или жанра."""
+
+        url = f'/api/v1/{name}/'
+
+        def create(i):
+            model.objects.create(name=f'Замер {i}', slug=f'benchmark-{i}')
+
+        return [
+            Scenario(
+                f'{name}-create', 'post', 201,
+                lambda i: (url, {
+                    'name': f'Замер {i}', 'slug': f'benchmark-{i}',
+                }),
+                lambda response: model.objects.filter(
+                    slug=response.data['slug']
+                ).delete()
+            ),
+            Scenario(
+                f'{name}-delete', 'delete', 204,
+                lambda i: (f'{url}benchmark-{i}/', None), None, create
+            ),
+        ]
+
+    def call(self, scenario, i):
+        path, data = scenario.request(i)
+        response = getattr(self.client, scenario.method)(
+            path, data, format='json'
+        )
+        if response.status_code != scenario.status:
+            raise CommandError(
+                f'{scenario.name}: {scenario.method.upper()} {path} вернул '
+                f'{response.status_code} вместо {scenario.status}.'
+            )
+        return response
+
+    def run(self, scenario, counter, count, on_request=None):
+        """Выполняет count запросов; on_request получает время запроса."""
+
+        for _ in range(count):
+            counter += 1
+            if scenario.prepare:
+                with run_on_commit():
+                    scenario.prepare(counter)
+            query_log = QueryLog()
+            with query_log.capture():
+                started = perf_counter()
+                with run_on_commit():
+                    response = self.call(scenario, counter)
+                elapsed = perf_counter() - started
+            if on_request:
+                on_request(elapsed, query_log.count)
+            if scenario.cleanup:
+                with run_on_commit():
+                    scenario.cleanup(response)
+        return counter
+
+    def measure(self, scenario, options):
+        latencies, queries, allocations = [], [], []
+
+        def record(elapsed, count):
+            latencies.append(elapsed * 1000)
+            queries.append(count)
+
+        counter = self.run(scenario, 0, options['warmup'])
+        counter = self.run(scenario, counter, options['requests'], record)
+        tracemalloc.start()
+        try:
+            for _ in range(options['alloc_requests']):
+                tracemalloc.reset_peak()
+                before, _ = tracemalloc.get_traced_memory()
+                counter = self.run(scenario, counter, 1)
+                _, peak = tracemalloc.get_traced_memory()
+                allocations.append((peak - before) / 1024)
+        finally:
+            tracemalloc.stop()
+        return {
+            'requests': len(latencies),
+            'p50': round(percentile(latencies, 0.5), 3),
+            'p95': round(percentile(latencies, 0.95), 3),
+            'p99': round(percentile(latencies, 0.99), 3),
+            'queries': round(mean(queries), 2),
+            'alloc_kb': round(mean(allocations), 1) if allocations else 0,
+        }
+
+    def report(self, results):
+        self.stdout.write(
+            f'{"маршрут":<22} {"p50 мс":>8} {"p95 мс":>8} {"p99 мс":>8} '
+            f'{"запросы":>8} {"память КБ":>10}'
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<22} {result["p50"]:>8.2f} {result["p95"]:>8.2f} '
+                f'{result["p99"]:>8.2f} {result["queries"]:>8.2f} '
+                f'{result["alloc_kb"]:>10.1f}'
+            )
+
+    def compare(self, results, baseline_path, tolerance):
+        """Ошибка, если маршрут стал медленнее или делает больше запросов.
+
+        Число запросов не зависит от машины и сравнивается точно, задержка
+        и память — с допуском tolerance.
+        """
+
+        with open(baseline_path, encoding='utf-8') as file:
+            baseline = json.load(file)['routes']
+        regressions = []
+        for name, result in results.items():
+            base = baseline.get(name)
+            if base is None:
+                self.stdout.write(f'{name}: нет в базовом файле.')
+                continue
+            if result['queries'] > base['queries']:
+                regressions.append(
+                    f'{name}: запросов {result["queries"]} '
+                    f'вместо {base["queries"]}'
+                )
+            for metric in LATENCY_METRICS:
+                if result[metric] > base[metric] * (1 + tolerance):
+                    regressions.append(
+                        f'{name}: {metric} {result[metric]} '
+                        f'вместо {base[metric]}'
+                    )
+        if regressions:
+            raise CommandError(
+                'Регрессия относительно базового замера:\n'
+                + '\n'.join(regressions)
+            )
+        self.stdout.write('Регрессий нет.')
@@ -0,0 +1,90 @@
+from django.core.management import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from api import renderers
+from api.fast_serializers import get_fast_serializer
+from api.optimizer import optimize_queryset
+from api.serializers import TitleSerializer
+from reviews.models import Title
+
+from .benchmark_serializers import timeit
+
+
+class Command(BaseCommand):
+    """Сравнение JSONRenderer и FastJSONRenderer на страницах /titles/."""
+
+    help = ('Рендерит страницы списка произведений DRF JSONRenderer и '
+            'FastJSONRenderer, с фрагментами и без, и сравнивает время.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=20,
+                            help='Число страниц.')
+        parser.add_argument('--page-size', type=int, default=10,
+                            help='Произведений на странице.')
+        parser.add_argument('--repeat', type=int, default=20,
+                            help='Повторов каждого замера.')
+
+    def handle(self, *args, **options):
+        pages = self.load_pages(options['pages'], options['page_size'])
+        if not pages:
+            raise CommandError('В базе нет произведений.')
+        drf, fast = JSONRenderer(), renderers.FastJSONRenderer()
+        variants = (
+            ('JSONRenderer', drf, pages['drf']),
+            ('FastJSONRenderer', fast, pages['drf']),
+            ('FastJSONRenderer, фрагменты', fast, pages['fragments']),
+        )
+        expected = [drf.render(page) for page in pages['drf']]
+        backend = 'orjson' if renderers.orjson else 'json'
+        self.stdout.write(
+            f'Страниц: {len(expected)}, кодировщик FastJSONRenderer: '
+            f'{backend}.'
+        )
+        self.stdout.write(
+            f'{"рендерер":<30} {"мс на страницу":>15} {"ускорение":>10}'
+        )
+        base = None
+        for name, renderer, data in variants:
+            if [renderer.render(page) for page in data] != expected:
+                self.stdout.write(self.style.ERROR(
+                    f'{name}: JSON не совпадает с JSONRenderer.'
+                ))
+                continue
+            elapsed = timeit(
+                lambda: [renderer.render(page) for page in data],
+                options['repeat']
+            ) / len(data)
+            base = base or elapsed
+            self.stdout.write(
+                f'{name:<30} {elapsed:>15.4f} {base / elapsed:>9.1f}x'
+            )
+
+    @staticmethod
+    def load_pages(count, size):
+        """Данные страниц в том виде, в каком их отдаёт пагинатор.
+
+        drf — словари сериализатора DRF, fragments — данные быстрого
+        сериализатора с готовыми фрагментами категорий и жанров.
+        """
+
+        queryset = Title.objects.order_by('name', 'pk')
+        total = queryset.count()
+        fast = get_fast_serializer(TitleSerializer)
+        pages = {'drf': [], 'fragments': []}
+        for number in range(count):
+            rows = queryset[number * size:(number + 1) * size]
+            titles = list(optimize_queryset(rows, TitleSerializer))
+            if not titles:
+                break
+            for key, results in (
+                ('drf', TitleSerializer(titles, many=True).data),
+                ('fragments', fast.serialize(rows, fragments=True)),
+            ):
+                pages[key].append({
+                    'count': total,
+                    'next': f'/api/v1/titles/?page={number + 2}',
+                    'previous': f'/api/v1/titles/?page={number}'
+                    if number else None,
+                    'results': results,
+                })
+        return pages
@@ -0,0 +1,99 @@
+import random
+from statistics import mean
+from time import perf_counter
+
+from django.core.management import BaseCommand, CommandError
+
+from api.filters import TitleFilter
+from reviews.models import Title
+from reviews.search import fts_enabled, search_titles, tokenize
+
+# Замены окончаний, дающие другую форму того же слова.
+RU_ENDING_SWAPS = (
+    ('ая', 'ой'), ('ый', 'ого'), ('ий', 'его'), ('ое', 'ого'),
+    ('ой', 'ому'), ('а', 'ы'), ('я', 'и'), ('о', 'а'), ('ь', 'и'),
+    ('е', 'а'), ('ы', 'ов'), ('и', 'ей'),
+)
+RU_CONSONANT_ENDING = 'а'
+EN_ENDING = 's'
+
+
+def inflect(word):
+    """Другая словоформа: замена окончания или падежное окончание."""
+
+    for ending, replacement in RU_ENDING_SWAPS:
+        if word.endswith(ending):
+            return word[:-len(ending)] + replacement
+    if word.isascii():
+        return word + EN_ENDING
+    return word + RU_CONSONANT_ENDING
+
+
+def percentile(values, share):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))]
+
+
+class Command(BaseCommand):
+    """Сравнение поиска по индексу с фильтром `?name=` (icontains)."""
+
+    help = ('Измеряет полноту и задержку поиска произведений по индексу '
+            'и через icontains на словоформах из названий.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--samples', type=int, default=200,
+                            help='Количество произведений для запросов.')
+        parser.add_argument('--seed', type=int, default=1,
+                            help='Зерно генератора выборки.')
+
+    def handle(self, *args, **options):
+        if not fts_enabled():
+            raise CommandError('Полнотекстовый индекс доступен '
+                               'только на SQLite.')
+        queries = self.build_queries(options['samples'], options['seed'])
+        if not queries:
+            raise CommandError('В базе нет произведений для запросов.')
+        paths = (
+            ('icontains', lambda text: TitleFilter(
+                {'name': text}, queryset=Title.objects.all()
+            ).qs),
+            ('index', lambda text: search_titles(Title.objects.all(), text)),
+        )
+        self.stdout.write(
+            f'{"путь":<10} {"запросы":<10} {"вид":<10} {"полнота":>8} '
+            f'{"ср. мс":>8} {"p95 мс":>8}'
+        )
+        for name, search in paths:
+            self.report(name, search, queries)
+
+    def build_queries(self, samples, seed):
+        """Запросы (вид, текст, id произведения, которое должно найтись)."""
+
+        titles = list(Title.objects.values_list('id', 'name'))
+        rng = random.Random(seed)
+        queries = []
+        for pk, name in rng.sample(titles, min(samples, len(titles))):
+            words = [word for word in tokenize(name) if len(word) >= 4]
+            if not words:
+                continue
+            word = rng.choice(words)
+            queries.append(('exact', word, pk))
+            queries.append(('inflected', inflect(word), pk))
+            queries.append(('prefix', word[:max(3, len(word) - 2)], pk))
+        return queries
+
+    def report(self, name, search, queries):
+        by_kind = {}
+        for kind, text, expected in queries:
+            started = perf_counter()
+            found = set(search(text).values_list('id', flat=True))
+            elapsed = (perf_counter() - started) * 1000
+            hits, latencies = by_kind.setdefault(kind, ([], []))
+            hits.append(expected in found)
+            latencies.append(elapsed)
+        for kind, (hits, latencies) in by_kind.items():
+            self.stdout.write(
+                f'{name:<10} {len(hits):<10} {kind:<10} '
+                f'{sum(hits) / len(hits):>8.2%} {mean(latencies):>8.3f} '
+                f'{percentile(latencies, 0.95):>8.3f}'
+            )
@@ -0,0 +1,121 @@
+import inspect
+from time import perf_counter
+
+from django.core.management import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from rest_framework.serializers import BaseSerializer
+
+from api import serializers
+from api.fast_serializers import get_fast_serializer
+from api.optimizer import optimize_queryset
+
+# Сериализаторы, у которых есть быстрый путь для чтения.
+FAST_SERIALIZERS = (
+    serializers.TitleSerializer,
+    serializers.ReviewSerializer,
+    serializers.CommentSerializer,
+)
+
+
+def timeit(func, repeat):
+    """Лучшее из repeat измерений func, миллисекунды."""
+
+    best = None
+    for _ in range(repeat):
+        started = perf_counter()
+        func()
+        elapsed = (perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def serializer_classes():
+    return [
+        cls for _, cls in inspect.getmembers(serializers, inspect.isclass)
+        if issubclass(cls, BaseSerializer)
+        and cls.__module__ == serializers.__name__
+    ]
+
+
+class Command(BaseCommand):
+    """Микробенчмарки сериализаторов api.serializers."""
+
+    help = ('Замеряет чтение и проверку данных каждым сериализатором API '
+            'и сравнивает быстрый путь чтения с DRF.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100,
+                            help='Строк на странице.')
+        parser.add_argument('--repeat', type=int, default=20,
+                            help='Повторов каждого замера.')
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        self.stdout.write(
+            f'{"сериализатор":<26} {"строк":>6} {"чтение мс":>10} '
+            f'{"мкс/строка":>11} {"проверка мкс":>13}'
+        )
+        for cls in serializer_classes():
+            self.benchmark(cls, rows, repeat)
+        self.stdout.write('')
+        self.stdout.write(
+            f'{"быстрый путь":<26} {"строк":>6} {"DRF мс":>10} '
+            f'{"быстро мс":>11} {"ускорение":>10}'
+        )
+        for cls in FAST_SERIALIZERS:
+            self.compare_fast(cls, rows, repeat)
+
+    def benchmark(self, cls, rows, repeat):
+        model = getattr(getattr(cls, 'Meta', None), 'model', None)
+        instances = []
+        read = per_row = None
+        if model is not None:
+            instances = list(optimize_queryset(
+                model._default_manager.order_by('pk'), cls
+            )[:rows])
+            if not instances:
+                self.stdout.write(f'{cls.__name__:<26} нет данных')
+                return
+            read = timeit(lambda: cls(instances, many=True).data, repeat)
+            per_row = read * 1000 / len(instances)
+            data = cls(instances[0]).data
+        else:
+            data = {
+                name: 'x' for name, field in cls().fields.items()
+                if not field.read_only
+            }
+        validate = timeit(
+            lambda: cls(data=data).is_valid(), repeat
+        ) * 1000
+        read_text = '-' if read is None else f'{read:.3f}'
+        per_row_text = '-' if per_row is None else f'{per_row:.1f}'
+        self.stdout.write(
+            f'{cls.__name__:<26} {len(instances):>6} {read_text:>10} '
+            f'{per_row_text:>11} {validate:>13.1f}'
+        )
+
+    def compare_fast(self, cls, rows, repeat):
+        """Страница целиком, с запросами: DRF против быстрого пути."""
+
+        queryset = cls.Meta.model._default_manager.order_by('pk')
+        fast = get_fast_serializer(cls)
+
+        def drf_page():
+            page = list(optimize_queryset(queryset, cls)[:rows])
+            return cls(page, many=True).data
+
+        def fast_page():
+            return fast.serialize(queryset[:rows])
+
+        renderer = JSONRenderer()
+        if renderer.render(drf_page()) != renderer.render(fast_page()):
+            self.stdout.write(self.style.ERROR(
+                f'{cls.__name__}: JSON быстрого пути не совпадает с DRF.'
+            ))
+            return
+        drf = timeit(drf_page, repeat)
+        fast_time = timeit(fast_page, repeat)
+        self.stdout.write(
+            f'{cls.__name__:<26} {len(fast_page()):>6} {drf:>10.3f} '
+            f'{fast_time:>11.3f} {drf / fast_time:>9.1f}x'
+        )
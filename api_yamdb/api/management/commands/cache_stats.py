@@ -0,0 +1,26 @@
+from django.core.management import BaseCommand
+
+from api import authentication
+from api.cache import get_stats
+
+
+class Command(BaseCommand):
+    """Счётчики кеша списков и кеша пользователей."""
+
+    help = 'Показывает число попаданий и промахов кешей.'
+
+    def handle(self, *args, **options):
+        self.report('Кеш списков', get_stats(), 'hits', 'misses')
+        self.report(
+            'Кеш пользователей', get_stats(authentication.EVENTS),
+            'user-hits', 'user-misses'
+        )
+
+    def report(self, title, stats, hits_event, misses_event):
+        hits, misses = stats[hits_event], stats[misses_event]
+        total = hits + misses
+        ratio = hits / total if total else 0
+        self.stdout.write(
+            f'{title}. Попаданий: {hits}, промахов: {misses}, '
+            f'доля попаданий: {ratio:.1%}.'
+        )
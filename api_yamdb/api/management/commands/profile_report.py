@@ -0,0 +1,65 @@
+from datetime import datetime
+
+from django.core.management import BaseCommand
+
+from api.profiling import clear_profiles, get_profiles
+
+
+class Command(BaseCommand):
+    """Самые медленные запросы по профилям ProfilingMiddleware."""
+
+    help = ('Показывает маршруты с самыми медленными запросами и функции, '
+            'на которые ушло их время.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--route',
+                            help='Показать профили только этого маршрута.')
+        parser.add_argument('--limit', type=int, default=10,
+                            help='Сколько маршрутов показать.')
+        parser.add_argument('--frames', type=int, default=10,
+                            help='Сколько функций показать в профиле.')
+        parser.add_argument('--clear', action='store_true',
+                            help='Удалить сохранённые профили.')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            clear_profiles()
+            self.stdout.write('Профили удалены.')
+            return
+        profiles = get_profiles()
+        if options['route']:
+            profiles = {
+                route: items for route, items in profiles.items()
+                if route == options['route']
+            }
+        if not profiles:
+            self.stdout.write('Профилей нет.')
+            return
+        worst = sorted(
+            profiles.values(), key=lambda items: items[0]['duration'],
+            reverse=True
+        )
+        for items in worst[:options['limit']]:
+            self.report_route(items, options['frames'])
+
+    def report_route(self, profiles, frames_limit):
+        worst = profiles[0]
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'{worst["route"]}: профилей {len(profiles)}, худший '
+            f'{worst["duration"] * 1000:.1f} мс'
+        ))
+        captured = datetime.fromtimestamp(worst['captured'])
+        self.stdout.write(
+            f'  {worst["method"]} {worst["path"]} -> {worst["status"]}, '
+            f'{worst["kind"]}, {captured:%Y-%m-%d %H:%M:%S}'
+        )
+        self.stdout.write(
+            f'  {"своё, мс":>10} {"всего, мс":>10} {"вызовов":>8}  функция'
+        )
+        for frame in worst['frames'][:frames_limit]:
+            calls = '' if frame['calls'] is None else frame['calls']
+            own, total = frame['own'] * 1000, frame['total'] * 1000
+            self.stdout.write(
+                f'  {own:>10.1f} {total:>10.1f} {calls:>8}  '
+                f'{frame["function"]}'
+            )
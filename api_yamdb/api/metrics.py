@@ -0,0 +1,376 @@
+"""Метрики сервиса в текстовом формате Prometheus (`/metrics`).
+
+Каждый процесс копит счётчики и гистограммы в памяти и раз в
+`METRICS['FLUSH_INTERVAL']` секунд записывает их в свой JSON-файл в
+каталоге `METRICS['DIR']`. Запрос `/metrics` складывает файлы всех
+процессов, поэтому работает и с несколькими процессами WSGI-сервера:
+данные других процессов отстают не больше чем на интервал записи.
+
+Файлы завершённых процессов при сборе метрик складываются в общий файл
+`totals.json` и удаляются, так что счётчики не уменьшаются, а файлы не
+копятся. Процессы узнаются по pid в имени файла, поэтому каталог должен
+быть своим у каждого хоста.
+
+Сюда же api.cache пишет попадания и промахи кешей списков и пользователей.
+
+`/metrics` отдаётся адресам из `METRICS['ALLOWED_IPS']`, запросам с
+заголовком `Authorization: Bearer <METRICS['TOKEN']>` и администраторам.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, suppress
+from time import perf_counter
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .permissions import AdminOnlyPermission
+from .querylog import request_query_log
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+COUNTERS = {
+    'yamdb_http_requests_total': 'Число запросов по маршруту и статусу.',
+    'yamdb_http_errors_total': 'Число ответов с кодом 5xx по маршруту.',
+    'yamdb_db_queries_total': 'Число SQL-запросов по маршруту.',
+    'yamdb_db_duration_seconds_total': 'Время SQL-запросов по маршруту.',
+    'yamdb_cache_events_total': (
+        'Попадания и промахи кешей списков и пользователей.'
+    ),
+}
+HISTOGRAMS = {
+    'yamdb_http_request_duration_seconds': 'Время обработки запроса.',
+}
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+TOTALS_FILE = 'totals.json'
+LOCK_FILE = '.lock'
+
+
+def labels_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def read_json(path):
+    try:
+        with open(path, encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def write_json(path, data):
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        json.dump(data, file)
+    os.replace(temp_path, path)
+
+
+def merge(counters, histograms, data):
+    """Прибавляет метрики из файла к счётчикам и гистограммам."""
+
+    for name, labels, value in data['counters']:
+        key = (name, tuple(map(tuple, labels)))
+        counters[key] = counters.get(key, 0) + value
+    for name, labels, values in data['histograms']:
+        key = (name, tuple(map(tuple, labels)))
+        total = histograms.setdefault(key, [0] * len(values))
+        for index, value in enumerate(values):
+            total[index] += value
+
+
+def to_data(counters, histograms):
+    return {
+        'counters': [
+            [name, labels, value]
+            for (name, labels), value in counters.items()
+        ],
+        'histograms': [
+            [name, labels, values]
+            for (name, labels), values in histograms.items()
+        ],
+    }
+
+
+def is_dead(file_name):
+    """Завершился ли процесс, записавший файл `<pid>-<время>.json`."""
+
+    try:
+        pid = int(file_name.split('-', 1)[0])
+    except ValueError:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        return False
+    return False
+
+
+@contextmanager
+def directory_lock(directory):
+    """Блокировка каталога метрик на время сбора; без fcntl — пустая."""
+
+    if fcntl is None:
+        yield
+        return
+    with open(os.path.join(directory, LOCK_FILE), 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+class MetricsStore:
+    """Метрики процесса и их сведение по файлам всех процессов."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        # После fork дочерний процесс начинает со своих пустых счётчиков
+        # и своего файла: иначе он записал бы данные родителя повторно.
+        self._pid = os.getpid()
+        self._file_name = f'{self._pid}-{time.time_ns()}.json'
+        self._counters = {}
+        self._histograms = {}
+        self._flushed_at = time.monotonic()
+
+    def _check_fork(self):
+        if self._pid != os.getpid():
+            self.reset()
+
+    def inc(self, name, labels, value=1):
+        with self._lock:
+            self._check_fork()
+            key = (name, labels_key(labels))
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        with self._lock:
+            self._check_fork()
+            key = (name, labels_key(labels))
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                # Счётчики корзин, затем сумма и количество наблюдений.
+                histogram = self._histograms[key] = [0] * (len(BUCKETS) + 2)
+            for index, bound in enumerate(BUCKETS):
+                if value <= bound:
+                    histogram[index] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    def maybe_flush(self):
+        interval = settings.METRICS['FLUSH_INTERVAL']
+        if time.monotonic() - self._flushed_at >= interval:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            self._check_fork()
+            self._flushed_at = time.monotonic()
+            if not self._counters and not self._histograms:
+                return
+            data = to_data(self._counters, self._histograms)
+            file_name = self._file_name
+        directory = settings.METRICS['DIR']
+        os.makedirs(directory, exist_ok=True)
+        write_json(os.path.join(directory, file_name), data)
+
+    def collect(self):
+        """Сумма метрик всех процессов: (счётчики, гистограммы)."""
+
+        self.flush()
+        counters, histograms = {}, {}
+        directory = settings.METRICS['DIR']
+        os.makedirs(directory, exist_ok=True)
+        with directory_lock(directory):
+            # Без блокировки два сбора сложили бы один файл дважды.
+            if fcntl is not None:
+                self.compact(directory)
+            for file_name in sorted(os.listdir(directory)):
+                if not file_name.endswith('.json'):
+                    continue
+                data = read_json(os.path.join(directory, file_name))
+                if data is not None:
+                    merge(counters, histograms, data)
+        return counters, histograms
+
+    @staticmethod
+    def compact(directory):
+        """Складывает файлы завершённых процессов в `totals.json`.
+
+        Вызывается под блокировкой каталога. Имена сложенных файлов
+        остаются в `totals.json`: если процесс упадёт, не успев их удалить,
+        следующий сбор удалит их без повторного сложения.
+        """
+
+        totals_path = os.path.join(directory, TOTALS_FILE)
+        totals = read_json(totals_path) or to_data({}, {})
+        for file_name in totals.get('merged', ()):
+            with suppress(FileNotFoundError):
+                os.remove(os.path.join(directory, file_name))
+        dead = [
+            file_name for file_name in sorted(os.listdir(directory))
+            if file_name.endswith('.json') and is_dead(file_name)
+        ]
+        if not dead:
+            return
+        counters, histograms = {}, {}
+        merge(counters, histograms, totals)
+        for file_name in dead:
+            data = read_json(os.path.join(directory, file_name))
+            if data is not None:
+                merge(counters, histograms, data)
+        write_json(totals_path, {
+            **to_data(counters, histograms), 'merged': dead
+        })
+        for file_name in dead:
+            os.remove(os.path.join(directory, file_name))
+
+
+store = MetricsStore()
+
+
+def escape(value):
+    return (
+        str(value).replace('\\', r'\\').replace('"', r'\"')
+        .replace('\n', r'\n')
+    )
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(f'{name}="{escape(value)}"' for name, value in labels)
+    return '{' + pairs + '}'
+
+
+def format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_counters(lines, counters):
+    for name, help_text in COUNTERS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+        for (sample, labels), value in sorted(counters.items()):
+            if sample == name:
+                lines.append(
+                    f'{name}{format_labels(labels)} {format_value(value)}'
+                )
+
+
+def render_histograms(lines, histograms):
+    for name, help_text in HISTOGRAMS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+        for (sample, labels), values in sorted(histograms.items()):
+            if sample != name:
+                continue
+            buckets = [
+                (str(bound), count) for bound, count in zip(BUCKETS, values)
+            ] + [('+Inf', values[-1])]
+            for bound, count in buckets:
+                bucket_labels = labels + (('le', bound),)
+                lines.append(
+                    f'{name}_bucket{format_labels(bucket_labels)} {count}'
+                )
+            lines.append(
+                f'{name}_sum{format_labels(labels)} '
+                f'{format_value(values[-2])}'
+            )
+            lines.append(f'{name}_count{format_labels(labels)} {values[-1]}')
+
+
+def render():
+    counters, histograms = store.collect()
+    lines = []
+    render_counters(lines, counters)
+    render_histograms(lines, histograms)
+    return '\n'.join(lines) + '\n'
+
+
+def get_route_label(request):
+    """Имя маршрута; запросы мимо маршрутов сводятся в одну метку."""
+
+    match = getattr(request, 'resolver_match', None)
+    if match is None or not match.url_name:
+        return 'unmatched'
+    return match.url_name
+
+
+class MetricsMiddleware:
+    """Счётчики и гистограмма времени для каждого запроса."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.METRICS['ENABLED']:
+            return self.get_response(request)
+        started = perf_counter()
+        with request_query_log(request) as query_log:
+            response = self.get_response(request)
+        duration = perf_counter() - started
+        route = get_route_label(request)
+        labels = {'route': route, 'method': request.method}
+        store.inc('yamdb_http_requests_total', {
+            **labels, 'status': str(response.status_code)
+        })
+        if response.status_code >= 500:
+            store.inc('yamdb_http_errors_total', labels)
+        store.inc('yamdb_db_queries_total', {'route': route}, query_log.count)
+        store.inc(
+            'yamdb_db_duration_seconds_total', {'route': route},
+            query_log.duration
+        )
+        store.observe('yamdb_http_request_duration_seconds', labels, duration)
+        store.maybe_flush()
+        return response
+
+
+def is_admin(request):
+    request = Request(request, authenticators=[
+        authentication()
+        for authentication in api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    ])
+    try:
+        user = request.user
+    except APIException:
+        return False
+    return user.is_authenticated and AdminOnlyPermission().has_permission(
+        request, None
+    )
+
+
+def has_access(request):
+    """Доступ к /metrics: разрешённый адрес, токен или администратор."""
+
+    if request.META.get('REMOTE_ADDR') in settings.METRICS['ALLOWED_IPS']:
+        return True
+    token = settings.METRICS['TOKEN']
+    if token and constant_time_compare(
+        request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}'
+    ):
+        return True
+    return is_admin(request)
+
+
+def metrics_view(request):
+    if not settings.METRICS['ENABLED']:
+        return HttpResponse(status=404)
+    if not has_access(request):
+        return HttpResponse(status=403)
+    return HttpResponse(render(), content_type=CONTENT_TYPE)
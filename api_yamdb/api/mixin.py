@@ -1,8 +1,220 @@
+from hashlib import md5
+from time import perf_counter
+
+from django.conf import settings
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
 from rest_framework.mixins import (CreateModelMixin, DestroyModelMixin,
                                    ListModelMixin)
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 
+from . import cache
+from .fast_serializers import get_fast_serializer
+from .optimizer import optimize_queryset
+from .pagination import KeysetPagination
+from .timing import add_timing, timing_enabled
+
+
+class CachedListMixin:
+    """Кеширование ответа list по параметрам запроса и версии модели.
+
+    Версия модели читается из базы (см. api.cache) и меняется при любом
+    создании, изменении или удалении записи, так что после записи в любом
+    процессе следующий запрос уже получает свежий список.
+    """
+
+    def list(self, request, *args, **kwargs):
+        key = cache.response_key(self.get_queryset().model, request)
+        data = cache.get_response(key)
+        if data is not None:
+            return Response(data, headers={'X-Cache': 'HIT'})
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set_response(key, response.data)
+        response['X-Cache'] = 'MISS'
+        return response
+
+
+class OptimizedQuerysetMixin:
+    """Загрузка связей и полей по сериализатору (см. api.optimizer).
+
+    Оптимизация добавляется в filter_queryset: через него проходят и
+    list, и get_object. only() применяется только на чтение, чтобы
+    изменяемые экземпляры сохранялись целиком.
+    """
+
+    def filter_queryset(self, queryset):
+        return optimize_queryset(
+            super().filter_queryset(queryset),
+            self.get_serializer_class(),
+            restrict_fields=self.request.method in SAFE_METHODS
+        )
+
+
+class SerializerTimingMixin:
+    """Время сериализации ответа для заголовка Server-Timing."""
 
-class ModelMixinSet(CreateModelMixin, ListModelMixin,
-                    DestroyModelMixin, GenericViewSet):
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if not timing_enabled(self.request):
+            return serializer
+        to_representation = serializer.to_representation
+        request = self.request
+
+        def timed_to_representation(instance):
+            started = perf_counter()
+            try:
+                return to_representation(instance)
+            finally:
+                add_timing(request, 'serialize', perf_counter() - started)
+
+        serializer.to_representation = timed_to_representation
+        return serializer
+
+
+class ValuesListMixin:
+    """list без экземпляров моделей (см. api.fast_serializers).
+
+    Страница выбирается как кортежи values_list(), связи «ко многим»
+    догружаются одним запросом на страницу, а ответ собирается быстрым
+    сериализатором, который даёт тот же JSON, что и serializer_class.
+    Рендереру с supports_fragments (api.renderers.FastJSONRenderer)
+    вложенные объекты передаются готовым JSON. Включается настройкой
+    VALUES_LIST_READ.
+    """
+
+    def list(self, request, *args, **kwargs):
+        if not settings.VALUES_LIST_READ:
+            return super().list(request, *args, **kwargs)
+        fast = get_fast_serializer(self.get_serializer_class())
+        rows = fast.rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        started = perf_counter()
+        data = fast.serialize_rows(
+            list(rows) if page is None else page,
+            getattr(request.accepted_renderer, 'supports_fragments', False)
+        )
+        if timing_enabled(request):
+            add_timing(request, 'serialize', perf_counter() - started)
+        if page is None:
+            return Response(data)
+        return self.get_paginated_response(data)
+
+
+class ModelMixinSet(OptimizedQuerysetMixin, SerializerTimingMixin,
+                    CachedListMixin, ValuesListMixin, CreateModelMixin,
+                    ListModelMixin, DestroyModelMixin, GenericViewSet):
     pass
+
+
+class KeysetPaginationMixin:
+    """Переключение на курсорную пагинацию из запроса.
+
+    Курсорная пагинация включается параметром `?pagination=keyset` или
+    переданным курсором; иначе используется `pagination_class` вьюсета.
+    """
+
+    keyset_pagination_class = KeysetPagination
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator') and self.use_keyset_pagination():
+            self._paginator = self.keyset_pagination_class()
+        return super().paginator
+
+    def use_keyset_pagination(self):
+        params = self.request.query_params
+        return (
+            params.get('pagination') == 'keyset'
+            or self.keyset_pagination_class.cursor_query_param in params
+        )
+
+
+class ConditionalGetMixin:
+    """Ответ 304 на If-None-Match для list и retrieve.
+
+    Валидатор считается дешёвым запросом (или вовсе без базы) до выборки
+    и сериализации данных. Вьюсет переопределяет get_list_validator и
+    get_object_validator; каждый возвращает метку версии либо None, если
+    проверять нечего.
+
+    Last-Modified не отдаётся: у него точность в секунду, и изменение в
+    ту же секунду осталось бы незамеченным для If-Modified-Since.
+    """
+
+    def get_list_validator(self):
+        return None
+
+    def get_object_validator(self):
+        return None
+
+    @staticmethod
+    def modified_validator(queryset):
+        """Валидатор по полю `modified` первой записи queryset."""
+
+        modified = queryset.values_list('modified', flat=True).first()
+        return None if modified is None else modified.isoformat()
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(
+            self.get_list_validator, super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(
+            self.get_object_validator, super().retrieve,
+            request, *args, **kwargs
+        )
+
+    def conditional(self, get_validator, handler, request, *args, **kwargs):
+        validator = get_validator()
+        if validator is None:
+            return handler(request, *args, **kwargs)
+        etag = quote_etag(md5(
+            f'{validator}|{request.get_full_path()}|'
+            f'{request.accepted_renderer.format}'.encode()
+        ).hexdigest())
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        response['ETag'] = etag
+        return response
+
+
+class NestedParentMixin:
+    """Родительский объект вложенного ресурса, загруженный один раз.
+
+    Вьюсет задаёт `parent_queryset` и `parent_lookups` — пары (поле
+    родителя, параметр URL). Родитель ищется одним запросом, который сразу
+    проверяет вложенность: например, отзыв должен относиться к
+    произведению из URL. Дальше тот же объект берут вьюсет
+    (`get_parent()`) и сериализатор: при создании он привязывает запись к
+    `context['parent']`. Контекст собирается до проверки данных, поэтому
+    запрос к несуществующему родителю получает 404, а не 400.
+    """
+
+    parent_queryset = None
+    parent_lookups = ()
+
+    def get_parent(self):
+        if not hasattr(self, '_parent'):
+            self._parent = get_object_or_404(self.parent_queryset, **{
+                field: self.kwargs.get(kwarg)
+                for field, kwarg in self.parent_lookups
+            })
+        return self._parent
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['parent'] = self.get_parent()
+        return context
+
+    def parent_validator(self):
+        """Валидатор условного GET по полю `modified` родителя."""
+
+        return self.get_parent().modified.isoformat()
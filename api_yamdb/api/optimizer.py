@@ -0,0 +1,144 @@
+"""select_related, prefetch_related и only() по полям сериализатора.
+
+План запроса строится один раз для пары (модель, сериализатор):
+- вложенный сериализатор или SlugRelatedField на внешний ключ дают
+  select_related, а для slug — только нужное поле связанной модели;
+- поля many=True и обратные связи дают prefetch_related со своим
+  оптимизированным queryset;
+- обычные поля модели попадают в only().
+
+Если сериализатор читает что-то помимо полей модели (свойство, метод,
+source='*', составной source), only() не применяется: какие поля нужны
+такому коду, по сериализатору не понять.
+"""
+import threading
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework.relations import (ManyRelatedField, PrimaryKeyRelatedField,
+                                      SlugRelatedField)
+from rest_framework.serializers import BaseSerializer, ListSerializer
+
+_plans = {}
+_plans_lock = threading.Lock()
+
+
+class QueryPlan:
+    """Что загрузить для сериализатора: поля, join-ы и prefetch."""
+
+    def __init__(self):
+        self.only = set()
+        self.select = []
+        # Тройки (путь, модель, план вложенного queryset).
+        self.prefetch = []
+        self.restrict = True
+
+    def apply(self, queryset, restrict_fields=True):
+        if self.select:
+            queryset = queryset.select_related(*self.select)
+        if self.prefetch:
+            queryset = queryset.prefetch_related(*(
+                Prefetch(lookup, queryset=plan.apply(
+                    model._default_manager.all(), restrict_fields
+                ))
+                for lookup, model, plan in self.prefetch
+            ))
+        if restrict_fields and self.restrict:
+            queryset = queryset.only(*self.only)
+        return queryset
+
+
+def optimize_queryset(queryset, serializer_class, restrict_fields=True):
+    """Queryset, который отдаёт serializer_class без лишних запросов.
+
+    `restrict_fields=False` отключает only(): экземпляры с отложенными
+    полями нельзя безопасно изменять и сохранять.
+    """
+
+    known = frozenset(
+        field.name for field in queryset._known_related_objects
+    )
+    key = (queryset.model, serializer_class, known)
+    plan = _plans.get(key)
+    if plan is None:
+        plan = build_plan(queryset.model, serializer_class(), known=known)
+        # Связанный менеджер сверяет ключи всех строк с родителем.
+        plan.only.update(
+            queryset.model._meta.get_field(name).attname for name in known
+        )
+        with _plans_lock:
+            _plans[key] = plan
+    return plan.apply(queryset, restrict_fields)
+
+
+def build_plan(model, serializer, prefix='', plan=None, known=()):
+    """План для serializer; prefix — путь от корневой модели."""
+
+    plan = plan or QueryPlan()
+    plan.only.add(prefix + model._meta.pk.name)
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if field.source == '*' or '.' in field.source:
+            plan.restrict = False
+            continue
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            plan.restrict = False
+            continue
+        if not model_field.is_relation:
+            plan.only.add(prefix + model_field.attname)
+        elif model_field.many_to_many or model_field.one_to_many:
+            add_prefetch(plan, model_field, field, prefix)
+        elif model_field.concrete:
+            add_select(plan, model_field, field, prefix, known)
+        else:
+            plan.restrict = False
+    return plan
+
+
+def add_select(plan, model_field, field, prefix, known):
+    """Прямой внешний ключ: join или только значение ключа."""
+
+    path = prefix + model_field.name
+    if isinstance(field, PrimaryKeyRelatedField) or model_field.name in known:
+        # Значение ключа лежит в самой таблице, а объект уже известен
+        # queryset связанного менеджера.
+        plan.only.add(prefix + model_field.attname)
+        return
+    plan.select.append(path)
+    plan.only.add(path)
+    if isinstance(field, SlugRelatedField):
+        plan.only.add(f'{path}__{field.slug_field}')
+    elif isinstance(field, BaseSerializer):
+        build_plan(
+            model_field.related_model, field, f'{path}__', plan
+        )
+    else:
+        plan.restrict = False
+
+
+def add_prefetch(plan, model_field, field, prefix):
+    """Связь «ко многим»: отдельный запрос со своим планом."""
+
+    related_model = model_field.related_model
+    if isinstance(field, ListSerializer):
+        child_plan = build_plan(related_model, field.child)
+    elif isinstance(field, ManyRelatedField):
+        child_plan = QueryPlan()
+        child_plan.only.add(related_model._meta.pk.name)
+        relation = field.child_relation
+        if isinstance(relation, SlugRelatedField):
+            child_plan.only.add(relation.slug_field)
+        elif not isinstance(relation, PrimaryKeyRelatedField):
+            child_plan.restrict = False
+    else:
+        plan.restrict = False
+        return
+    if model_field.one_to_many:
+        # Обратному внешнему ключу нужен ключ на родителя.
+        child_plan.only.add(model_field.field.attname)
+    plan.prefetch.append(
+        (prefix + model_field.name, related_model, child_plan)
+    )
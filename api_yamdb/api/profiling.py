@@ -0,0 +1,239 @@
+"""Профили медленных и выбранных случайно запросов.
+
+`ProfilingMiddleware` профилирует запросы двумя способами:
+- доля `PROFILING['SAMPLE_RATE']` запросов целиком проходит под
+  `cProfile` — точные число вызовов и время функций;
+- остальные запросы, пока идут, видит фоновый поток-сэмплер: раз в
+  `SAMPLER_INTERVAL` секунд он снимает их стеки. Если запрос оказался
+  дольше `SLOW_THRESHOLD` секунд, собранные стеки сохраняются, иначе
+  выбрасываются. Сэмплер почти ничего не стоит, поэтому медленные
+  запросы ловятся и там, где профилировать каждый запрос нельзя.
+
+Профиль — это функции с наибольшим собственным временем. Для каждого
+маршрута в JSON-файле каталога `PROFILING['DIR']` хранятся `KEEP` самых
+медленных профилей за последние `TIMEOUT` секунд. Файлы общие для всех
+процессов хоста, поэтому их видит и команда `profile_report`.
+"""
+import cProfile
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from time import perf_counter
+
+from django.conf import settings
+
+from .metrics import directory_lock, get_route_label, read_json, write_json
+
+UNSAFE_FILE_NAME_RE = re.compile(r'[^\w-]')
+
+
+def frame_label(code):
+    return f'{code.co_filename}:{code.co_firstlineno}({code.co_name})'
+
+
+def top_frames(frames):
+    """Функции с наибольшим собственным временем, не больше TOP_FRAMES."""
+
+    frames.sort(key=lambda frame: frame['own'], reverse=True)
+    return frames[:settings.PROFILING['TOP_FRAMES']]
+
+
+def profile_frames(profile):
+    """Функции из профиля cProfile."""
+
+    frames = []
+    for (file_name, line, name), (_, calls, own, total, _) in (
+        pstats.Stats(profile).stats.items()
+    ):
+        frames.append({
+            'function': f'{file_name}:{line}({name})',
+            'calls': calls,
+            'own': own,
+            'total': total,
+        })
+    return top_frames(frames)
+
+
+class StackSampler:
+    """Фоновый поток, который снимает стеки идущих запросов."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._active = {}
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def start(self, thread_id):
+        """Начинает собирать стеки потока thread_id."""
+
+        samples = {'own': Counter(), 'total': Counter(), 'count': 0}
+        with self._lock:
+            self._active[thread_id] = samples
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self.run, name='yamdb-stack-sampler', daemon=True
+                )
+                self._thread.start()
+        self._wakeup.set()
+
+    def stop(self, thread_id):
+        """Прекращает сбор и возвращает стеки потока."""
+
+        with self._lock:
+            return self._active.pop(thread_id)
+
+    def run(self):
+        while True:
+            with self._lock:
+                if not self._active:
+                    self._wakeup.clear()
+            self._wakeup.wait()
+            time.sleep(settings.PROFILING['SAMPLER_INTERVAL'])
+            self.sample()
+
+    def sample(self):
+        frames = sys._current_frames()
+        with self._lock:
+            for thread_id, samples in self._active.items():
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                samples['count'] += 1
+                samples['own'][frame_label(frame.f_code)] += 1
+                # Рекурсивная функция считается один раз на стек.
+                stack = set()
+                while frame is not None:
+                    stack.add(frame_label(frame.f_code))
+                    frame = frame.f_back
+                samples['total'].update(stack)
+
+    @staticmethod
+    def frames(samples):
+        """Стеки в виде функций со временем, оценённым по числу снимков."""
+
+        interval = settings.PROFILING['SAMPLER_INTERVAL']
+        return top_frames([
+            {
+                'function': function,
+                'calls': None,
+                'own': samples['own'][function] * interval,
+                'total': count * interval,
+            }
+            for function, count in samples['total'].items()
+        ])
+
+
+sampler = StackSampler()
+
+
+def profiles_path(route):
+    file_name = UNSAFE_FILE_NAME_RE.sub('_', route)
+    return os.path.join(settings.PROFILING['DIR'], f'{file_name}.json')
+
+
+def fresh(profiles):
+    deadline = time.time() - settings.PROFILING['TIMEOUT']
+    return [profile for profile in profiles if profile['captured'] > deadline]
+
+
+def save_profile(route, profile):
+    """Добавляет профиль к самым медленным профилям маршрута."""
+
+    directory = settings.PROFILING['DIR']
+    os.makedirs(directory, exist_ok=True)
+    path = profiles_path(route)
+    with directory_lock(directory):
+        profiles = fresh(read_json(path) or [])
+        profiles.append(profile)
+        profiles.sort(key=lambda item: item['duration'], reverse=True)
+        write_json(path, profiles[:settings.PROFILING['KEEP']])
+
+
+def get_profiles():
+    """Сохранённые профили по маршрутам, самые медленные первыми."""
+
+    directory = settings.PROFILING['DIR']
+    if not os.path.isdir(directory):
+        return {}
+    result = {}
+    for file_name in sorted(os.listdir(directory)):
+        if not file_name.endswith('.json'):
+            continue
+        profiles = fresh(read_json(os.path.join(directory, file_name)) or [])
+        if profiles:
+            result[profiles[0]['route']] = profiles
+    return result
+
+
+def clear_profiles():
+    directory = settings.PROFILING['DIR']
+    if not os.path.isdir(directory):
+        return
+    with directory_lock(directory):
+        for file_name in os.listdir(directory):
+            if file_name.endswith('.json'):
+                os.remove(os.path.join(directory, file_name))
+
+
+class ProfilingMiddleware:
+    """Профиль запроса под cProfile или по снимкам стеков."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        options = settings.PROFILING
+        if not options['ENABLED']:
+            return self.get_response(request)
+        if random.random() < options['SAMPLE_RATE']:
+            return self.profile(request)
+        if options['SLOW_THRESHOLD'] is None:
+            return self.get_response(request)
+        thread_id = threading.get_ident()
+        sampler.start(thread_id)
+        started = perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            duration = perf_counter() - started
+            samples = sampler.stop(thread_id)
+        if duration >= options['SLOW_THRESHOLD']:
+            self.save(
+                request, response, 'sampler', duration,
+                sampler.frames(samples), samples=samples['count']
+            )
+        return response
+
+    def profile(self, request):
+        profile = cProfile.Profile()
+        started = perf_counter()
+        profile.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profile.disable()
+        duration = perf_counter() - started
+        self.save(
+            request, response, 'cprofile', duration, profile_frames(profile)
+        )
+        return response
+
+    @staticmethod
+    def save(request, response, kind, duration, frames, **extra):
+        route = get_route_label(request)
+        save_profile(route, {
+            'route': route,
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'kind': kind,
+            'duration': duration,
+            'captured': time.time(),
+            'frames': frames,
+            **extra,
+        })
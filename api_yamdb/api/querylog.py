@@ -0,0 +1,183 @@
+"""Учёт SQL-запросов запроса API: бюджет и поиск N+1.
+
+`QueryLog` подключается к соединениям через `execute_wrapper` и
+запоминает каждый запрос с его «отпечатком» — текстом без литералов,
+чисел и списков значений. Много запросов с одинаковым отпечатком за один
+запрос API — верный признак N+1.
+
+`QueryBudgetMiddleware` сверяет число запросов с `query_budget` вьюсета
+и ищет N+1. В бою нарушения пишутся в лог `api.querylog`, а при
+`QUERY_BUDGET['RAISE'] = True` (так настроены тесты) вызывают
+`QueryBudgetExceeded`.
+"""
+import logging
+import re
+from collections import Counter, namedtuple
+from contextlib import ExitStack, contextmanager
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+Query = namedtuple('Query', ('sql', 'params', 'many', 'duration'))
+
+# Служебные команды транзакций не бывают N+1 и не входят в бюджет: их
+# число зависит от того, вложен ли запрос во внешнюю транзакцию.
+SERVICE_SQL_RE = re.compile(
+    r'^\s*(BEGIN|COMMIT|ROLLBACK|SAVEPOINT|RELEASE)\b', re.IGNORECASE
+)
+FINGERPRINT_RULES = (
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'%s'), '?'),
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(...)'),
+    (re.compile(r'\s+'), ' '),
+)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def fingerprint(sql):
+    """Форма запроса: без литералов, чисел и длины списков IN (...)."""
+
+    for pattern, replacement in FINGERPRINT_RULES:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+class QueryLog:
+    """Запросы, выполненные, пока журнал подключён к соединениям."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append(
+                Query(sql, params, many, perf_counter() - started)
+            )
+
+    @contextmanager
+    def capture(self, using=None):
+        """Подключает журнал к соединению using или ко всем соединениям."""
+
+        aliases = [using] if using else list(connections)
+        with ExitStack() as stack:
+            for alias in aliases:
+                stack.enter_context(
+                    connections[alias].execute_wrapper(self)
+                )
+            yield self
+
+    @property
+    def count(self):
+        return sum(
+            1 for query in self.queries if not SERVICE_SQL_RE.match(query.sql)
+        )
+
+    @property
+    def duration(self):
+        return sum(query.duration for query in self.queries)
+
+    def repeated(self, threshold=None):
+        """Отпечатки, встретившиеся не меньше threshold раз, и их число."""
+
+        if threshold is None:
+            threshold = settings.QUERY_BUDGET['N_PLUS_ONE_THRESHOLD']
+        shapes = Counter(
+            fingerprint(query.sql) for query in self.queries
+            if not SERVICE_SQL_RE.match(query.sql)
+        )
+        return {
+            shape: count for shape, count in shapes.items()
+            if count >= threshold
+        }
+
+    def problems(self, budget=None, threshold=None):
+        """Описания нарушений: превышение бюджета и повторы запросов."""
+
+        problems = []
+        if budget is not None and self.count > budget:
+            problems.append(
+                f'{self.count} запросов при бюджете {budget}'
+            )
+        for shape, count in self.repeated(threshold).items():
+            problems.append(f'N+1: {count} раз {shape}')
+        return problems
+
+
+@contextmanager
+def request_query_log(request):
+    """Журнал SQL-запросов запроса API, общий для всех middleware.
+
+    Первый middleware подключает журнал к соединениям, остальные
+    получают уже подключённый через `request.query_log`.
+    """
+
+    query_log = getattr(request, 'query_log', None)
+    if query_log is not None:
+        yield query_log
+        return
+    query_log = request.query_log = QueryLog()
+    with query_log.capture():
+        yield query_log
+
+
+def get_view_budget(view_func, method):
+    """Имя вьюсета с действием и бюджет запросов для него."""
+
+    view_class = getattr(view_func, 'cls', None)
+    if view_class is None:
+        return getattr(view_func, '__name__', repr(view_func)), None
+    actions = getattr(view_func, 'actions', None) or {}
+    action = actions.get(method.lower(), method.lower())
+    budget = getattr(view_class, 'query_budget', None)
+    if isinstance(budget, dict):
+        budget = budget.get(action)
+    return f'{view_class.__name__}.{action}', budget
+
+
+class QueryBudgetMiddleware:
+    """Проверка бюджета запросов и N+1 для каждого запроса API."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.QUERY_BUDGET['ENABLED']:
+            return self.get_response(request)
+        with request_query_log(request) as query_log:
+            response = self.get_response(request)
+        view_name, budget = getattr(
+            request, 'query_budget', (request.path, None)
+        )
+        problems = query_log.problems(budget)
+        if problems:
+            message = (
+                f'{request.method} {request.path} ({view_name}): '
+                + '; '.join(problems)
+            )
+            if settings.QUERY_BUDGET['RAISE']:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = get_view_budget(view_func, request.method)
+
+
+@contextmanager
+def assert_max_queries(budget=None, threshold=None, using=None):
+    """Тестовая проверка: не больше budget запросов и ни одного N+1."""
+
+    with QueryLog().capture(using) as query_log:
+        yield query_log
+    problems = query_log.problems(budget, threshold)
+    assert not problems, '; '.join(problems)
@@ -0,0 +1,137 @@
+"""Быстрый JSON-рендерер с готовыми фрагментами.
+
+`FastJSONRenderer` кодирует ответ через orjson, если он установлен:
+даты, время и UUID orjson пишет сам, остальные типы (Decimal, ленивые
+строки, QuerySet) проходят через кодировщик DRF. Без orjson используется
+json из стандартной библиотеки с теми же настройками, что у JSONRenderer,
+поэтому в обоих случаях ответ совпадает с ответом JSONRenderer до байта.
+Исключение — NaN и бесконечность: JSONRenderer на них вызывает
+ValueError, а orjson пишет null. Данные не проверяются на каждый ответ:
+чисел с плавающей точкой в ответах API нет, рейтинг отдаётся целым, и
+NaN или бесконечность не прошли бы уже сериализатор.
+
+`Fragment` — уже закодированный JSON, например категория или жанр,
+вложенные в произведение (см. api.fast_serializers). Рендерер вставляет
+его в ответ как есть. При отступах (`Accept: application/json; indent=4`,
+Browsable API) и настройках DRF, отличных от компактного UTF-8, ответ
+собирает обычный JSONRenderer, а фрагменты раскодируются.
+"""
+import json
+from uuid import uuid4
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # orjson необязателен: pip install orjson
+    orjson = None
+
+# Фрагменты при кодировании заменяются этой строкой, а затем подставляются
+# на место её JSON-представления по порядку. Строка начинается с NUL,
+# а кавычка внутри строк JSON всегда экранирована, поэтому данные ответа
+# не могут дать такую же последовательность байтов.
+PLACEHOLDER = f'\x00fragment:{uuid4().hex}'
+ENCODED_PLACEHOLDER = json.dumps(PLACEHOLDER).encode()
+LINE_SEPARATORS = (
+    ('\u2028'.encode(), b'\\u2028'),
+    ('\u2029'.encode(), b'\\u2029'),
+)
+if orjson is not None:
+    ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z
+
+
+class Fragment:
+    """Готовый JSON (bytes), который вставляется в ответ без кодирования."""
+
+    __slots__ = ('contents',)
+
+    def __init__(self, contents):
+        self.contents = contents
+
+    def __repr__(self):
+        return f'Fragment({self.contents!r})'
+
+
+class FragmentJSONEncoder(JSONEncoder):
+    """Кодировщик DRF, который раскодирует фрагменты."""
+
+    def default(self, obj):
+        if isinstance(obj, Fragment):
+            return json.loads(obj.contents)
+        return super().default(obj)
+
+
+_encoder = JSONEncoder()
+
+
+def encode_orjson(data, default):
+    """JSON от orjson или None, если его должен закодировать json."""
+
+    try:
+        return orjson.dumps(data, default=default, option=ORJSON_OPTIONS)
+    except orjson.JSONEncodeError:
+        return None
+
+
+def encode(data):
+    """Компактный UTF-8 JSON как у JSONRenderer с подставленными фрагментами.
+
+    Данные, с которыми orjson не справился (например, целое больше 64 бит),
+    кодируются json.
+    """
+
+    fragments = []
+
+    def default(obj):
+        if isinstance(obj, Fragment):
+            fragments.append(obj.contents)
+            return PLACEHOLDER
+        return _encoder.default(obj)
+
+    content = None
+    if orjson is not None:
+        content = encode_orjson(data, default)
+        if content is None:
+            fragments.clear()
+    if content is None:
+        content = json.dumps(
+            data, default=default, ensure_ascii=False, allow_nan=False,
+            separators=(',', ':')
+        ).encode()
+    # Как и JSONRenderer, экранируем разделители строк: ответ остаётся
+    # подмножеством JavaScript. Фрагменты уже экранированы.
+    for separator, escaped in LINE_SEPARATORS:
+        content = content.replace(separator, escaped)
+    if fragments:
+        content = splice(content, fragments)
+    return content
+
+
+def splice(content, fragments):
+    parts = content.split(ENCODED_PLACEHOLDER)
+    result = [parts[0]]
+    for fragment, part in zip(fragments, parts[1:]):
+        result.append(fragment)
+        result.append(part)
+    return b''.join(result)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer на orjson с поддержкой готовых фрагментов."""
+
+    encoder_class = FragmentJSONEncoder
+    # Просить ли у вьюсетов фрагменты вместо вложенных словарей. Вставить
+    # фрагменты рендерер может всегда, но orjson кодирует небольшой словарь
+    # быстрее, чем вызывает default для фрагмента (см. benchmark_renderers),
+    # так что выигрыш от них есть только с json.
+    supports_fragments = orjson is None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent is not None or not self.compact or self.ensure_ascii:
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        return encode(data)
@@ -1,8 +1,9 @@
 from django.contrib.auth import get_user_model
-from django.shortcuts import get_object_or_404
+from django.db import IntegrityError
 
 from rest_framework import serializers
-from rest_framework.relations import SlugRelatedField
+from rest_framework.relations import MANY_RELATION_KWARGS, SlugRelatedField
+from rest_framework.settings import api_settings
 from rest_framework.validators import ValidationError
 
 from reviews.models import Category, Comment, Genre, Review, Title
@@ -14,6 +15,11 @@ class CommentSerializer(serializers.ModelSerializer):
 
     author = SlugRelatedField(slug_field='username', read_only=True)
 
+    def create(self, validated_data):
+        # Отзыв уже найден вьюсетом по URL (NestedParentMixin).
+        validated_data['review'] = self.context['parent']
+        return super().create(validated_data)
+
     class Meta:
         model = Comment
         fields = (
@@ -29,6 +35,19 @@ class CommentSerializer(serializers.ModelSerializer):
         )
 
 
+def is_duplicate_review(error):
+    """Нарушено ли ограничение unique_author_title.
+
+    PostgreSQL и MySQL называют ограничение, SQLite перечисляет колонки.
+    """
+
+    message = str(error)
+    return 'unique_author_title' in message or (
+        'reviews_review.author_id' in message
+        and 'reviews_review.title_id' in message
+    )
+
+
 class ReviewSerializer(serializers.ModelSerializer):
 
     title = serializers.SlugRelatedField(
@@ -47,23 +66,27 @@ class ReviewSerializer(serializers.ModelSerializer):
             )
         return value
 
-    def validate(self, data):
-        request = self.context['request']
-        title_id = self.context.get('view').kwargs.get('title_id')
-        title = get_object_or_404(Title, pk=title_id)
-        author = request.user
-        if (
-            request.method == 'POST'
-            and Review.objects.filter(title=title, author=author).exists()
-        ):
-            raise ValidationError(
-                'Можно оставить только один отзыв на произведение'
-            )
-        return data
+    def create(self, validated_data):
+        # Повторный отзыв отсекает ограничение unique_author_title: вставка
+        # идёт сразу, без предварительной проверки, и не зависит от гонки
+        # параллельных запросов. Рейтинг обновляется в той же транзакции
+        # (Review.save) и при ошибке откатывается вместе со вставкой.
+        # Произведение уже найдено вьюсетом по URL (NestedParentMixin).
+        validated_data['title'] = self.context['parent']
+        try:
+            return super().create(validated_data)
+        except IntegrityError as error:
+            if not is_duplicate_review(error):
+                raise
+            raise ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    'Можно оставить только один отзыв на произведение'
+                ]
+            })
 
     class Meta:
         model = Review
-        fields = '__all__'
+        exclude = ('modified',)
         read_only_fields = (
             'id',
             'pub_date',
@@ -75,14 +98,14 @@ class CategorySerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Category
-        exclude = ('id',)
+        exclude = ('id', 'modified')
 
 
 class GenreSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Genre
-        exclude = ('id',)
+        exclude = ('id', 'modified')
 
 
 class TitleSerializer(serializers.ModelSerializer):
@@ -93,12 +116,50 @@ class TitleSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Title
-        fields = '__all__'
+        exclude = ('rating_sum', 'review_count', 'modified')
+
+
+class SlugListField(serializers.ManyRelatedField):
+    """Список объектов по slug одним запросом, а не запросом на каждый."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        child = self.child_relation
+        if not all(isinstance(slug, (str, int)) for slug in data):
+            child.fail('invalid')
+        slugs = [str(slug) for slug in data]
+        objects = {
+            getattr(obj, child.slug_field): obj
+            for obj in child.get_queryset().filter(
+                **{f'{child.slug_field}__in': slugs}
+            )
+        }
+        for slug in slugs:
+            if slug not in objects:
+                child.fail(
+                    'does_not_exist', slug_name=child.slug_field, value=slug
+                )
+        return [objects[slug] for slug in slugs]
+
+
+class BatchSlugRelatedField(SlugRelatedField):
+    """SlugRelatedField, который с many=True ищет все объекты разом."""
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return SlugListField(**list_kwargs)
 
 
 class TitleWriteSerializer(serializers.ModelSerializer):
 
-    genre = serializers.SlugRelatedField(
+    genre = BatchSlugRelatedField(
         slug_field='slug',
         many=True,
         queryset=Genre.objects.all()
@@ -110,7 +171,7 @@ class TitleWriteSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Title
-        fields = '__all__'
+        exclude = ('rating', 'rating_sum', 'review_count', 'modified')
 
     def validate(self, value):
         if Title.objects.filter(
@@ -0,0 +1,26 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import forget_token_version, user_cache
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_cache(sender, instance, **kwargs):
+    # Сбрасываем и сразу, и после фиксации: запрос, прочитавший строку
+    # до фиксации, мог успеть положить в кеш старые данные.
+    pk = instance.pk
+    user_cache.invalidate(pk)
+    transaction.on_commit(lambda: user_cache.invalidate(pk))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_token_version(sender, instance, **kwargs):
+    # Следующая проверка токена прочитает версию из базы.
+    pk = instance.pk
+    transaction.on_commit(lambda: forget_token_version(pk))
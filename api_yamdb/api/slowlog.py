@@ -0,0 +1,164 @@
+"""Журнал медленных SQL-запросов.
+
+`SlowQueryMiddleware` подключает к соединениям `SlowQueryLog`, который
+запоминает запросы дольше `SLOW_QUERY['THRESHOLD']` секунд вместе с
+местом в коде проекта, откуда они выполнены. После ответа каждый такой
+запрос пишется в лог `api.slowlog`: форма запроса (см.
+`querylog.fingerprint`), параметры без значений строк, время, вьюсет с
+действием и строка кода. Поля записи лежат в `extra`.
+
+Для каждой новой формы медленного запроса один раз на процесс
+выполняется EXPLAIN (в SQLite — EXPLAIN QUERY PLAN), и план попадает в
+запись лога: по нему видно полные просмотры таблиц без индекса.
+EXPLAIN выполняется после ответа, когда журналы остальных middleware уже
+отключены, и не попадает в их счётчики.
+"""
+import logging
+import os
+import sys
+import threading
+from collections import namedtuple
+from datetime import date, datetime, time
+from decimal import Decimal
+from time import perf_counter
+
+from django.conf import settings
+from django.db import DatabaseError, NotSupportedError, connections
+
+from .querylog import QueryLog, fingerprint, get_view_budget
+
+logger = logging.getLogger(__name__)
+
+SlowQuery = namedtuple(
+    'SlowQuery', ('using', 'sql', 'params', 'many', 'duration', 'frame')
+)
+
+# Параметры этих типов не содержат пользовательских данных и пишутся
+# в лог как есть, остальные заменяются названием типа.
+PLAIN_PARAM_TYPES = (bool, int, float, Decimal, date, datetime, time)
+# Модули инструментирования, которые не считаются местом вызова.
+INSTRUMENTATION_MODULES = frozenset((
+    __name__, 'api.querylog', 'api.timing', 'api.metrics', 'api.profiling',
+))
+
+_plans = {}
+_plans_lock = threading.Lock()
+
+
+def redact(params):
+    """Параметры запроса без строк и других возможных личных данных."""
+
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {name: redact_value(value) for name, value in params.items()}
+    return [redact_value(value) for value in params]
+
+
+def redact_value(value):
+    if value is None or isinstance(value, PLAIN_PARAM_TYPES):
+        return value
+    return f'<{type(value).__name__}>'
+
+
+def app_frame():
+    """Ближайшая к запросу строка кода проекта: `api/views.py:10 (list)`."""
+
+    base_dir = settings.BASE_DIR + os.sep
+    frame = sys._getframe(1)
+    while frame is not None:
+        file_name = frame.f_code.co_filename
+        if (
+            file_name.startswith(base_dir)
+            and 'site-packages' not in file_name
+            and frame.f_globals.get('__name__') not in INSTRUMENTATION_MODULES
+        ):
+            return (
+                f'{os.path.relpath(file_name, settings.BASE_DIR)}:'
+                f'{frame.f_lineno} ({frame.f_code.co_name})'
+            )
+        frame = frame.f_back
+    return None
+
+
+class SlowQueryLog(QueryLog):
+    """Запросы дольше threshold секунд с местом вызова."""
+
+    def __init__(self, threshold):
+        super().__init__()
+        self.threshold = threshold
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = perf_counter() - started
+            if duration >= self.threshold:
+                self.queries.append(SlowQuery(
+                    context['connection'].alias, sql, params, many,
+                    duration, app_frame()
+                ))
+
+
+def explain(query, shape):
+    """План запроса; для каждой формы строится один раз на процесс."""
+
+    if query.many or not shape.upper().startswith('SELECT'):
+        return None
+    if shape in _plans:
+        return _plans[shape]
+    connection = connections[query.using]
+    try:
+        prefix = connection.ops.explain_query_prefix()
+        with connection.cursor() as cursor:
+            cursor.execute(f'{prefix} {query.sql}', query.params)
+            plan = '\n'.join(str(row[-1]) for row in cursor.fetchall())
+    except (DatabaseError, NotSupportedError) as error:
+        plan = f'EXPLAIN не выполнен: {error}'
+    with _plans_lock:
+        if len(_plans) >= settings.SLOW_QUERY['MAX_PLANS']:
+            _plans.clear()
+        _plans[shape] = plan
+    return plan
+
+
+def log_query(query, view_name):
+    shape = fingerprint(query.sql)
+    fields = {
+        'view': view_name,
+        'frame': query.frame,
+        'duration_ms': round(query.duration * 1000, 2),
+        'sql': shape,
+        'params': redact(query.params),
+        'plan': explain(query, shape) if settings.SLOW_QUERY['EXPLAIN']
+        else None,
+    }
+    message = '%.1f ms %s (%s): %s'
+    args = [fields['duration_ms'], view_name, query.frame, shape]
+    if fields['plan']:
+        message += '\n%s'
+        args.append(fields['plan'])
+    logger.warning(message, *args, extra=fields)
+
+
+class SlowQueryMiddleware:
+    """Журнал медленных SQL-запросов с вьюсетом и местом вызова."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        options = settings.SLOW_QUERY
+        if not options['ENABLED']:
+            return self.get_response(request)
+        slow_log = SlowQueryLog(options['THRESHOLD'])
+        with slow_log.capture():
+            response = self.get_response(request)
+        view_name = getattr(request, 'view_name', request.path)
+        for query in slow_log.queries:
+            log_query(query, view_name)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.view_name, _ = get_view_budget(view_func, request.method)
@@ -0,0 +1,95 @@
+"""Заголовок Server-Timing и журнал времени обработки запросов.
+
+`ServerTimingMiddleware` измеряет общее время запроса, время и число
+SQL-запросов (тот же `QueryLog`, что и у бюджета запросов), время
+сериализации (`SerializerTimingMixin` во вьюсетах) и время рендеринга
+ответа. Итог уходит в заголовок `Server-Timing` и в лог `api.timing`:
+поля записи (route, method, status, total_ms и т.д.) лежат в `extra`,
+их забирает любой структурный форматтер.
+
+Время сериализации включает SQL-запросы, выполненные во время неё,
+поэтому части не обязаны складываться в общее время.
+"""
+import logging
+from time import perf_counter
+
+from django.conf import settings
+
+from .querylog import request_query_log
+
+logger = logging.getLogger(__name__)
+
+TIMINGS = ('serialize', 'render')
+
+
+def add_timing(request, name, duration):
+    """Прибавляет duration секунд к метрике name текущего запроса."""
+
+    request = getattr(request, '_request', request)
+    timings = getattr(request, 'timings', None)
+    if timings is not None:
+        timings[name] = timings.get(name, 0) + duration
+
+
+def timing_enabled(request):
+    request = getattr(request, '_request', request)
+    return getattr(request, 'timings', None) is not None
+
+
+def get_route(request):
+    """Имя маршрута из router_v1 (например, titles-list) или путь."""
+
+    match = getattr(request, 'resolver_match', None)
+    if match is None or not match.url_name:
+        return request.path
+    return match.url_name
+
+
+class ServerTimingMiddleware:
+    """Метрики времени запроса в Server-Timing и в лог."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.SERVER_TIMING:
+            return self.get_response(request)
+        request.timings = {}
+        started = perf_counter()
+        with request_query_log(request) as query_log:
+            response = self.get_response(request)
+        total = perf_counter() - started
+
+        fields = {
+            'route': get_route(request),
+            'method': request.method,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 2),
+            'db_ms': round(query_log.duration * 1000, 2),
+            'queries': query_log.count,
+        }
+        metrics = [
+            f'total;dur={fields["total_ms"]}',
+            f'db;dur={fields["db_ms"]};desc="{query_log.count} queries"',
+        ]
+        for name in TIMINGS:
+            if name in request.timings:
+                fields[f'{name}_ms'] = round(request.timings[name] * 1000, 2)
+                metrics.append(f'{name};dur={fields[f"{name}_ms"]}')
+        response['Server-Timing'] = ', '.join(metrics)
+        logger.info(
+            '%s %s %s %.1f ms', request.method, fields['route'],
+            response.status_code, fields['total_ms'], extra=fields
+        )
+        return response
+
+    def process_template_response(self, request, response):
+        # Ответ DRF рендерится сразу после этого вызова.
+        if getattr(request, 'timings', None) is not None:
+            started = perf_counter()
+            response.add_post_render_callback(
+                lambda response: add_timing(
+                    request, 'render', perf_counter() - started
+                )
+            )
+        return response
@@ -20,9 +20,8 @@ router_v1.register(
 router_v1.register(
     'titles/(?P<title_id>\\d+)/reviews/(?P<review_id>\\d+)/comments',
     CommentViewSet,
-    basename='reviews'
+    basename='comments'
 )
-router_v1.register('titles', TitleViewSet)
 router_v1.register('users', UsersViewSet, basename='users')
 router_v1.register('categories', CategoryViewSet, basename='categories')
 router_v1.register('genres', GenreViewSet, basename='genres')
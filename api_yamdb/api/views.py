@@ -1,9 +1,7 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth.tokens import default_token_generator
-
-from django.core.mail import send_mail
-
-from django.db.models import Avg
+from django.db import transaction
+from django.db import transaction
 
 from django_filters.rest_framework import DjangoFilterBackend
 
@@ -14,12 +12,19 @@ from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
 
-from api.filters import TitleFilter
+from api.filters import IndexSearchFilter, TitleFilter
+from reviews.autocomplete import title_prefix_index
 from reviews.models import Category, Genre, Review, Title
-
-from .mixin import ModelMixinSet
+from reviews.search import category_index, genre_index, title_index
+from users.outbox import enqueue_email
+
+from .authentication import access_token_for, resolve_user
+from .cache import get_versions
+from .mixin import (ConditionalGetMixin, KeysetPaginationMixin,
+                    ModelMixinSet, NestedParentMixin,
+                    OptimizedQuerysetMixin, SerializerTimingMixin,
+                    ValuesListMixin)
 from .permissions import (AdminOnlyPermission, IsAdminOrReadOnlyPermission,
                           ModeratePermission)
 from .serializers import (CategorySerializer, CommentSerializer,
@@ -31,54 +36,143 @@ from .serializers import (CategorySerializer, CommentSerializer,
 User = get_user_model()
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(ConditionalGetMixin, KeysetPaginationMixin,
+                     NestedParentMixin, OptimizedQuerysetMixin,
+                     SerializerTimingMixin, ValuesListMixin,
+                     viewsets.ModelViewSet):
     """API для работы с комментариями к отзывам."""
 
     serializer_class = CommentSerializer
     pagination_class = PageNumberPagination
     permission_classes = (ModeratePermission,)
+    # Бюджеты учитывают запрос пользователя при промахе кеша
+    # аутентификации (api.authentication).
+    query_budget = {
+        'list': 4, 'retrieve': 3, 'create': 4,
+        'update': 5, 'partial_update': 5, 'destroy': 5,
+    }
+    parent_queryset = Review.objects.all()
+    parent_lookups = (('pk', 'review_id'), ('title_id', 'title_id'))
+
+    def get_list_validator(self):
+        # Любое изменение комментария обновляет `modified` отзыва.
+        return self.parent_validator()
+
+    get_object_validator = get_list_validator
 
     def get_queryset(self):
-        review = get_object_or_404(Review, id=self.kwargs.get('review_id'))
-        return review.comments.all()
+        return self.get_parent().comments.all()
 
     def perform_create(self, serializer):
-        review = get_object_or_404(Review, id=self.kwargs.get('review_id'))
-        serializer.save(author=self.request.user, review=review)
+        serializer.save(author=resolve_user(self.request))
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(ConditionalGetMixin, KeysetPaginationMixin,
+                    NestedParentMixin, OptimizedQuerysetMixin,
+                    SerializerTimingMixin, ValuesListMixin,
+                    viewsets.ModelViewSet):
     """API для работы с отзывами."""
 
     serializer_class = ReviewSerializer
     pagination_class = PageNumberPagination
     permission_classes = (ModeratePermission,)
+    query_budget = {
+        'list': 4, 'retrieve': 4, 'create': 5,
+        'update': 5, 'partial_update': 5, 'destroy': 6,
+    }
+    parent_queryset = Title.objects.all()
+    parent_lookups = (('pk', 'title_id'),)
+
+    def get_list_validator(self):
+        # Любое изменение отзыва обновляет `modified` произведения.
+        return self.parent_validator()
+
+    def get_object_validator(self):
+        return self.modified_validator(Review.objects.filter(
+            pk=self.kwargs.get('pk'),
+            title_id=self.kwargs.get('title_id')
+        ))
 
     def get_queryset(self):
-        title = get_object_or_404(Title, id=self.kwargs.get('title_id'))
-        return title.reviews.all()
+        return self.get_parent().reviews.all()
 
     def perform_create(self, serializer):
-        title = get_object_or_404(Title, id=self.kwargs.get('title_id'))
-        serializer.save(author=self.request.user, title=title)
+        serializer.save(author=resolve_user(self.request))
 
 
-class TitleViewSet(viewsets.ModelViewSet):
+class TitleViewSet(ConditionalGetMixin, OptimizedQuerysetMixin,
+                   SerializerTimingMixin, ValuesListMixin,
+                   viewsets.ModelViewSet):
     """API для произведений."""
 
-    queryset = Title.objects.annotate(
-        rating=Avg('reviews__score')
-    ).all().order_by('name')
+    queryset = Title.objects.all().order_by('name')
     pagination_class = PageNumberPagination
     permission_classes = (IsAdminOrReadOnlyPermission,)
-    filter_backends = [DjangoFilterBackend]
+    # Во все бюджеты входит запрос пользователя при промахе кеша
+    # аутентификации. Чтение: версии для ETag, count и страница или
+    # произведение, жанры одним prefetch; подсказки — версия индекса и
+    # догрузка изменённых названий. Запись: жанры одним запросом,
+    # категория, проверка дубликата, сама запись, сравнение и запись
+    # жанров, одна переиндексация поиска после фиксации (4 запроса) и
+    # ответ с жанрами.
+    query_budget = {
+        'list': 5, 'retrieve': 5, 'autocomplete': 3,
+        'create': 12, 'update': 14, 'partial_update': 14, 'destroy': 8,
+    }
+    filter_backends = [DjangoFilterBackend, IndexSearchFilter]
     filterset_class = TitleFilter
+    search_index = title_index
+    autocomplete_limit = 10
+    autocomplete_max_limit = 50
 
     def get_serializer_class(self):
         if self.request.method in ('POST', 'PATCH'):
             return TitleWriteSerializer
         return TitleSerializer
 
+    def get_related_versions(self):
+        # Названия категорий и жанров входят в ответ по произведению.
+        return ':'.join(get_versions(Category, Genre))
+
+    def get_list_validator(self):
+        return ':'.join(get_versions(Title, Category, Genre))
+
+    def get_object_validator(self):
+        validator = self.modified_validator(
+            Title.objects.filter(pk=self.kwargs.get('pk'))
+        )
+        if validator is None:
+            return None
+        return f'{validator}:{self.get_related_versions()}'
+
+    def perform_create(self, serializer):
+        # Произведение и жанры — одна транзакция: поиск переиндексируется
+        # один раз после её фиксации (reviews.signals).
+        with transaction.atomic():
+            serializer.save()
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            serializer.save()
+
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        """Подсказки по началу названия из индекса в памяти: `?q=`."""
+
+        try:
+            limit = min(
+                int(request.query_params['limit']),
+                self.autocomplete_max_limit
+            )
+        except (KeyError, ValueError):
+            limit = self.autocomplete_limit
+        suggestions = title_prefix_index.search(
+            request.query_params.get('q', ''), max(limit, 1)
+        )
+        return Response([
+            {'id': pk, 'name': name} for pk, name in suggestions
+        ])
+
 
 class CategoryViewSet(ModelMixinSet):
     """API для категорий."""
@@ -87,8 +181,15 @@ class CategoryViewSet(ModelMixinSet):
     serializer_class = CategorySerializer
     pagination_class = PageNumberPagination
     permission_classes = (IsAdminOrReadOnlyPermission,)
-    filter_backends = [filters.SearchFilter]
-    search_fields = ('name', )
+    # Плюс запрос пользователя. Список: версия, count, страница. Создание:
+    # проверка slug, прежнее имя для индекса, запись и переиндексация
+    # (3 запроса). Удаление: поиск, произведения категории дважды (для
+    # удаления и для индекса), сброс категории у них, удаление, удаление
+    # из индекса и переиндексация произведений (4 запроса) одним проходом
+    # после фиксации.
+    query_budget = {'list': 4, 'create': 7, 'destroy': 10}
+    filter_backends = [IndexSearchFilter]
+    search_index = category_index
     lookup_field = 'slug'
 
 
@@ -99,18 +200,26 @@ class GenreViewSet(ModelMixinSet):
     serializer_class = GenreSerializer
     pagination_class = PageNumberPagination
     permission_classes = (IsAdminOrReadOnlyPermission,)
-    filter_backends = [filters.SearchFilter]
-    search_fields = ('name', )
+    # Как у категорий, но при удалении вместо сброса категории
+    # удаляются связи с произведениями.
+    query_budget = {'list': 4, 'create': 7, 'destroy': 10}
+    filter_backends = [IndexSearchFilter]
+    search_index = genre_index
     lookup_field = 'slug'
 
 
-class UsersViewSet(viewsets.ModelViewSet):
+class UsersViewSet(OptimizedQuerysetMixin, SerializerTimingMixin,
+                   viewsets.ModelViewSet):
     """API для работы пользователями."""
 
     queryset = User.objects.all()
     serializer_class = UserSerializer
     pagination_class = PageNumberPagination
     permission_classes = (IsAuthenticated, AdminOnlyPermission,)
+    query_budget = {
+        'list': 3, 'retrieve': 2, 'create': 4, 'update': 4,
+        'partial_update': 4, 'destroy': 9, 'me': 2,
+    }
     filter_backends = [filters.SearchFilter]
     search_fields = ('username',)
     lookup_field = 'username'
@@ -121,7 +230,7 @@ class UsersViewSet(viewsets.ModelViewSet):
         """Запрос информации пользователя о себе, редактирование профиля
          пользователя."""
 
-        user = request.user
+        user = resolve_user(request)
         if request.method == 'GET':
             serializer = UserSerializer(user)
             return Response(serializer.data, status=status.HTTP_200_OK)
@@ -139,10 +248,10 @@ class UsersViewSet(viewsets.ModelViewSet):
 
 
 def send_email(username, email, code):
-    """Отправка письма с кодом подтверждения на почту регистрируемому
-    пользователю."""
+    """Постановка в очередь письма с кодом подтверждения для
+    регистрируемого пользователя."""
 
-    send_mail(
+    enqueue_email(
         'Подтверждение регистрации на сайте yamdb.',
         (f'Для получения токена и подтверждения регистрации сделайте '
          f'post-запрос со следующими параметрами:\n'
@@ -150,7 +259,6 @@ def send_email(username, email, code):
          f'confirmation_code: {code}'),
         'noreply@api_yamdb.com',
         [email],
-        fail_silently=False,
     )
 
 
@@ -190,6 +298,6 @@ def create_token(request):
         token=confirmation_code
     )
     if is_token_ok:
-        token = RefreshToken.for_user(user).access_token
+        token = access_token_for(user)
         return Response({'token': str(token)}, status=status.HTTP_200_OK)
     return Response(status=status.HTTP_400_BAD_REQUEST)
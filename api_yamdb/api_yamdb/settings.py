@@ -1,4 +1,5 @@
 import os
+import tempfile
 from datetime import timedelta
 
 from dotenv import load_dotenv
@@ -35,6 +36,11 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'api.slowlog.SlowQueryMiddleware',
+    'api.metrics.MetricsMiddleware',
+    'api.timing.ServerTimingMiddleware',
+    'api.querylog.QueryBudgetMiddleware',
+    'api.profiling.ProfilingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -75,6 +81,99 @@ DATABASES = {
 }
 
 
+# Cache
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'yamdb'),
+    }
+}
+
+# Время жизни закешированных списков категорий и жанров, секунды.
+LIST_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Бюджет SQL-запросов вьюсетов и поиск N+1 (api.querylog): N+1 — это
+# не меньше N_PLUS_ONE_THRESHOLD запросов одной формы за запрос API.
+# При RAISE нарушение прерывает запрос исключением, иначе пишется в лог.
+QUERY_BUDGET = {
+    'ENABLED': os.getenv('QUERY_BUDGET_ENABLED', 'True') == 'True',
+    'RAISE': False,
+    'N_PLUS_ONE_THRESHOLD': 5,
+}
+
+# list произведений, отзывов, комментариев, категорий и жанров без
+# экземпляров моделей: кортежи values_list() и api.fast_serializers.
+VALUES_LIST_READ = os.getenv('VALUES_LIST_READ', 'True') == 'True'
+
+# Журнал SQL-запросов дольше THRESHOLD секунд (лог api.slowlog) с планом
+# EXPLAIN для каждой новой формы запроса; планы MAX_PLANS форм хранятся
+# в памяти процесса.
+SLOW_QUERY = {
+    'ENABLED': os.getenv('SLOW_QUERY_ENABLED', 'True') == 'True',
+    'THRESHOLD': float(os.getenv('SLOW_QUERY_THRESHOLD', '0.1')),
+    'EXPLAIN': True,
+    'MAX_PLANS': 1000,
+}
+
+# Заголовок Server-Timing и запись о времени запроса в лог api.timing.
+SERVER_TIMING = os.getenv('SERVER_TIMING', str(DEBUG)) == 'True'
+
+# Метрики Prometheus на /metrics (api.metrics). Каждый процесс пишет свои
+# метрики в файл в каталоге DIR не реже раза в FLUSH_INTERVAL секунд;
+# файлы завершённых процессов складываются в один при сборе. /metrics
+# доступен адресам ALLOWED_IPS, по токену TOKEN и администраторам.
+METRICS = {
+    'ENABLED': os.getenv('METRICS_ENABLED', 'True') == 'True',
+    'DIR': os.getenv(
+        'METRICS_DIR', os.path.join(tempfile.gettempdir(), 'yamdb_metrics')
+    ),
+    'FLUSH_INTERVAL': 5,
+    'TOKEN': os.getenv('METRICS_TOKEN', ''),
+    'ALLOWED_IPS': tuple(
+        ip for ip in os.getenv('METRICS_ALLOWED_IPS', '').split(',') if ip
+    ),
+}
+
+# Профили запросов (api.profiling): доля SAMPLE_RATE запросов
+# профилируется cProfile, у остальных запросов дольше SLOW_THRESHOLD секунд
+# сохраняются снимки стеков. В каталоге DIR хранится KEEP самых медленных
+# профилей каждого маршрута за TIMEOUT секунд по TOP_FRAMES функций; их
+# показывает profile_report. SLOW_THRESHOLD = None отключает снимки стеков.
+PROFILING = {
+    'ENABLED': os.getenv('PROFILING_ENABLED', 'False') == 'True',
+    'SAMPLE_RATE': float(os.getenv('PROFILING_SAMPLE_RATE', '0.001')),
+    'SLOW_THRESHOLD': float(os.getenv('PROFILING_SLOW_THRESHOLD', '1.0')),
+    'DIR': os.getenv(
+        'PROFILING_DIR', os.path.join(tempfile.gettempdir(), 'yamdb_profiles')
+    ),
+    'SAMPLER_INTERVAL': 0.005,
+    'TOP_FRAMES': 25,
+    'KEEP': 10,
+    'TIMEOUT': 60 * 60 * 24 * 7,
+}
+
+# Подсказки по названиям (reviews.autocomplete): индекс процесса сверяется
+# с базой не чаще раза в SYNC_INTERVAL секунд и пересобирается, когда
+# изменений накопилось больше COMPACT_THRESHOLD. При BACKGROUND загрузка и
+# пересборка идут в отдельном потоке, а не внутри запроса.
+AUTOCOMPLETE = {
+    'SYNC_INTERVAL': 1.0,
+    'COMPACT_THRESHOLD': 1000,
+    'BACKGROUND': True,
+}
+
+# Кеш пользователей в памяти процесса для аутентификации по JWT:
+# не больше MAX_SIZE записей, каждая живёт TIMEOUT секунд.
+# TIMEOUT = 0 отключает кеш.
+USER_CACHE = {
+    'MAX_SIZE': 10000,
+    'TIMEOUT': 60,
+}
+
+
 # Password validation
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -117,13 +216,19 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.AllowAny',
     ),
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
     'DEFAULT_FILTER_BACKENDS': (
         'django_filters.rest_framework.DjangoFilterBackend',
-    )
+    ),
+    # JSON через orjson, если он установлен, и с готовыми фрагментами
+    # вложенных объектов (api.renderers).
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
 }
 
 SIMPLE_JWT = {
@@ -132,9 +237,31 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
 
+# Роль пользователя в токене доступа: права проверяются без обращения
+# к базе, а смена роли отзывает выданные токены (api.authentication).
+JWT_ROLE_CLAIMS = os.getenv('JWT_ROLE_CLAIMS', 'False') == 'True'
+# Сколько секунд версия токенов пользователя хранится в кеше Django. С кешем
+# в памяти процесса это задержка отзыва токенов в других процессах; 0 —
+# читать версию из базы на каждом запросе.
+TOKEN_VERSION_CACHE_TIMEOUT = int(
+    os.getenv('TOKEN_VERSION_CACHE_TIMEOUT', '5')
+)
+
 AUTH_USER_MODEL = 'users.CustomUser'
 
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
+# Очередь писем (users.outbox): письма рассылает команда
+# `python manage.py send_emails --loop`. EAGER отправляет письмо сразу
+# после фиксации, то есть внутри запроса, — только для разработки.
+EMAIL_OUTBOX_EAGER = os.getenv('EMAIL_OUTBOX_EAGER', 'False') == 'True'
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+# Пауза после первой неудачной попытки и её предел, секунды.
+EMAIL_OUTBOX_RETRY_DELAY = 60
+EMAIL_OUTBOX_MAX_RETRY_DELAY = 60 * 60
+# Через сколько секунд забранное, но не отправленное письмо вернётся
+# в очередь.
+EMAIL_OUTBOX_CLAIM_TIMEOUT = 10 * 60
+
 DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
@@ -30,7 +30,21 @@ class ReviewAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
 
 
-admin.site.register(Title)
+class TitleAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'name',
+        'year',
+        'category',
+        'rating',
+        'review_count'
+    )
+    search_fields = ('name',)
+    readonly_fields = ('rating', 'rating_sum', 'review_count')
+    empty_value_display = '-пусто-'
+
+
+admin.site.register(Title, TitleAdmin)
 admin.site.register(Comment, CommentAdmin)
 admin.site.register(Review, ReviewAdmin)
 admin.site.register(Category)
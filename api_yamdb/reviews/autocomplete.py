@@ -0,0 +1,316 @@
+"""Подсказки по названиям произведений из индекса в памяти процесса.
+
+Ключи индекса — нормализованное название и его хвосты, начинающиеся с
+каждого слова, поэтому «туда» находит «Поворот туда». Индекс компактный:
+нормализованные названия лежат одним буфером UTF-8, ключ — смещение
+начала хвоста в этом буфере, а массив смещений отсортирован по тексту
+хвостов. Поиск по префиксу — двоичный поиск по массиву смещений.
+
+Изменения буфер не перестраивают: изменённые и удалённые произведения
+попадают в небольшую дельту, которая при поиске перекрывает основной
+индекс. Когда дельта вырастает больше `AUTOCOMPLETE['COMPACT_THRESHOLD']`,
+основной индекс пересобирается в фоновом потоке.
+
+Процесс, изменивший произведение, обновляет дельту сигналом после
+фиксации транзакции. Остальные процессы не чаще раза в
+`AUTOCOMPLETE['SYNC_INTERVAL']` секунд сверяют версию таблицы
+(`reviews.versions`) и догружают изменённые названия по индексу на
+`modified`. Удаления (число произведений не сошлось) и первая загрузка
+выполняются в фоне; до конца первой загрузки подсказок нет.
+"""
+import heapq
+import logging
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+
+from .models import Title
+from .search import TOKEN_RE, normalize
+from .versions import get_version
+
+logger = logging.getLogger(__name__)
+
+# Изменения догружаются с запасом до последнего виденного `modified`:
+# транзакция, начатая раньше, может зафиксироваться позже.
+SYNC_MARGIN = timedelta(minutes=1)
+SEPARATOR = b'\x00'
+
+
+def normalize_name(name):
+    return ' '.join(normalize(name).split())
+
+
+def key_starts(text):
+    """Начала ключей в байтах UTF-8: строка целиком и каждое слово."""
+
+    starts = [match.start() for match in TOKEN_RE.finditer(text)]
+    if not starts or starts[0]:
+        starts.insert(0, 0)
+    if text.isascii():
+        return starts
+    return [len(text[:start].encode()) for start in starts]
+
+
+def title_keys(name):
+    """Ключи индекса для названия в байтах UTF-8."""
+
+    text = normalize_name(name).encode()
+    return [text[start:] for start in key_starts(normalize_name(name))]
+
+
+class PackedTitles:
+    """Неизменяемый индекс: буферы и массивы чисел вместо строк.
+
+    Строки (pk, название) передаются по возрастанию pk. Для bisect
+    объект — последовательность ключей в порядке сортировки.
+    """
+
+    def __init__(self, rows):
+        texts, names = bytearray(), bytearray()
+        self.ids = array('q')
+        self.text_offsets = array('I')
+        self.name_offsets = array('I', [0])
+        starts = array('I')
+        for pk, name in rows:
+            text = normalize_name(name)
+            self.ids.append(pk)
+            self.text_offsets.append(len(texts))
+            starts.extend(len(texts) + start for start in key_starts(text))
+            texts += text.encode() + SEPARATOR
+            names += name.encode()
+            self.name_offsets.append(len(names))
+        self.texts = bytes(texts)
+        self.names = bytes(names)
+        self.keys = array('I', sorted(starts, key=self.key))
+
+    def key(self, start):
+        return self.texts[start:self.texts.index(SEPARATOR, start)]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __getitem__(self, index):
+        return self.key(self.keys[index])
+
+    def position(self, pk):
+        position = bisect_left(self.ids, pk)
+        if position < len(self.ids) and self.ids[position] == pk:
+            return position
+        return None
+
+    def name(self, position):
+        return self.names[
+            self.name_offsets[position]:self.name_offsets[position + 1]
+        ].decode()
+
+    def items(self):
+        for position, pk in enumerate(self.ids):
+            yield pk, self.name(position)
+
+    def search(self, prefix):
+        """Пары (ключ, pk) с ключом, начинающимся с prefix, по порядку."""
+
+        for index in range(bisect_left(self, prefix), len(self.keys)):
+            start = self.keys[index]
+            if not self.texts.startswith(prefix, start):
+                return
+            owner = bisect_right(self.text_offsets, start) - 1
+            yield self.key(start), self.ids[owner]
+
+
+class TitlePrefixIndex:
+    """Префиксный поиск по основному индексу и дельте изменений."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._worker = None
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._packed = PackedTitles(())
+            # Изменения поверх основного индекса: pk → название или None
+            # для удалённых, номер изменения и ключи (ключ, pk).
+            self._delta = {}
+            self._changed_at = {}
+            self._delta_keys = []
+            self._sequence = 0
+            self._loaded = False
+            self._version = None
+            self._synced_at = None
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    def get_name(self, pk):
+        if pk in self._delta:
+            return self._delta[pk]
+        position = self._packed.position(pk)
+        return None if position is None else self._packed.name(position)
+
+    def count(self):
+        with self._lock:
+            count = len(self._packed.ids)
+            for pk, name in self._delta.items():
+                in_packed = self._packed.position(pk) is not None
+                count += (name is not None) - in_packed
+        return count
+
+    def start(self, job):
+        """Выполняет job в фоновом потоке, если он ещё не занят."""
+
+        if not settings.AUTOCOMPLETE['BACKGROUND']:
+            job()
+            return
+        with self._lock:
+            if self._worker is not None and self._worker.is_alive():
+                return
+            self._worker = threading.Thread(
+                target=self.run, args=(job,), name='yamdb-autocomplete',
+                daemon=True
+            )
+            self._worker.start()
+
+    @staticmethod
+    def run(job):
+        try:
+            job()
+        except Exception:
+            logger.exception('Не удалось обновить индекс подсказок.')
+        finally:
+            connection.close()
+
+    def wait(self, timeout=None):
+        """Ждёт окончания фоновой загрузки или пересборки."""
+
+        worker = self._worker
+        if worker is not None:
+            worker.join(timeout)
+
+    def maybe_sync(self):
+        if not self._loaded:
+            self.start(self.load)
+            return
+        interval = settings.AUTOCOMPLETE['SYNC_INTERVAL']
+        if time.monotonic() - self._synced_at >= interval:
+            self.sync()
+
+    def sync(self):
+        """Приводит индекс к версии из базы, общей для всех процессов."""
+
+        self._synced_at = time.monotonic()
+        version = get_version(Title)
+        if version == self._version:
+            return
+        count, last = version[0], self._version[1]
+        if last is not None:
+            changed = Title.objects.filter(
+                modified__gte=last - SYNC_MARGIN
+            ).values_list('id', 'name')
+            for pk, name in changed:
+                if self.get_name(pk) != name:
+                    self.update(pk, name)
+        if self.count() == count:
+            self._version = version
+        else:
+            self.start(self.load)
+
+    def load(self):
+        with self._lock:
+            sequence = self._sequence
+        version = get_version(Title)
+        rows = Title.objects.order_by('id').values_list(
+            'id', 'name'
+        ).iterator()
+        self.swap(PackedTitles(rows), sequence, version)
+
+    def compact(self):
+        """Переносит дельту в основной индекс без обращения к базе."""
+
+        with self._lock:
+            packed, sequence = self._packed, self._sequence
+            delta = dict(self._delta)
+        rows = heapq.merge(
+            ((pk, name) for pk, name in packed.items() if pk not in delta),
+            sorted(
+                (pk, name) for pk, name in delta.items() if name is not None
+            ),
+        )
+        self.swap(PackedTitles(rows), sequence, None)
+
+    def swap(self, packed, sequence, version):
+        """Ставит новый основной индекс; изменения после sequence остаются."""
+
+        with self._lock:
+            self._packed = packed
+            for pk, changed_at in list(self._changed_at.items()):
+                if changed_at <= sequence:
+                    del self._changed_at[pk]
+                    del self._delta[pk]
+            self._delta_keys = sorted(
+                (key, pk) for pk, name in self._delta.items()
+                if name is not None for key in title_keys(name)
+            )
+            if version is not None:
+                self._version = version
+                self._synced_at = time.monotonic()
+            self._loaded = True
+
+    def update(self, pk, name):
+        if not self._loaded:
+            return
+        with self._lock:
+            old_name = self._delta.get(pk)
+            if old_name is not None:
+                for key in title_keys(old_name):
+                    position = bisect_left(self._delta_keys, (key, pk))
+                    del self._delta_keys[position]
+            if name is not None:
+                for key in title_keys(name):
+                    insort(self._delta_keys, (key, pk))
+            self._sequence += 1
+            self._delta[pk] = name
+            self._changed_at[pk] = self._sequence
+            compact = (
+                len(self._delta) > settings.AUTOCOMPLETE['COMPACT_THRESHOLD']
+            )
+        if compact:
+            self.start(self.compact)
+
+    def remove(self, pk):
+        self.update(pk, None)
+
+    def search(self, text, limit):
+        """До `limit` пар (id, название) с ключом, начинающимся с text."""
+
+        prefix = normalize_name(text).encode()
+        if not prefix:
+            return []
+        self.maybe_sync()
+        found = {}
+        with self._lock:
+            delta = self._delta
+            position = bisect_left(self._delta_keys, (prefix,))
+            changed = (
+                (key, pk) for key, pk in self._delta_keys[position:]
+                if key.startswith(prefix)
+            )
+            stored = (
+                (key, pk) for key, pk in self._packed.search(prefix)
+                if pk not in delta
+            )
+            for _, pk in heapq.merge(stored, changed):
+                if len(found) >= limit:
+                    break
+                if pk not in found:
+                    found[pk] = self.get_name(pk)
+        return list(found.items())
+
+
+title_prefix_index = TitlePrefixIndex()
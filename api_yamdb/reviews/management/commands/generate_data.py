@@ -0,0 +1,257 @@
+import csv
+import random
+from datetime import datetime, timedelta
+from itertools import accumulate
+from os import makedirs, path
+from time import perf_counter
+
+from django.core.management import BaseCommand, CommandError, call_command
+
+# Начало и длина периода, в который попадают даты отзывов.
+START_DATE = datetime(2015, 1, 1)
+PERIOD_SECONDS = 8 * 365 * 24 * 60 * 60
+# Комментарии появляются не позже чем через 30 дней после отзыва.
+COMMENT_DELAY_SECONDS = 30 * 24 * 60 * 60
+# Доли модераторов и администраторов среди пользователей.
+ROLE_WEIGHTS = (('user', 0.989), ('moderator', 0.01), ('admin', 0.001))
+# Оценки смещены к высоким, как в настоящих отзывах.
+SCORE_WEIGHTS = (1, 1, 1, 2, 3, 5, 8, 12, 10, 7)
+# Тексты отзывов и комментариев выбираются из заранее собранных:
+# склеивать текст для каждой из миллионов строк слишком долго.
+TEXT_POOL_SIZE = 1000
+WORDS = (
+    'фильм', 'книга', 'песня', 'сюжет', 'герой', 'финал', 'автор', 'время',
+    'история', 'музыка', 'голос', 'роль', 'город', 'дорога', 'ночь', 'море',
+    'жизнь', 'любовь', 'война', 'мир', 'звезда', 'память', 'сила', 'свет',
+    'хороший', 'странный', 'долгий', 'тёмный', 'лёгкий', 'новый', 'старый',
+    'смешной', 'грустный', 'главный', 'последний', 'первый', 'настоящий',
+    'смотреть', 'читать', 'слушать', 'понять', 'ждать', 'помнить', 'верить',
+    'очень', 'снова', 'совсем', 'почти', 'всегда', 'никогда', 'вдруг',
+)
+
+FILES_COLUMNS = {
+    'users.csv': ('id', 'username', 'email', 'role', 'bio', 'first_name',
+                  'last_name'),
+    'category.csv': ('id', 'name', 'slug'),
+    'genre.csv': ('id', 'name', 'slug'),
+    'titles.csv': ('id', 'name', 'year', 'category'),
+    'genre_title.csv': ('id', 'title_id', 'genre_id'),
+    'review.csv': ('id', 'title_id', 'text', 'author', 'score', 'pub_date'),
+    'comments.csv': ('id', 'review_id', 'text', 'author', 'pub_date'),
+}
+
+
+def zipf_counts(total, size, exponent, cap):
+    """Раскладывает total по size корзинам с весами 1 / rank ** exponent.
+
+    В корзине не больше cap элементов; остаток, не поместившийся в
+    корзины с большими весами, досыпается в следующие по порядку.
+    """
+
+    total = min(total, size * cap)
+    weights = [1 / rank ** exponent for rank in range(1, size + 1)]
+    scale = total / sum(weights)
+    counts = [min(cap, int(weight * scale)) for weight in weights]
+    missing = total - sum(counts)
+    while missing:
+        for rank in range(size):
+            if counts[rank] < cap:
+                counts[rank] += 1
+                missing -= 1
+                if not missing:
+                    break
+    return counts
+
+
+def format_date(value):
+    """Дата в формате файлов static/data: 2019-09-24T21:08:21.567Z."""
+
+    milliseconds = value.microsecond // 1000
+    return f'{value:%Y-%m-%dT%H:%M:%S}.{milliseconds:03d}Z'
+
+
+class Generator:
+    """Строки csv-файлов; одно зерно даёт одни и те же данные."""
+
+    def __init__(self, seed):
+        self.random = random.Random(seed)
+        self.review_texts = [
+            self.text(5, 40) for _ in range(TEXT_POOL_SIZE)
+        ]
+        self.comment_texts = [
+            self.text(3, 20) for _ in range(TEXT_POOL_SIZE)
+        ]
+
+    def text(self, min_words, max_words):
+        words = self.random.choices(
+            WORDS, k=self.random.randint(min_words, max_words)
+        )
+        return ' '.join(words).capitalize() + '.'
+
+    def date(self, start=START_DATE, seconds=PERIOD_SECONDS):
+        return start + timedelta(
+            milliseconds=self.random.randrange(seconds * 1000)
+        )
+
+    def users(self, count):
+        roles, weights = zip(*ROLE_WEIGHTS)
+        for pk in range(1, count + 1):
+            role = self.random.choices(roles, weights)[0]
+            yield (pk, f'user{pk}', f'user{pk}@yamdb.fake', role, '', '', '')
+
+    @staticmethod
+    def slugs(name, count):
+        for pk in range(1, count + 1):
+            yield (pk, f'{name.capitalize()} {pk}', f'{name}-{pk}')
+
+    def titles(self, count, categories):
+        for pk in range(1, count + 1):
+            yield (
+                pk, self.text(1, 4).rstrip('.'),
+                self.random.randint(1950, 2023),
+                self.random.randint(1, categories) if categories else '',
+            )
+
+    def genre_titles(self, titles, genres):
+        pk = 0
+        for title_id in range(1, titles + 1):
+            for genre_id in sorted(self.random.sample(
+                range(1, genres + 1), min(genres, self.random.randint(1, 3))
+            )):
+                pk += 1
+                yield (pk, title_id, genre_id)
+
+    def reviews(self, counts, users, comments_per_review):
+        """Отзывы и комментарии к ним: пары (отзывы, комментарии).
+
+        Авторы отзывов на одно произведение выбираются без повторов, что
+        соблюдает ограничение unique_author_title.
+        """
+
+        review_id = comment_id = 0
+        scores = range(1, 11)
+        cum_weights = list(accumulate(SCORE_WEIGHTS))
+        choice = self.random.choice
+        for title_id, count in enumerate(counts, 1):
+            authors = self.random.sample(range(1, users + 1), count)
+            reviews, comments = [], []
+            for author in authors:
+                review_id += 1
+                pub_date = self.date()
+                reviews.append((
+                    review_id, title_id, choice(self.review_texts), author,
+                    self.random.choices(scores, cum_weights=cum_weights)[0],
+                    format_date(pub_date),
+                ))
+                for _ in range(self.comment_count(comments_per_review)):
+                    comment_id += 1
+                    comments.append((
+                        comment_id, review_id, choice(self.comment_texts),
+                        self.random.randint(1, users),
+                        format_date(
+                            self.date(pub_date, COMMENT_DELAY_SECONDS)
+                        ),
+                    ))
+            yield reviews, comments
+
+    def comment_count(self, mean):
+        """Число комментариев с тяжёлым хвостом и средним mean."""
+
+        if not mean:
+            return 0
+        # У распределения Парето с параметром 2 среднее равно 2.
+        value = mean * self.random.paretovariate(2) / 2
+        whole = int(value)
+        return whole + (self.random.random() < value - whole)
+
+
+class Command(BaseCommand):
+    """Генерация данных большого объёма в формате import_data."""
+
+    help = ('Генерирует пользователей, произведения, отзывы и комментарии '
+            'в csv-файлы, которые загружает import_data.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', required=True,
+                            help='Каталог для csv-файлов.')
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--titles', type=int, default=1000)
+        parser.add_argument('--reviews', type=int, default=20000,
+                            help='Общее число отзывов.')
+        parser.add_argument('--comments', type=int, default=20000,
+                            help='Примерное общее число комментариев.')
+        parser.add_argument('--categories', type=int, default=10)
+        parser.add_argument('--genres', type=int, default=30)
+        parser.add_argument('--zipf', type=float, default=1.1,
+                            help='Показатель распределения Ципфа для числа '
+                                 'отзывов на произведение.')
+        parser.add_argument('--seed', type=int, default=1,
+                            help='Зерно генератора.')
+        parser.add_argument('--load', action='store_true',
+                            help='Загрузить файлы командой import_data.')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Размер пакета для import_data.')
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['titles'] < 1:
+            raise CommandError('Нужен хотя бы один пользователь и одно '
+                               'произведение.')
+        if options['genres'] < 1:
+            raise CommandError('Нужен хотя бы один жанр.')
+        started = perf_counter()
+        self.directory = options['path']
+        makedirs(self.directory, exist_ok=True)
+        generator = Generator(options['seed'])
+        self.write('users.csv', generator.users(options['users']))
+        self.write('category.csv', generator.slugs(
+            'category', options['categories']
+        ))
+        self.write('genre.csv', generator.slugs('genre', options['genres']))
+        self.write('titles.csv', generator.titles(
+            options['titles'], options['categories']
+        ))
+        self.write('genre_title.csv', generator.genre_titles(
+            options['titles'], options['genres']
+        ))
+        counts = zipf_counts(
+            options['reviews'], options['titles'], options['zipf'],
+            options['users']
+        )
+        # Самые популярные произведения не должны идти первыми по id.
+        generator.random.shuffle(counts)
+        comments_per_review = options['comments'] / max(sum(counts), 1)
+        self.write_reviews(generator.reviews(
+            counts, options['users'], comments_per_review
+        ))
+        self.stdout.write(
+            f'Данные записаны в {options["path"]} за '
+            f'{perf_counter() - started:.2f} с; отзывов: {sum(counts)}, '
+            f'больше всего на одно произведение: {max(counts)}.'
+        )
+        if options['load']:
+            call_command(
+                'import_data', path=options['path'],
+                batch_size=options['batch_size'], stdout=self.stdout
+            )
+
+    def open(self, file_name):
+        csvfile = open(
+            path.join(self.directory, file_name), 'w', encoding='utf-8',
+            newline=''
+        )
+        writer = csv.writer(csvfile)
+        writer.writerow(FILES_COLUMNS[file_name])
+        return csvfile, writer
+
+    def write(self, file_name, rows):
+        csvfile, writer = self.open(file_name)
+        with csvfile:
+            writer.writerows(rows)
+
+    def write_reviews(self, chunks):
+        reviews_file, reviews_writer = self.open('review.csv')
+        comments_file, comments_writer = self.open('comments.csv')
+        with reviews_file, comments_file:
+            for reviews, comments in chunks:
+                reviews_writer.writerows(reviews)
+                comments_writer.writerows(comments)
@@ -1,72 +1,288 @@
-from collections import OrderedDict
-
 from csv import DictReader
+from datetime import datetime
+from os import path
+from time import perf_counter
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, models, transaction
 
-from django.core.management import BaseCommand
+from reviews.models import Category, Comment, Genre, Review, Title
+from reviews.search import category_index, genre_index, title_index
 
-from reviews.models import Category, Genre, Review, Title, Comment
+User = get_user_model()
 
-from os import path
+# Файлы в порядке зависимостей: внешние ключи ссылаются только на модели,
+# загруженные раньше. Для колонок-ссылок указаны поле модели и модель.
+FILES_MODELS = (
+    ('users.csv', User, {}),
+    ('category.csv', Category, {}),
+    ('genre.csv', Genre, {}),
+    ('titles.csv', Title, {'category': ('category_id', Category)}),
+    ('genre_title.csv', Title.genre.through, {
+        'title_id': ('title_id', Title),
+        'genre_id': ('genre_id', Genre),
+    }),
+    ('review.csv', Review, {
+        'title_id': ('title_id', Title),
+        'author': ('author_id', User),
+    }),
+    ('comments.csv', Comment, {
+        'review_id': ('review_id', Review),
+        'author': ('author_id', User),
+    }),
+)
 
-User = get_user_model()
+
+def field_converter(field):
+    """Преобразование строки через поле модели, как при save()."""
+
+    def convert(value):
+        if value == '' and field.null:
+            return None
+        return field.get_db_prep_save(field.to_python(value), connection)
+
+    return convert
+
+
+def datetime_converter(field):
+    """Даты ISO 8601 с часовым поясом без проверок поля на каждую строку."""
+
+    convert_field = field_converter(field)
+
+    def convert(value):
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            return convert_field(value)
+        if parsed.tzinfo is None:
+            return convert_field(value)
+        return connection.ops.adapt_datetimefield_value(parsed)
+
+    return convert
+
+
+def value_converter(field):
+    """Строка csv → значение для базы или None, если строка подходит как есть.
+
+    Строки и уже проверенные ссылки пишутся без изменений, целые и даты
+    разбираются напрямую, остальное проходит через поле модели.
+    """
+
+    if (
+        isinstance(field, (models.CharField, models.TextField))
+        or field.is_relation or field.primary_key
+    ):
+        return None
+    if isinstance(field, models.IntegerField) and not field.null:
+        return int
+    if isinstance(field, models.DateTimeField):
+        return datetime_converter(field)
+    return field_converter(field)
+
+
+def prepare_insert(model, names):
+    """INSERT для executemany и разбор строки в параметры запроса.
+
+    Поля, которых нет в файле, получают значение по умолчанию или время
+    загрузки (auto_now, auto_now_add), одно на все строки.
+    """
+
+    template = model()
+    fields = model._meta.concrete_fields
+    unknown = set(names) - {field.attname for field in fields}
+    if unknown:
+        raise CommandError(
+            f'Неизвестные колонки {", ".join(sorted(unknown))} '
+            f'для {model._meta.label}.'
+        )
+    columns, converters, defaults = [], [], []
+    for field in fields:
+        if field.attname in names:
+            columns.insert(len(converters), field.column)
+            converters.append((field.attname, value_converter(field)))
+        elif not isinstance(field, models.AutoField):
+            columns.append(field.column)
+            defaults.append(field.get_db_prep_save(
+                field.pre_save(template, add=True), connection
+            ))
+    quote_name = connection.ops.quote_name
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        quote_name(model._meta.db_table),
+        ', '.join(quote_name(column) for column in columns),
+        ', '.join(['%s'] * len(columns)),
+    )
+
+    def get_params(values):
+        return [
+            values[name] if convert is None else convert(values[name])
+            for name, convert in converters
+        ] + defaults
+
+    return sql, get_params
 
 
 class Command(BaseCommand):
     """Импорт данных из csv-файлов."""
 
+    help = 'Загружает тестовые данные из csv-файлов пакетными вставками.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default=path.join(settings.BASE_DIR, 'static', 'data'),
+            help='Каталог с csv-файлами.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Количество записей в одном executemany.'
+        )
+
     def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.known_ids = {}
+        loaded_models = []
+        for file, model, foreign_keys in FILES_MODELS:
+            file_path = path.join(options['path'], file)
+            if not path.exists(file_path):
+                self.stdout.write(f'Файл {file} не найден, пропускаем.')
+                continue
+            self.stdout.write(f'Импорт данных из файла {file}:')
+            if self.import_file(file_path, model, foreign_keys):
+                loaded_models.append(model)
+        self.finish(loaded_models)
 
-        path_gen_part = path.join('.', 'static', 'data')
-        files_models = {
-            'users.csv': User,
-            'category.csv': Category,
-            'genre.csv': Genre,
-            'titles.csv': Title,
-            'review.csv': Review,
-            'comments.csv': Comment
+    def get_ids(self, model):
+        """Множество id модели: загружается из базы один раз за импорт."""
+
+        if model not in self.known_ids:
+            self.known_ids[model] = set(
+                model.objects.values_list('id', flat=True).iterator()
+            )
+        return self.known_ids[model]
+
+    def get_existing_keys(self, model, key_fields):
+        if key_fields == ('id',):
+            return self.get_ids(model)
+        return set(model.objects.values_list(*key_fields).iterator())
+
+    def import_file(self, file_path, model, foreign_keys):
+        if model._meta.auto_created:
+            # Промежуточная таблица ManyToMany: свои id в файле не нужны,
+            # строка уникальна по паре внешних ключей.
+            key_fields = tuple(attname for attname, _ in foreign_keys.values())
+        else:
+            key_fields = ('id',)
+        existing_keys = self.get_existing_keys(model, key_fields)
+        references = {
+            column: (attname, self.get_ids(related))
+            for column, (attname, related) in foreign_keys.items()
         }
-        for file, model in files_models.items():
-            print(f'Импорт данных из файла {file}:')
-            with open(
-                    path.join(path_gen_part, file),
-                    encoding='utf-8',
-                    newline=''
-            ) as csvfile:
-                reader = DictReader(csvfile)
-                counter = 0
-                for row in reader:
-                    if not model.objects.filter(id=row['id']).exists():
-                        correct_row = []
-                        for key, value in row.items():
-                            if key == 'genre':
-                                correct_row.append(
-                                    (key,
-                                     Genre.objects.filter(id=value).first()
-                                     )
-                                )
-                            if key == 'category':
-                                continue
-                                correct_row.append(
-                                    (key,
-                                     Category.objects.filter(id=value).first()
-                                     )
-                                )
-                            elif key == 'title_id':
-                                correct_row.append(
-                                    ('title',
-                                     Title.objects.filter(id=value).first()
-                                     )
-                                )
-                            elif key == 'author':
-                                correct_row.append(
-                                    (key,
-                                     User.objects.filter(id=value).first()
-                                     )
-                                )
-                            else:
-                                correct_row.append((key, value))
-                        model.objects.create(**OrderedDict(correct_row))
-                        counter += 1
-                print(f'- импортировано {counter} записей.')
+        started = perf_counter()
+        created = skipped = 0
+        batch = []
+        with open(file_path, encoding='utf-8', newline='') as csvfile, \
+                transaction.atomic():
+            reader = DictReader(csvfile)
+            names = self.get_names(reader.fieldnames, references, key_fields)
+            sql, get_params = prepare_insert(model, names)
+            for row in reader:
+                values = self.get_values(row, references, key_fields)
+                key = values and self.get_key(values, key_fields)
+                if not values or key in existing_keys:
+                    skipped += 1
+                    continue
+                existing_keys.add(key)
+                batch.append(get_params(values))
+                if len(batch) >= self.batch_size:
+                    created += self.flush(sql, batch)
+            created += self.flush(sql, batch)
+        elapsed = perf_counter() - started
+        self.stdout.write(
+            f'- импортировано {created} записей, пропущено {skipped} '
+            f'за {elapsed:.2f} с ({created / max(elapsed, 1e-9):.0f} '
+            f'записей/с).'
+        )
+        return created
+
+    @staticmethod
+    def get_key(values, key_fields):
+        if len(key_fields) == 1:
+            return values[key_fields[0]]
+        return tuple(values[field] for field in key_fields)
+
+    @staticmethod
+    def get_names(columns, references, key_fields):
+        """Поля модели, которые заполняет get_values."""
+
+        names = [
+            references[column][0] if column in references else column
+            for column in columns or ()
+        ]
+        if key_fields != ('id',) and 'id' in names:
+            names.remove('id')
+        return names
+
+    @staticmethod
+    def get_values(row, references, key_fields):
+        """Поля модели из строки csv или None при битой ссылке."""
+
+        values = {}
+        for column, value in row.items():
+            if column not in references:
+                values[column] = value
+                continue
+            attname, related_ids = references[column]
+            value = int(value) if value else None
+            if value is not None and value not in related_ids:
+                return None
+            values[attname] = value
+        if key_fields == ('id',):
+            values['id'] = int(values['id'])
+        else:
+            values.pop('id', None)
+        return values
+
+    @staticmethod
+    def flush(sql, batch):
+        """Вставляет пакет одним executemany: один INSERT на строку.
+
+        В отличие от bulk_create, число строк в пакете не упирается в
+        лимит параметров одного запроса SQLite, и экземпляры моделей не
+        создаются.
+        """
+
+        if not batch:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, batch)
+        count = len(batch)
+        batch.clear()
+        return count
+
+    def finish(self, loaded_models):
+        """Сдвигает последовательности id, пересчитывает рейтинги и индексы.
+
+        Строки вставляются без save() и сигналов, поэтому производные
+        данные пересчитываются один раз по итогам загрузки.
+        """
+
+        if loaded_models:
+            sequence_sql = connection.ops.sequence_reset_sql(
+                no_style(), loaded_models
+            )
+            with connection.cursor() as cursor:
+                for sql in sequence_sql:
+                    cursor.execute(sql)
+        if Review in loaded_models:
+            Title.objects.rebuild_ratings()
+        if Category in loaded_models:
+            category_index.rebuild()
+        if Genre in loaded_models:
+            genre_index.rebuild()
+        if {Title, Title.genre.through, Category, Genre} & set(loaded_models):
+            title_index.rebuild()
@@ -0,0 +1,34 @@
+from django.core.management import BaseCommand, CommandError
+
+from reviews.models import Title
+
+
+class Command(BaseCommand):
+    """Проверка и пересчёт сохранённых рейтингов произведений."""
+
+    help = 'Пересчитывает rating_sum, review_count и rating у произведений.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только проверить рейтинги, ничего не исправляя.'
+        )
+
+    def handle(self, *args, **options):
+        broken = list(
+            Title.objects.out_of_sync().values_list('id', flat=True)
+        )
+        if options['check']:
+            if broken:
+                raise CommandError(
+                    f'Рейтинг расходится с отзывами у {len(broken)} '
+                    f'произведений: {broken[:20]}'
+                )
+            self.stdout.write('Рейтинги всех произведений актуальны.')
+            return
+        updated = Title.objects.rebuild_ratings()
+        self.stdout.write(
+            f'Пересчитано {updated} произведений, '
+            f'исправлено расхождений: {len(broken)}.'
+        )
@@ -0,0 +1,52 @@
+from django.db import migrations
+
+OLD_TABLE = 'reviews_title_fts'
+
+DROP_TRIGGERS_SQL = (
+    f'DROP TRIGGER IF EXISTS {OLD_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {OLD_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {OLD_TABLE}_au',
+    f'DROP TABLE IF EXISTS {OLD_TABLE}',
+)
+
+# Индексы хранят основы слов, посчитанные в Python, поэтому
+# синхронизируются сигналами, а не триггерами. Миграция создаёт пустые
+# таблицы: стеммер живёт в коде приложения и не должен менять поведение
+# миграции, поэтому существующие записи индексирует команда
+# rebuild_search_index.
+TABLES = {
+    'reviews_title_fts': ('name', 'description', 'category', 'genre'),
+    'reviews_category_fts': ('name',),
+    'reviews_genre_fts': ('name',),
+}
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in DROP_TRIGGERS_SQL:
+        schema_editor.execute(sql)
+    for table, columns in TABLES.items():
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {table} USING fts5("
+            f"{', '.join(columns)}, "
+            f"tokenize='unicode61 remove_diacritics 0', prefix='2 3 4')"
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for table in TABLES:
+        schema_editor.execute(f'DROP TABLE IF EXISTS {table}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0004_title_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -1,5 +1,10 @@
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models import (Avg, Case, Count, ExpressionWrapper, F,
+                              FloatField, OuterRef, Subquery, Sum, Value,
+                              When)
+from django.db.models.functions import Cast, Coalesce
+from django.utils import timezone
 from users.models import CustomUser
 
 
@@ -7,6 +12,9 @@ class Category(models.Model):
 
     name = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
+    modified = models.DateTimeField(
+        'Дата изменения', auto_now=True, db_index=True
+    )
 
     class Meta:
         ordering = ['name']
@@ -21,6 +29,9 @@ class Genre(models.Model):
 
     name = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
+    modified = models.DateTimeField(
+        'Дата изменения', auto_now=True, db_index=True
+    )
 
     class Meta:
         ordering = ['name']
@@ -31,6 +42,85 @@ class Genre(models.Model):
         return self.name
 
 
+class TitleQuerySet(models.QuerySet):
+
+    def apply_review_delta(self, score_delta, count_delta):
+        """Сдвигает сумму оценок и число отзывов одним UPDATE.
+
+        Заодно обновляет `modified`: по нему проверяется актуальность
+        закешированных клиентом страниц произведения и его отзывов.
+        """
+
+        new_sum = F('rating_sum') + score_delta
+        new_count = F('review_count') + count_delta
+        # rating стоит первым: все выражения должны видеть старые значения.
+        return self.update(
+            rating=Case(
+                When(review_count__lte=-count_delta, then=Value(None)),
+                default=ExpressionWrapper(
+                    Cast(new_sum, FloatField()) / new_count,
+                    output_field=FloatField()
+                ),
+                output_field=FloatField()
+            ),
+            rating_sum=new_sum,
+            review_count=new_count,
+            modified=timezone.now(),
+        )
+
+    def with_actual_ratings(self):
+        """Аннотирует произведения значениями, посчитанными по отзывам."""
+
+        reviews = Review.objects.filter(
+            title=OuterRef('pk')
+        ).order_by().values('title')
+        return self.annotate(
+            actual_sum=Coalesce(
+                Subquery(reviews.annotate(s=Sum('score')).values('s')), 0
+            ),
+            actual_count=Coalesce(
+                Subquery(reviews.annotate(c=Count('id')).values('c')), 0
+            ),
+            actual_rating=Subquery(
+                reviews.annotate(a=Avg('score')).values('a'),
+                output_field=FloatField()
+            ),
+        )
+
+    def out_of_sync(self):
+        """Произведения, у которых сохранённый рейтинг разошёлся с отзывами."""
+
+        return self.with_actual_ratings().exclude(
+            rating_sum=F('actual_sum'),
+            review_count=F('actual_count'),
+            rating=F('actual_rating'),
+        ).exclude(
+            rating_sum=F('actual_sum'),
+            review_count=0,
+            actual_count=0,
+            rating__isnull=True,
+        )
+
+    def rebuild_ratings(self):
+        """Пересчитывает сохранённый рейтинг по отзывам одним UPDATE."""
+
+        reviews = Review.objects.filter(
+            title=OuterRef('pk')
+        ).order_by().values('title')
+        return self.update(
+            rating_sum=Coalesce(
+                Subquery(reviews.annotate(s=Sum('score')).values('s')), 0
+            ),
+            review_count=Coalesce(
+                Subquery(reviews.annotate(c=Count('id')).values('c')), 0
+            ),
+            rating=Subquery(
+                reviews.annotate(a=Avg('score')).values('a'),
+                output_field=FloatField()
+            ),
+        )
+
+
 class Title(models.Model):
 
     name = models.CharField(max_length=200)
@@ -47,6 +137,14 @@ class Title(models.Model):
         related_name='titles'
     )
     year = models.IntegerField()
+    rating_sum = models.PositiveIntegerField('Сумма оценок', default=0)
+    review_count = models.PositiveIntegerField('Количество отзывов', default=0)
+    rating = models.FloatField('Рейтинг', null=True, blank=True)
+    modified = models.DateTimeField(
+        'Дата изменения', auto_now=True, db_index=True
+    )
+
+    objects = TitleQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Произведение'
@@ -66,9 +164,16 @@ class Review(models.Model):
     score = models.PositiveSmallIntegerField(
         validators=[MinValueValidator(1), MaxValueValidator(10)])
     pub_date = models.DateTimeField('Дата публикации', auto_now_add=True)
+    modified = models.DateTimeField('Дата изменения', auto_now=True)
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=('title', 'pub_date', 'id'),
+                name='review_title_pub_date_idx'
+            ),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=('author', 'title'),
@@ -81,6 +186,48 @@ class Review(models.Model):
     def __str__(self):
         return self.text
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_rating = (
+            instance.__dict__.get('title_id'),
+            instance.__dict__.get('score'),
+        )
+        return instance
+
+    def save(self, *args, **kwargs):
+        """Сохраняет отзыв и в той же транзакции обновляет рейтинг."""
+
+        with transaction.atomic():
+            old_title_id, old_score = self._get_loaded_rating()
+            super().save(*args, **kwargs)
+            if old_title_id is None:
+                Title.objects.filter(pk=self.title_id).apply_review_delta(
+                    self.score, 1
+                )
+            elif old_title_id != self.title_id:
+                Title.objects.filter(pk=old_title_id).apply_review_delta(
+                    -old_score, -1
+                )
+                Title.objects.filter(pk=self.title_id).apply_review_delta(
+                    self.score, 1
+                )
+            else:
+                Title.objects.filter(pk=self.title_id).apply_review_delta(
+                    self.score - old_score, 0
+                )
+            self._loaded_rating = (self.title_id, self.score)
+
+    def _get_loaded_rating(self):
+        if self._state.adding:
+            return None, None
+        loaded = getattr(self, '_loaded_rating', (None, None))
+        if None in loaded:
+            loaded = Review.objects.filter(pk=self.pk).values_list(
+                'title_id', 'score'
+            ).first() or (None, None)
+        return loaded
+
 
 class Comment(models.Model):
     review = models.ForeignKey(
@@ -92,8 +239,23 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=('review', 'pub_date', 'id'),
+                name='comment_review_pub_date_idx'
+            ),
+        ]
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
 
     def __str__(self):
         return self.text
+
+    def save(self, *args, **kwargs):
+        """Сохраняет комментарий и отмечает изменение ветки отзыва."""
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            Review.objects.filter(pk=self.review_id).update(
+                modified=timezone.now()
+            )
@@ -0,0 +1,221 @@
+"""Полнотекстовый поиск по произведениям, категориям и жанрам.
+
+Текст нормализуется и приводится к основам слов (русский и английский
+стеммеры Snowball) и при индексации, и при разборе запроса, поэтому
+«войны» находит «Война и мир». Каждое слово запроса ищется как префикс.
+
+На SQLite индексы — таблицы FTS5, которые обновляются сигналами из
+`reviews.signals`; на других СУБД поиск идёт по подстроке основы.
+"""
+import re
+import unicodedata
+from collections import defaultdict
+from itertools import islice
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import Category, Genre, Title
+from .stemmers import english_stem, russian_stem
+
+TOKEN_RE = re.compile(r'\w+')
+CYRILLIC_RE = re.compile('[а-я]')
+LATIN_RE = re.compile('^[a-z]+$')
+INDEX_BATCH_SIZE = 2000
+
+
+def fts_enabled():
+    return connection.vendor == 'sqlite'
+
+
+def normalize(text):
+    """Приводит текст к единому виду: NFKC, нижний регистр, «ё» → «е»."""
+
+    return unicodedata.normalize('NFKC', text or '').casefold().replace(
+        'ё', 'е'
+    )
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(normalize(text))
+
+
+def stem(token):
+    if CYRILLIC_RE.search(token):
+        return russian_stem(token)
+    if LATIN_RE.match(token):
+        return english_stem(token)
+    return token
+
+
+def index_text(text):
+    """Строка основ слов, которая записывается в индекс."""
+
+    return ' '.join(stem(token) for token in tokenize(text))
+
+
+def build_match_query(text):
+    """Выражение MATCH: основы слов запроса в кавычках, как префиксы.
+
+    Кавычки отключают синтаксис FTS5 в пользовательском вводе, а термы
+    объединяются через AND. Основа из одной буквы ищется целиком, чтобы
+    не перебирать весь индекс.
+    """
+
+    terms = []
+    for token in tokenize(text):
+        term = stem(token)
+        terms.append(f'"{term}"*' if len(term) > 1 else f'"{term}"')
+    return ' '.join(terms)
+
+
+def chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class SearchIndex:
+    """Таблица FTS5 с основами слов для одной модели."""
+
+    model = None
+    table = None
+    # Колонки индекса и их веса в ранжировании bm25.
+    columns = ()
+    # Поля модели для поиска по подстроке, если FTS5 недоступен.
+    fallback_fields = ()
+
+    def documents(self, ids):
+        """Строки (id, текст колонки, ...) для переданных id."""
+
+        raise NotImplementedError
+
+    def all_ids(self):
+        return self.model.objects.order_by('id').values_list(
+            'id', flat=True
+        ).iterator()
+
+    def reindex(self, ids):
+        if not fts_enabled():
+            return
+        for chunk in chunks(ids, INDEX_BATCH_SIZE):
+            rows = [
+                (pk, *(index_text(text) for text in texts))
+                for pk, *texts in self.documents(chunk)
+            ]
+            self.remove(chunk)
+            self.insert(rows)
+
+    def remove(self, ids):
+        if not fts_enabled():
+            return
+        with connection.cursor() as cursor:
+            for chunk in chunks(ids, INDEX_BATCH_SIZE):
+                placeholders = ', '.join(['%s'] * len(chunk))
+                cursor.execute(
+                    f'DELETE FROM {self.table} '
+                    f'WHERE rowid IN ({placeholders})',
+                    chunk
+                )
+
+    def insert(self, rows):
+        if not rows:
+            return
+        names = ', '.join(name for name, _ in self.columns)
+        placeholders = ', '.join(['%s'] * (len(self.columns) + 1))
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {self.table} (rowid, {names}) '
+                f'VALUES ({placeholders})',
+                rows
+            )
+
+    def rebuild(self):
+        if not fts_enabled():
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+        self.reindex(self.all_ids())
+
+    def search(self, queryset, text):
+        """Записи, подходящие под запрос, от более релевантных к менее."""
+
+        match = build_match_query(text)
+        if not match:
+            return queryset
+        if not fts_enabled():
+            return queryset.filter(self.fallback_condition(text))
+        weights = ', '.join(str(weight) for _, weight in self.columns)
+        model_table = queryset.model._meta.db_table
+        return queryset.extra(
+            select={'search_rank': f'bm25({self.table}, {weights})'},
+            tables=[self.table],
+            where=[
+                f'{self.table}.rowid = {model_table}.id',
+                f'{self.table} MATCH %s',
+            ],
+            params=[match],
+        ).order_by('search_rank', 'id')
+
+    def fallback_condition(self, text):
+        condition = Q()
+        for token in tokenize(text):
+            term = stem(token)
+            token_condition = Q()
+            for field in self.fallback_fields:
+                token_condition |= Q(**{f'{field}__icontains': term})
+            condition &= token_condition
+        return condition
+
+
+class TitleSearchIndex(SearchIndex):
+    model = Title
+    table = 'reviews_title_fts'
+    columns = (
+        ('name', 10.0),
+        ('description', 1.0),
+        ('category', 2.0),
+        ('genre', 2.0),
+    )
+    fallback_fields = ('name', 'description', 'category__name')
+
+    def documents(self, ids):
+        genres = defaultdict(list)
+        relations = Title.genre.through.objects.filter(
+            title_id__in=ids
+        ).values_list('title_id', 'genre__name')
+        for title_id, genre_name in relations:
+            genres[title_id].append(genre_name)
+        titles = Title.objects.filter(id__in=ids).values_list(
+            'id', 'name', 'description', 'category__name'
+        )
+        for pk, name, description, category in titles:
+            yield pk, name, description, category, ' '.join(genres[pk])
+
+
+class NameSearchIndex(SearchIndex):
+    columns = (('name', 1.0),)
+    fallback_fields = ('name',)
+
+    def __init__(self, model, table):
+        self.model = model
+        self.table = table
+
+    def documents(self, ids):
+        return self.model.objects.filter(id__in=ids).values_list(
+            'id', 'name'
+        )
+
+
+title_index = TitleSearchIndex()
+category_index = NameSearchIndex(Category, 'reviews_category_fts')
+genre_index = NameSearchIndex(Genre, 'reviews_genre_fts')
+
+INDEXES = (title_index, category_index, genre_index)
+
+
+def search_titles(queryset, text):
+    return title_index.search(queryset, text)
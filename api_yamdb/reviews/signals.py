@@ -0,0 +1,161 @@
+import threading
+
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .autocomplete import title_prefix_index
+from .models import Category, Comment, Genre, Review, Title
+from .search import category_index, genre_index, title_index
+
+# id произведений, которые удаляет текущий поток: их отзывы удаляются
+# каскадом, и пересчитывать рейтинг строки, которая сейчас исчезнет, незачем.
+deleting = threading.local()
+# Записи, которые поток переиндексирует после фиксации транзакции.
+pending = threading.local()
+
+
+def deleting_titles():
+    if not hasattr(deleting, 'title_ids'):
+        deleting.title_ids = set()
+    return deleting.title_ids
+
+
+def schedule_reindex(index, ids, remove=False):
+    """Переиндексирует записи один раз после фиксации транзакции.
+
+    Сохранение произведения и каждое изменение его жанров только
+    добавляют id в очередь, а индекс обновляется одним проходом по
+    итогу транзакции; для каждого id действует последняя операция.
+    reindex читает записи из базы, поэтому id из откаченной транзакции
+    безвредны.
+    """
+
+    if not hasattr(pending, 'ids'):
+        pending.ids = {}
+    queued = pending.ids.setdefault(index, {})
+    for pk in ids:
+        queued[pk] = remove
+    transaction.on_commit(reindex_pending)
+
+
+def reindex_pending():
+    queued, pending.ids = getattr(pending, 'ids', {}), {}
+    for index, operations in queued.items():
+        removed = sorted(pk for pk, remove in operations.items() if remove)
+        changed = sorted(
+            pk for pk, remove in operations.items() if not remove
+        )
+        if removed:
+            index.remove(removed)
+        if changed:
+            index.reindex(changed)
+
+
+@receiver(pre_delete, sender=Title)
+def mark_title_deleting(sender, instance, **kwargs):
+    deleting_titles().add(instance.pk)
+
+
+@receiver(post_delete, sender=Title)
+def unmark_title_deleting(sender, instance, **kwargs):
+    deleting_titles().discard(instance.pk)
+
+
+@receiver(post_delete, sender=Review)
+def decrease_title_rating(sender, instance, **kwargs):
+    """Вычитает удалённый отзыв из рейтинга произведения.
+
+    Сигнал срабатывает и при каскадном удалении отзывов вместе с
+    пользователем, внутри транзакции удаления. Отзывы удаляемого
+    произведения пропускаются: иначе на каждый отзыв шёл бы UPDATE.
+    """
+
+    if instance.title_id in deleting_titles():
+        return
+    Title.objects.filter(pk=instance.title_id).apply_review_delta(
+        -instance.score, -1
+    )
+
+
+@receiver(post_delete, sender=Comment)
+def touch_review(sender, instance, **kwargs):
+    Review.objects.filter(pk=instance.review_id).update(
+        modified=timezone.now()
+    )
+
+
+@receiver(post_save, sender=Title)
+def index_title(sender, instance, **kwargs):
+    schedule_reindex(title_index, [instance.pk])
+
+
+@receiver(post_delete, sender=Title)
+def unindex_title(sender, instance, **kwargs):
+    schedule_reindex(title_index, [instance.pk], remove=True)
+
+
+@receiver(post_save, sender=Title)
+def update_title_suggestions(sender, instance, **kwargs):
+    pk, name = instance.pk, instance.name
+    transaction.on_commit(lambda: title_prefix_index.update(pk, name))
+
+
+@receiver(post_delete, sender=Title)
+def remove_title_suggestions(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: title_prefix_index.remove(pk))
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def index_title_genres(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            schedule_reindex(title_index, [instance.pk])
+        return
+    # Изменение со стороны жанра: genre.titles.add(...) и т.п.
+    if action == 'pre_clear':
+        instance._indexed_title_ids = list(
+            instance.titles.values_list('id', flat=True)
+        )
+    elif action in ('post_add', 'post_remove'):
+        schedule_reindex(title_index, pk_set)
+    elif action == 'post_clear':
+        schedule_reindex(title_index, instance._indexed_title_ids)
+
+
+@receiver(pre_save, sender=Category)
+@receiver(pre_save, sender=Genre)
+def remember_name(sender, instance, **kwargs):
+    instance._indexed_name = sender.objects.filter(
+        pk=instance.pk
+    ).values_list('name', flat=True).first()
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Genre)
+def index_name(sender, instance, created, **kwargs):
+    index = category_index if sender is Category else genre_index
+    schedule_reindex(index, [instance.pk])
+    if not created and instance._indexed_name != instance.name:
+        schedule_reindex(
+            title_index, instance.titles.values_list('id', flat=True)
+        )
+
+
+@receiver(pre_delete, sender=Category)
+@receiver(pre_delete, sender=Genre)
+def remember_titles(sender, instance, **kwargs):
+    instance._indexed_title_ids = list(
+        instance.titles.values_list('id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Genre)
+def unindex_name(sender, instance, **kwargs):
+    index = category_index if sender is Category else genre_index
+    schedule_reindex(index, [instance.pk], remove=True)
+    schedule_reindex(title_index, instance._indexed_title_ids)
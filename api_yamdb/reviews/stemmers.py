@@ -0,0 +1,328 @@
+"""Стеммеры Snowball для русского и английского языков.
+
+Реализация повторяет алгоритмы с snowballstem.org без исключений из
+словарей: этого достаточно, чтобы разные формы слова сводились к одной
+основе и в индексе, и в поисковом запросе.
+"""
+
+RU_VOWELS = 'аеиоуыэюя'
+
+RU_PERFECTIVE_GERUND = (
+    ('вшись', 'вши', 'в'),
+    ('ившись', 'ывшись', 'ивши', 'ывши', 'ив', 'ыв'),
+)
+RU_ADJECTIVE = (
+    'ими', 'ыми', 'его', 'ого', 'ему', 'ому', 'ее', 'ие', 'ые', 'ое', 'ей',
+    'ий', 'ый', 'ой', 'ем', 'им', 'ым', 'ом', 'их', 'ых', 'ую', 'юю', 'ая',
+    'яя', 'ою', 'ею',
+)
+RU_PARTICIPLE = (
+    ('ем', 'нн', 'вш', 'ющ', 'щ'),
+    ('ивш', 'ывш', 'ующ'),
+)
+RU_REFLEXIVE = ('ся', 'сь')
+RU_VERB = (
+    ('ешь', 'нно', 'ете', 'йте', 'ла', 'на', 'ли', 'ем', 'ло', 'но', 'ет',
+     'ют', 'ны', 'ть', 'й', 'л', 'н'),
+    ('уйте', 'ейте', 'ила', 'ыла', 'ена', 'ите', 'или', 'ыли', 'ило', 'ыло',
+     'ено', 'ует', 'уют', 'ены', 'ить', 'ыть', 'ишь', 'ей', 'уй', 'ил', 'ыл',
+     'им', 'ым', 'ен', 'ят', 'ит', 'ыт', 'ую', 'ю'),
+)
+RU_NOUN = (
+    'иями', 'ями', 'ами', 'ией', 'иям', 'ием', 'иях', 'ев', 'ов', 'ие', 'ье',
+    'еи', 'ии', 'ей', 'ой', 'ий', 'ям', 'ем', 'ам', 'ом', 'ах', 'ях', 'ию',
+    'ью', 'ия', 'ья', 'а', 'е', 'и', 'й', 'о', 'у', 'ы', 'ь', 'ю', 'я',
+)
+RU_SUPERLATIVE = ('ейше', 'ейш')
+RU_DERIVATIONAL = ('ость', 'ост')
+
+
+def _by_length(endings):
+    return tuple(sorted(endings, key=len, reverse=True))
+
+
+RU_PERFECTIVE_GERUND = tuple(map(_by_length, RU_PERFECTIVE_GERUND))
+RU_ADJECTIVE = _by_length(RU_ADJECTIVE)
+RU_PARTICIPLE = tuple(map(_by_length, RU_PARTICIPLE))
+RU_VERB = tuple(map(_by_length, RU_VERB))
+RU_NOUN = _by_length(RU_NOUN)
+
+
+def _russian_regions(word):
+    """Начала областей RV и R2 по правилам Snowball."""
+
+    rv = r1 = r2 = len(word)
+    for i, char in enumerate(word):
+        if char in RU_VOWELS:
+            rv = i + 1
+            break
+    for i in range(1, len(word)):
+        if word[i] not in RU_VOWELS and word[i - 1] in RU_VOWELS:
+            r1 = i + 1
+            break
+    for i in range(r1 + 1, len(word)):
+        if word[i] not in RU_VOWELS and word[i - 1] in RU_VOWELS:
+            r2 = i + 1
+            break
+    return rv, r2
+
+
+def _strip_grouped(word, rv, groups):
+    """Снимает окончание первой группы (после «а»/«я») или второй."""
+
+    first, second = groups
+    best = ''
+    for ending in first:
+        start = len(word) - len(ending)
+        if (
+            word.endswith(ending) and start - 1 >= rv
+            and word[start - 1] in 'ая'
+        ):
+            best = ending
+            break
+    for ending in second:
+        if len(ending) > len(best) and word.endswith(ending):
+            if len(word) - len(ending) >= rv:
+                best = ending
+                break
+    return word[:len(word) - len(best)] if best else None
+
+
+def _strip(word, rv, endings):
+    for ending in endings:
+        if word.endswith(ending) and len(word) - len(ending) >= rv:
+            return word[:len(word) - len(ending)]
+    return None
+
+
+def _strip_adjectival(word, rv):
+    stem = _strip(word, rv, RU_ADJECTIVE)
+    if stem is None:
+        return None
+    participle = _strip_grouped(stem, rv, RU_PARTICIPLE)
+    return stem if participle is None else participle
+
+
+def russian_stem(word):
+    word = word.replace('ё', 'е')
+    rv, r2 = _russian_regions(word)
+    if rv >= len(word):
+        return word
+
+    # Шаг 1: деепричастие либо возвратная частица и окончание.
+    stem = _strip_grouped(word, rv, RU_PERFECTIVE_GERUND)
+    if stem is None:
+        word = _strip(word, rv, RU_REFLEXIVE) or word
+        stem = (
+            _strip_adjectival(word, rv)
+            or _strip_grouped(word, rv, RU_VERB)
+            or _strip(word, rv, RU_NOUN)
+        )
+    if stem is not None:
+        word = stem
+
+    # Шаг 2.
+    if word.endswith('и') and len(word) - 1 >= rv:
+        word = word[:-1]
+
+    # Шаг 3: словообразовательный суффикс в R2.
+    word = _strip(word, r2, RU_DERIVATIONAL) or word
+
+    # Шаг 4.
+    if word.endswith('нн') and len(word) - 2 >= rv:
+        return word[:-1]
+    stem = _strip(word, rv, RU_SUPERLATIVE)
+    if stem is not None:
+        word = stem
+        if word.endswith('нн') and len(word) - 2 >= rv:
+            word = word[:-1]
+        return word
+    if word.endswith('ь') and len(word) - 1 >= rv:
+        word = word[:-1]
+    return word
+
+
+EN_VOWELS = 'aeiouy'
+EN_DOUBLES = ('bb', 'dd', 'ff', 'gg', 'mm', 'nn', 'pp', 'rr', 'tt')
+EN_LI_ENDING = 'cdeghkmnrt'
+
+
+def _by_suffix_length(pairs):
+    return tuple(sorted(pairs, key=lambda pair: len(pair[0]), reverse=True))
+
+
+EN_STEP2 = _by_suffix_length((
+    ('ization', 'ize'), ('ational', 'ate'), ('fulness', 'ful'),
+    ('ousness', 'ous'), ('iveness', 'ive'), ('tional', 'tion'),
+    ('biliti', 'ble'), ('lessli', 'less'), ('entli', 'ent'),
+    ('ation', 'ate'), ('alism', 'al'), ('aliti', 'al'), ('ousli', 'ous'),
+    ('iviti', 'ive'), ('fulli', 'ful'), ('enci', 'ence'), ('anci', 'ance'),
+    ('abli', 'able'), ('izer', 'ize'), ('ator', 'ate'), ('alli', 'al'),
+    ('bli', 'ble'), ('ogi', 'og'), ('li', ''),
+))
+EN_STEP3 = _by_suffix_length((
+    ('ational', 'ate'), ('tional', 'tion'), ('alize', 'al'),
+    ('icate', 'ic'), ('iciti', 'ic'), ('ical', 'ic'), ('ness', ''),
+    ('ful', ''),
+))
+EN_STEP4 = _by_length((
+    'ement', 'ance', 'ence', 'able', 'ible', 'ment', 'ant', 'ent', 'ism',
+    'ate', 'iti', 'ous', 'ive', 'ize', 'ion', 'al', 'er', 'ic',
+))
+
+
+def _en_is_vowel(word, i):
+    return word[i] in EN_VOWELS
+
+
+def _english_regions(word):
+    for prefix in ('gener', 'commun', 'arsen'):
+        if word.startswith(prefix):
+            r1 = len(prefix)
+            break
+    else:
+        r1 = len(word)
+        for i in range(1, len(word)):
+            if not _en_is_vowel(word, i) and _en_is_vowel(word, i - 1):
+                r1 = i + 1
+                break
+    r2 = len(word)
+    for i in range(r1 + 1, len(word)):
+        if not _en_is_vowel(word, i) and _en_is_vowel(word, i - 1):
+            r2 = i + 1
+            break
+    return r1, r2
+
+
+def _en_short_syllable_end(word):
+    if len(word) == 2:
+        return _en_is_vowel(word, 0) and not _en_is_vowel(word, 1)
+    return (
+        len(word) > 2
+        and not _en_is_vowel(word, -3)
+        and _en_is_vowel(word, -2)
+        and not _en_is_vowel(word, -1)
+        and word[-1] not in 'wxY'
+    )
+
+
+def _en_has_vowel(part):
+    return any(char in EN_VOWELS for char in part)
+
+
+def _en_prelude(word):
+    """Убирает апостроф и помечает согласную «y» заглавной буквой."""
+
+    word = word.lstrip("'")
+    if word.startswith('y'):
+        word = 'Y' + word[1:]
+    word = ''.join(
+        'Y' if char == 'y' and i and word[i - 1] in EN_VOWELS else char
+        for i, char in enumerate(word)
+    )
+    for suffix in ("'s'", "'s", "'"):
+        if word.endswith(suffix):
+            return word[:-len(suffix)]
+    return word
+
+
+def _en_step1a(word):
+    if word.endswith('sses'):
+        return word[:-2]
+    if word.endswith(('ied', 'ies')):
+        return word[:-2] if len(word) > 4 else word[:-1]
+    if (
+        word.endswith('s') and not word.endswith(('us', 'ss'))
+        and _en_has_vowel(word[:-2])
+    ):
+        return word[:-1]
+    return word
+
+
+def _en_step1b(word, r1):
+    for suffix in ('eedly', 'eed'):
+        if word.endswith(suffix):
+            if len(word) - len(suffix) >= r1:
+                return word[:-len(suffix)] + 'ee'
+            return word
+    for suffix in ('ingly', 'edly', 'ing', 'ed'):
+        if word.endswith(suffix):
+            break
+    else:
+        return word
+    if not _en_has_vowel(word[:-len(suffix)]):
+        return word
+    word = word[:-len(suffix)]
+    if word.endswith(('at', 'bl', 'iz')):
+        return word + 'e'
+    if word.endswith(EN_DOUBLES):
+        return word[:-1]
+    if r1 >= len(word) and _en_short_syllable_end(word):
+        return word + 'e'
+    return word
+
+
+def _en_step1c(word):
+    if len(word) > 2 and word[-1] in 'yY' and not _en_is_vowel(word, -2):
+        return word[:-1] + 'i'
+    return word
+
+
+def _en_replace(word, region, pairs, extra=None):
+    for suffix, replacement in pairs:
+        if word.endswith(suffix):
+            if len(word) - len(suffix) < region:
+                return word
+            if extra is not None and not extra(word, suffix):
+                return word
+            return word[:len(word) - len(suffix)] + replacement
+    return word
+
+
+def _en_step2_check(word, suffix):
+    if suffix == 'ogi':
+        return word[-4:-3] == 'l'
+    if suffix == 'li':
+        return word[-3:-2] in tuple(EN_LI_ENDING)
+    return True
+
+
+def _en_step3(word, r1, r2):
+    if word.endswith('ative'):
+        return word[:-5] if len(word) - 5 >= r2 else word
+    return _en_replace(word, r1, EN_STEP3)
+
+
+def _en_step4(word, r2):
+    for suffix in EN_STEP4:
+        if word.endswith(suffix):
+            if len(word) - len(suffix) >= r2 and (
+                suffix != 'ion' or word[-4:-3] in ('s', 't')
+            ):
+                return word[:-len(suffix)]
+            return word
+    return word
+
+
+def _en_step5(word, r1, r2):
+    if word.endswith('e'):
+        if len(word) - 1 >= r2 or (
+            len(word) - 1 >= r1 and not _en_short_syllable_end(word[:-1])
+        ):
+            return word[:-1]
+    elif word.endswith('ll') and len(word) - 1 >= r2:
+        return word[:-1]
+    return word
+
+
+def english_stem(word):
+    if len(word) <= 2:
+        return word
+    word = _en_prelude(word)
+    r1, r2 = _english_regions(word)
+    word = _en_step1c(_en_step1b(_en_step1a(word), r1))
+    word = _en_replace(word, r1, EN_STEP2, _en_step2_check)
+    word = _en_step3(word, r1, r2)
+    word = _en_step4(word, r2)
+    word = _en_step5(word, r1, r2)
+    return word.replace('Y', 'y')
@@ -0,0 +1,51 @@
+"""Версии таблиц: число записей и последнее значение `modified`.
+
+По версии процесс узнаёт, что таблицу изменил другой процесс, и
+обновляет свои кеши и индексы в памяти. Число записей и MAX читаются
+отдельными подзапросами одного SELECT: так MAX берётся из индекса по
+`modified` без просмотра таблицы. SQLite применяет эту оптимизацию,
+только когда MAX — единственный агрегат запроса.
+"""
+from django.db import connection
+
+VERSION_SQL = (
+    '(SELECT COUNT(*) FROM {table}), (SELECT MAX({column}) FROM {table})'
+)
+
+
+def convert(field, value):
+    """Значение из базы, приведённое как в ORM: строка SQLite → datetime."""
+
+    column = field.get_col(field.model._meta.db_table)
+    converters = (
+        connection.ops.get_db_converters(column)
+        + field.get_db_converters(connection)
+    )
+    for converter in converters:
+        value = converter(value, column, connection)
+    return value
+
+
+def get_versions(*models):
+    """Версии моделей одним запросом: пары (число записей, `modified`)."""
+
+    quote_name = connection.ops.quote_name
+    fields = [model._meta.get_field('modified') for model in models]
+    columns = ', '.join(
+        VERSION_SQL.format(
+            table=quote_name(field.model._meta.db_table),
+            column=quote_name(field.column),
+        )
+        for field in fields
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT {columns}')
+        row = cursor.fetchone()
+    return [
+        (count, convert(field, modified))
+        for field, count, modified in zip(fields, row[::2], row[1::2])
+    ]
+
+
+def get_version(model):
+    return get_versions(model)[0]
@@ -2,6 +2,7 @@ from django.contrib.admin import ModelAdmin, register
 from django.contrib.auth import get_user_model
 
 from .forms import UserForm
+from .models import OutgoingEmail
 
 User = get_user_model()
 
@@ -24,3 +25,17 @@ class UserAdmin(ModelAdmin):
         'role',
         'bio'
     )
+
+
+@register(OutgoingEmail)
+class OutgoingEmailAdmin(ModelAdmin):
+    list_display = (
+        'subject',
+        'recipients',
+        'status',
+        'attempts',
+        'next_attempt_at',
+        'sent_at'
+    )
+    list_filter = ('status',)
+    readonly_fields = ('created', 'sent_at', 'last_error')
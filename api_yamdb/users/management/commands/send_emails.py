@@ -0,0 +1,49 @@
+from time import sleep
+
+from django.core.management import BaseCommand
+
+from users.outbox import drain
+
+
+class Command(BaseCommand):
+    """Отправка писем из очереди."""
+
+    help = 'Отправляет письма из очереди пачками через одно соединение.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Количество писем, отправляемых через одно соединение.'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Работать постоянно, проверяя очередь каждые --interval с.'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5.0,
+            help='Пауза между проверками пустой очереди, секунды.'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        while True:
+            total_sent = total_failed = 0
+            while True:
+                sent, failed = drain(batch_size)
+                total_sent += sent
+                total_failed += failed
+                if sent + failed < batch_size:
+                    break
+            if total_sent or total_failed or not options['loop']:
+                self.stdout.write(
+                    f'Отправлено писем: {total_sent}, '
+                    f'с ошибкой: {total_failed}.'
+                )
+            if not options['loop']:
+                return
+            sleep(options['interval'])
@@ -1,5 +1,7 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models import F
+from django.utils import timezone
 
 
 class CustomUser(AbstractUser):
@@ -15,6 +17,10 @@ class CustomUser(AbstractUser):
         (ROLE_ADMIN, 'Администратор'),
     )
 
+    # Поля, от которых зависят права доступа: их изменение отзывает
+    # выданные токены с ролью (см. api.authentication).
+    ACCESS_FIELDS = ('role', 'is_staff', 'is_superuser', 'is_active')
+
     username = models.CharField(
         max_length=150,
         unique=True,
@@ -47,6 +53,11 @@ class CustomUser(AbstractUser):
         default=ROLE_USER,
         verbose_name='Роль'
     )
+    token_version = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Версия токенов'
+    )
 
     @property
     def is_user(self):
@@ -67,3 +78,121 @@ class CustomUser(AbstractUser):
 
     def __str__(self):
         return self.username
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_access = instance.get_loaded_access()
+        return instance
+
+    def get_loaded_access(self):
+        """Загруженные поля доступа; отложенные поля не загружаются."""
+
+        return {
+            field: self.__dict__[field] for field in self.ACCESS_FIELDS
+            if field in self.__dict__
+        }
+
+    def access_changed(self, update_fields=None):
+        """Меняет ли сохранение поля доступа.
+
+        Поля, загруженные вместе с записью, сравниваются с загруженными
+        значениями, остальные — со значениями в базе. Отложенные поля и
+        поля вне update_fields сохранение не записывает.
+        """
+
+        if self._state.adding or self.pk is None:
+            return False
+        deferred = self.get_deferred_fields()
+        fields = [
+            field for field in self.ACCESS_FIELDS
+            if field not in deferred
+            and (update_fields is None or field in update_fields)
+        ]
+        loaded = getattr(self, '_loaded_access', {})
+        if any(
+            getattr(self, field) != loaded[field]
+            for field in fields if field in loaded
+        ):
+            return True
+        unknown = [field for field in fields if field not in loaded]
+        if not unknown:
+            return False
+        stored = type(self)._base_manager.using(self._state.db).filter(
+            pk=self.pk
+        ).values_list(*unknown).first()
+        return stored is not None and stored != tuple(
+            getattr(self, field) for field in unknown
+        )
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        bump = self.access_changed(update_fields)
+        if bump:
+            # Версия увеличивается в базе: параллельные сохранения не
+            # перезапишут друг другу отзыв токенов.
+            self.token_version = F('token_version') + 1
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'token_version'}
+        super().save(*args, **kwargs)
+        if bump:
+            # Новое значение загрузится из базы при первом обращении.
+            del self.__dict__['token_version']
+        self._loaded_access = self.get_loaded_access()
+
+
+class OutgoingEmail(models.Model):
+    """Письмо в очереди на отправку (см. users.outbox)."""
+
+    STATUS_PENDING = 'pending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Ожидает отправки'),
+        (STATUS_SENT, 'Отправлено'),
+        (STATUS_FAILED, 'Не отправлено'),
+    )
+
+    subject = models.CharField(max_length=255, verbose_name='Тема')
+    body = models.TextField(verbose_name='Текст')
+    from_email = models.CharField(max_length=254, verbose_name='Отправитель')
+    recipients = models.TextField(
+        verbose_name='Получатели',
+        help_text='Адреса через перевод строки.'
+    )
+    status = models.CharField(
+        max_length=16,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+        verbose_name='Статус'
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Попыток отправки'
+    )
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Следующая попытка'
+    )
+    last_error = models.TextField(blank=True, verbose_name='Последняя ошибка')
+    created = models.DateTimeField(auto_now_add=True, verbose_name='Создано')
+    sent_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Отправлено'
+    )
+
+    class Meta:
+        verbose_name = 'Исходящее письмо'
+        verbose_name_plural = 'Исходящие письма'
+        ordering = ['-created']
+        indexes = [
+            models.Index(
+                fields=('status', 'next_attempt_at'),
+                name='outgoing_email_due_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.subject} → {self.recipients}'
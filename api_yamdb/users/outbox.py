@@ -0,0 +1,176 @@
+"""Очередь исходящих писем.
+
+Запрос только записывает письмо в таблицу `OutgoingEmail`, а отправляет
+его команда `send_emails`: пачками через одно соединение с почтовым
+сервером, с повторными попытками и растущей паузой между ними.
+
+При `EMAIL_OUTBOX_EAGER = True` письмо отправляется сразу после фиксации
+транзакции тем же кодом, что и в команде. Ошибка отправки в этом режиме
+не доходит до клиента: письмо остаётся в очереди до следующей попытки.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import OutgoingEmail
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_email(subject, body, from_email, recipients):
+    """Ставит письмо в очередь и возвращает запись очереди.
+
+    Письмо для немедленной отправки сразу считается забранным, чтобы
+    его одновременно не отправила и команда `send_emails`.
+    """
+
+    eager = settings.EMAIL_OUTBOX_EAGER
+    message = OutgoingEmail.objects.create(
+        subject=subject,
+        body=body,
+        from_email=from_email,
+        recipients='\n'.join(recipients),
+        next_attempt_at=claim_deadline() if eager else timezone.now(),
+    )
+    if eager:
+        transaction.on_commit(lambda: deliver([message]))
+    return message
+
+
+def retry_delay(attempts):
+    """Пауза перед следующей попыткой: удваивается с каждой неудачей."""
+
+    delay = settings.EMAIL_OUTBOX_RETRY_DELAY * 2 ** (attempts - 1)
+    return timedelta(
+        seconds=min(delay, settings.EMAIL_OUTBOX_MAX_RETRY_DELAY)
+    )
+
+
+def claim_deadline():
+    return timezone.now() + timedelta(
+        seconds=settings.EMAIL_OUTBOX_CLAIM_TIMEOUT
+    )
+
+
+def due_messages():
+    return OutgoingEmail.objects.filter(
+        status=OutgoingEmail.STATUS_PENDING,
+        next_attempt_at__lte=timezone.now(),
+    ).order_by('next_attempt_at', 'id')
+
+
+def claim(batch_size):
+    """Забирает пачку писем, готовых к отправке.
+
+    Время следующей попытки сдвигается на EMAIL_OUTBOX_CLAIM_TIMEOUT,
+    поэтому параллельный обработчик не возьмёт эти письма, а письма
+    упавшего обработчика вернутся в работу по истечении этого времени.
+    """
+
+    deadline = claim_deadline()
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            messages = list(
+                due_messages().select_for_update(skip_locked=True)[
+                    :batch_size
+                ]
+            )
+            OutgoingEmail.objects.filter(
+                id__in=[message.id for message in messages]
+            ).update(next_attempt_at=deadline)
+    else:
+        messages = claim_each(due_messages()[:batch_size], deadline)
+    for message in messages:
+        message.next_attempt_at = deadline
+    return messages
+
+
+def claim_each(messages, deadline):
+    """Забирает письма условным UPDATE, если SKIP LOCKED недоступен (SQLite).
+
+    Письмо достаётся тому обработчику, чей UPDATE изменил строку: у
+    забранного конкурентом письма время попытки уже не то, что прочитано.
+    """
+
+    return [
+        message for message in messages
+        if OutgoingEmail.objects.filter(
+            pk=message.pk,
+            status=OutgoingEmail.STATUS_PENDING,
+            next_attempt_at=message.next_attempt_at,
+        ).update(next_attempt_at=deadline)
+    ]
+
+
+def deliver(messages, mail_connection=None):
+    """Отправляет письма через одно соединение, возвращает (sent, failed).
+
+    Каждое письмо получает свой статус: ошибка одного письма не мешает
+    отправке остальных.
+    """
+
+    sent = failed = 0
+    if not messages:
+        return sent, failed
+    mail_connection = mail_connection or get_connection()
+    try:
+        mail_connection.open()
+    except Exception as error:
+        for message in messages:
+            mark_failed(message, error)
+        return sent, len(messages)
+    try:
+        for message in messages:
+            try:
+                EmailMessage(
+                    message.subject,
+                    message.body,
+                    message.from_email,
+                    message.recipients.split('\n'),
+                    connection=mail_connection,
+                ).send()
+            except Exception as error:
+                mark_failed(message, error)
+                failed += 1
+            else:
+                mark_sent(message)
+                sent += 1
+    finally:
+        mail_connection.close()
+    return sent, failed
+
+
+def mark_sent(message):
+    message.status = OutgoingEmail.STATUS_SENT
+    message.attempts += 1
+    message.sent_at = timezone.now()
+    message.last_error = ''
+    message.save(update_fields=('status', 'attempts', 'sent_at', 'last_error'))
+
+
+def mark_failed(message, error):
+    message.attempts += 1
+    message.last_error = f'{type(error).__name__}: {error}'
+    if message.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+        message.status = OutgoingEmail.STATUS_FAILED
+    else:
+        message.next_attempt_at = timezone.now() + retry_delay(
+            message.attempts
+        )
+    message.save(
+        update_fields=('status', 'attempts', 'next_attempt_at', 'last_error')
+    )
+    logger.warning(
+        'Не удалось отправить письмо %s (попытка %s): %s',
+        message.id, message.attempts, message.last_error
+    )
+
+
+def drain(batch_size):
+    """Отправляет одну пачку писем из очереди, возвращает (sent, failed)."""
+
+    return deliver(claim(batch_size))
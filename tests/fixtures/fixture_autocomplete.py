@@ -0,0 +1,16 @@
+import pytest
+
+from reviews.autocomplete import title_prefix_index
+
+
+@pytest.fixture(autouse=True)
+def autocomplete_index(settings):
+    # Индекс подсказок синхронизируется в самом запросе и при каждом
+    # поиске, а данные прошлого теста в него не попадают.
+    settings.AUTOCOMPLETE = {
+        **settings.AUTOCOMPLETE, 'SYNC_INTERVAL': 0, 'BACKGROUND': False
+    }
+    title_prefix_index.clear()
+    yield
+    title_prefix_index.wait()
+    title_prefix_index.clear()
@@ -0,0 +1,10 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def metrics_dir(settings, tmp_path):
+    from api.metrics import store
+    # Файлы метрик каждого теста — в своём временном каталоге.
+    settings.METRICS = {**settings.METRICS, 'DIR': str(tmp_path / 'metrics')}
+    store.reset()
+    yield settings.METRICS['DIR']
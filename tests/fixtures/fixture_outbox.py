@@ -0,0 +1,8 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def send_emails_eagerly(settings):
+    # Тесты регистрации проверяют письмо сразу после запроса; очередь без
+    # немедленной отправки проверяет test_15_outbox.
+    settings.EMAIL_OUTBOX_EAGER = True
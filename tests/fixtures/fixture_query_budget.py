@@ -0,0 +1,7 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def enforce_query_budget(settings):
+    # В тестах превышение бюджета запросов и N+1 — ошибка запроса.
+    settings.QUERY_BUDGET = {**settings.QUERY_BUDGET, 'RAISE': True}
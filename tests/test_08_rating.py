@@ -0,0 +1,78 @@
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from reviews.models import Review, Title
+
+from .common import create_reviews
+
+
+class Test08Rating:
+
+    def get_rating(self, client, title_id):
+        response = client.get(f'/api/v1/titles/{title_id}/')
+        assert response.status_code == 200
+        return response.json()['rating']
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_rating_follows_reviews(self, admin_client, admin):
+        reviews, titles, user, _ = create_reviews(admin_client, admin)
+        title_id = titles[0]['id']
+        assert self.get_rating(admin_client, title_id) == 4, (
+            'Проверьте, что рейтинг произведения равен среднему по оценкам'
+        )
+        assert self.get_rating(admin_client, titles[1]['id']) is None, (
+            'Проверьте, что у произведения без отзывов рейтинг равен None'
+        )
+        title = Title.objects.get(pk=title_id)
+        assert (title.rating_sum, title.review_count) == (12, 3)
+
+        admin_client.patch(
+            f'/api/v1/titles/{title_id}/reviews/{reviews[0]["id"]}/',
+            data={'score': 8}
+        )
+        assert self.get_rating(admin_client, title_id) == 5, (
+            'Проверьте, что изменение оценки пересчитывает рейтинг'
+        )
+
+        admin_client.delete(
+            f'/api/v1/titles/{title_id}/reviews/{reviews[0]["id"]}/'
+        )
+        title.refresh_from_db()
+        assert (title.rating_sum, title.review_count) == (7, 2)
+        assert title.rating == 3.5
+
+        user.delete()
+        title.refresh_from_db()
+        assert (title.rating_sum, title.review_count) == (4, 1), (
+            'Проверьте, что каскадное удаление отзывов обновляет рейтинг'
+        )
+        call_command('rebuild_ratings', '--check')
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_rebuild_ratings(self, admin_client, admin):
+        _, titles, _, _ = create_reviews(admin_client, admin)
+        Title.objects.update(rating_sum=0, review_count=0, rating=None)
+        with pytest.raises(Exception):
+            call_command('rebuild_ratings', '--check')
+        call_command('rebuild_ratings')
+        call_command('rebuild_ratings', '--check')
+        title = Title.objects.get(pk=titles[0]['id'])
+        assert (title.rating_sum, title.review_count) == (12, 3)
+        assert title.rating == 4
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_title_delete_skips_rating(self, admin_client, admin):
+        _, titles, _, _ = create_reviews(admin_client, admin)
+        with CaptureQueriesContext(connection) as queries:
+            Title.objects.get(pk=titles[0]['id']).delete()
+        updates = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('UPDATE "reviews_title"')
+        ]
+        assert updates == [], (
+            'Проверьте, что удаление произведения не пересчитывает его '
+            'рейтинг на каждый удалённый отзыв'
+        )
+        assert not Review.objects.filter(title_id=titles[0]['id']).exists()
@@ -0,0 +1,56 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from reviews.models import Category, Comment, Review, Title
+
+
+class Test09ImportData:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_import_data(self):
+        call_command('import_data', batch_size=10, stdout=StringIO())
+        assert Category.objects.count() == 3
+        assert Title.objects.filter(category__isnull=False).count() == 32, (
+            'Проверьте, что при импорте произведениям присваивается категория'
+        )
+        assert Review.objects.count() == 72
+        assert Comment.objects.count() == 3
+        call_command('rebuild_ratings', '--check', stdout=StringIO())
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_import_data_twice(self):
+        call_command('import_data', stdout=StringIO())
+        call_command('import_data', stdout=StringIO())
+        assert Review.objects.count() == 72, (
+            'Проверьте, что повторный импорт не создаёт дубликаты'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_import_genre_title(self):
+        call_command('import_data', stdout=StringIO())
+        through = Title.genre.through
+        assert through.objects.count() == 42, (
+            'Проверьте, что импортируются связи произведений с жанрами'
+        )
+        title = Title.objects.get(pk=1)
+        through.objects.filter(title=title).delete()
+        call_command('import_data', stdout=StringIO())
+        assert through.objects.count() == 42, (
+            'Проверьте, что повторный импорт не дублирует связи с жанрами'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_default_batch_size(self, tmp_path):
+        rows = ['id,name,slug'] + [
+            f'{pk},Категория {pk},category-{pk}' for pk in range(1, 1201)
+        ]
+        (tmp_path / 'category.csv').write_text(
+            '\n'.join(rows), encoding='utf-8'
+        )
+        call_command('import_data', path=str(tmp_path), stdout=StringIO())
+        assert Category.objects.count() == 1200, (
+            'Проверьте, что файл больше лимита бэкенда на одну вставку '
+            'загружается с размером пакета по умолчанию'
+        )
@@ -0,0 +1,53 @@
+import pytest
+
+from .common import create_comments, create_reviews
+
+
+class Test10KeysetPagination:
+
+    def walk(self, client, url):
+        pages = []
+        while url:
+            response = client.get(url)
+            assert response.status_code == 200
+            data = response.json()
+            assert 'count' not in data, (
+                'Проверьте, что курсорная пагинация не считает записи'
+            )
+            pages.append(data)
+            url = data['next']
+        return pages
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_reviews_keyset(self, admin_client, admin):
+        reviews, titles, _, _ = create_reviews(admin_client, admin)
+        url = (f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+               f'?pagination=keyset&page_size=2')
+        pages = self.walk(admin_client, url)
+        ids = [item['id'] for page in pages for item in page['results']]
+        assert ids == sorted((review['id'] for review in reviews),
+                             reverse=True), (
+            'Проверьте, что курсорная пагинация отдаёт все отзывы '
+            'от новых к старым без повторов'
+        )
+        assert pages[0]['previous'] is None
+        previous = admin_client.get(pages[-1]['previous']).json()
+        assert previous['results'] == pages[0]['results'], (
+            'Проверьте ссылку на предыдущую страницу'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_comments_keyset(self, admin_client, admin):
+        comments, reviews, titles, _, _ = create_comments(admin_client, admin)
+        url = (f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+               f'{reviews[0]["id"]}/comments/?pagination=keyset&page_size=1')
+        pages = self.walk(admin_client, url)
+        assert len(pages) == len(comments)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_invalid_cursor(self, admin_client, admin):
+        _, titles, _, _ = create_reviews(admin_client, admin)
+        response = admin_client.get(
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/?cursor=broken'
+        )
+        assert response.status_code == 404
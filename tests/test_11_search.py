@@ -0,0 +1,71 @@
+import pytest
+
+from .common import create_titles
+
+
+class Test11TitleSearch:
+
+    def search(self, client, text):
+        response = client.get('/api/v1/titles/', {'search': text})
+        assert response.status_code == 200
+        return [title['name'] for title in response.json()['results']]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_search_titles(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        assert self.search(client, 'поворот') == [titles[0]['name']], (
+            'Проверьте, что `?search=` ищет по названию произведения'
+        )
+        assert self.search(client, 'драма') == [titles[1]['name']], (
+            'Проверьте, что `?search=` ищет по описанию произведения'
+        )
+        assert self.search(client, 'несуществующее') == []
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_search_follows_updates(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        admin_client.patch(
+            f'/api/v1/titles/{titles[1]["id"]}/',
+            data={'name': 'Переименованный',
+                  'category': titles[1]['category']}
+        )
+        assert self.search(client, 'переименованный') == ['Переименованный']
+        assert self.search(client, 'проект') == []
+        admin_client.delete(f'/api/v1/titles/{titles[0]["id"]}/')
+        assert self.search(client, 'поворот') == []
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_search_syntax_is_escaped(self, client, admin_client):
+        create_titles(admin_client)
+        assert self.search(client, 'NOT " OR *') == []
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_search_word_forms(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        assert self.search(client, 'поворота') == [titles[0]['name']], (
+            'Проверьте, что поиск находит другие формы слова из названия'
+        )
+        assert self.search(client, 'пово') == [titles[0]['name']], (
+            'Проверьте, что поиск находит слово по началу'
+        )
+        assert self.search(client, 'ужасов') == [titles[0]['name']], (
+            'Проверьте, что поиск идёт и по названиям жанров произведения'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_search_categories_and_genres(self, client, admin_client):
+        create_titles(admin_client)
+        response = client.get('/api/v1/categories/', {'search': 'книгу'})
+        assert [item['slug'] for item in response.json()['results']] == [
+            'books'
+        ]
+        response = client.get('/api/v1/genres/', {'search': 'комедии'})
+        assert [item['slug'] for item in response.json()['results']] == [
+            'comedy'
+        ]
+
+    def test_06_stemmers(self):
+        from reviews.search import index_text
+        assert index_text('Войны, ВОЙНА и войной') == 'войн войн и войн'
+        assert index_text('Звёздные звездный') == 'звездн звездн'
+        assert index_text('Running runs') == 'run run'
@@ -0,0 +1,108 @@
+import pytest
+
+from reviews.autocomplete import (
+    PackedTitles, TitlePrefixIndex, title_prefix_index
+)
+
+from .common import create_titles
+
+
+class Test12TitleAutocomplete:
+
+    def suggest(self, client, text, **params):
+        response = client.get(
+            '/api/v1/titles/autocomplete/', {'q': text, **params}
+        )
+        assert response.status_code == 200, (
+            'Проверьте, что эндпоинт `/api/v1/titles/autocomplete/` доступен'
+        )
+        return response.json()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_autocomplete(self, client, admin_client):
+        title_prefix_index.load()
+        titles, _, _ = create_titles(admin_client)
+        assert self.suggest(client, 'пов') == [
+            {'id': titles[0]['id'], 'name': titles[0]['name']}
+        ], 'Проверьте, что подсказки возвращают id и название'
+        assert self.suggest(client, 'ТУД') == [
+            {'id': titles[0]['id'], 'name': titles[0]['name']}
+        ], 'Проверьте, что подсказки ищут и по началу любого слова'
+        assert self.suggest(client, '') == []
+        assert len(self.suggest(client, 'п', limit=1)) == 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_autocomplete_follows_changes(self, client, admin_client):
+        title_prefix_index.load()
+        titles, _, _ = create_titles(admin_client)
+        admin_client.patch(
+            f'/api/v1/titles/{titles[1]["id"]}/',
+            data={'name': 'Новое имя', 'category': titles[1]['category']}
+        )
+        assert self.suggest(client, 'проект') == []
+        assert self.suggest(client, 'нов') == [
+            {'id': titles[1]['id'], 'name': 'Новое имя'}
+        ]
+        admin_client.delete(f'/api/v1/titles/{titles[0]["id"]}/')
+        assert self.suggest(client, 'пов') == []
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_other_process_reloads(self, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        # Индекс другого процесса: сигналы этого процесса его не обновляют.
+        other = TitlePrefixIndex()
+        other.load()
+        admin_client.patch(
+            f'/api/v1/titles/{titles[1]["id"]}/',
+            data={'name': 'Новое имя', 'category': titles[1]['category']}
+        )
+        assert other.search('нов', 10) == [(titles[1]['id'], 'Новое имя')], (
+            'Проверьте, что индекс другого процесса видит переименование'
+        )
+        assert other.search('проект', 10) == []
+        admin_client.delete(f'/api/v1/titles/{titles[0]["id"]}/')
+        assert other.search('пов', 10) == [], (
+            'Проверьте, что индекс другого процесса видит удаление'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_background_load(self, admin_client, settings):
+        titles, _, _ = create_titles(admin_client)
+        settings.AUTOCOMPLETE = {**settings.AUTOCOMPLETE, 'BACKGROUND': True}
+        other = TitlePrefixIndex()
+        assert other.search('пов', 10) == [], (
+            'Проверьте, что до загрузки индекса подсказок нет, а запрос '
+            'не ждёт загрузки'
+        )
+        other.wait()
+        assert other.search('пов', 10) == [
+            (titles[0]['id'], titles[0]['name'])
+        ]
+        admin_client.delete(f'/api/v1/titles/{titles[0]["id"]}/')
+        other.search('пов', 10)
+        other.wait()
+        assert other.search('пов', 10) == [], (
+            'Проверьте, что после удаления индекс перезагружается в фоне'
+        )
+
+    def test_05_delta_and_compact(self, settings):
+        settings.AUTOCOMPLETE = {
+            **settings.AUTOCOMPLETE, 'SYNC_INTERVAL': 60,
+            'COMPACT_THRESHOLD': 2
+        }
+        index = TitlePrefixIndex()
+        packed = PackedTitles([(1, 'Поворот туда'), (2, 'Ёлка')])
+        index.swap(packed, 0, (2, None))
+        index.update(2, 'Ель')
+        index.update(3, 'Повесть')
+        assert index.search('пов', 10) == [(3, 'Повесть'), (1, 'Поворот туда')]
+        assert index.search('ел', 10) == [(2, 'Ель')]
+        index.remove(1)
+        assert index.search('туда', 10) == [], (
+            'Проверьте, что удалённое произведение не попадает в подсказки'
+        )
+        assert index.search('пов', 10) == [(3, 'Повесть')]
+        assert index._delta == {}, (
+            'Проверьте, что большая дельта переносится в основной индекс'
+        )
+        assert index.search('е', 10) == [(2, 'Ель')]
@@ -0,0 +1,84 @@
+import warnings
+
+import pytest
+from django.core.cache.backends.base import CacheKeyWarning
+from django.utils import timezone
+
+from api.cache import get_stats
+from api.metrics import store
+from reviews.models import Category
+
+from .common import create_categories, create_genre
+
+
+class Test13ListCache:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_categories_cache(self, client, admin_client):
+        create_categories(admin_client)
+        response = client.get('/api/v1/categories/')
+        assert response['X-Cache'] == 'MISS'
+        response = client.get('/api/v1/categories/')
+        assert response['X-Cache'] == 'HIT', (
+            'Проверьте, что повторный запрос списка категорий берётся из кеша'
+        )
+        assert response.json()['count'] == 2
+        assert client.get('/api/v1/categories/?search=фильм')['X-Cache'] == (
+            'MISS'
+        ), 'Проверьте, что параметры запроса входят в ключ кеша'
+        assert get_stats() == {'hits': 1, 'misses': 2}
+
+        admin_client.post(
+            '/api/v1/categories/', data={'name': 'Музыка', 'slug': 'music'}
+        )
+        response = client.get('/api/v1/categories/')
+        assert response['X-Cache'] == 'MISS'
+        assert response.json()['count'] == 3, (
+            'Проверьте, что после создания категории кеш списка сбрасывается'
+        )
+        admin_client.delete('/api/v1/categories/music/')
+        assert client.get('/api/v1/categories/').json()['count'] == 2, (
+            'Проверьте, что после удаления категории кеш списка сбрасывается'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_genres_cache(self, client, admin_client):
+        create_genre(admin_client)
+        assert client.get('/api/v1/genres/').json()['count'] == 3
+        admin_client.delete('/api/v1/genres/horror/')
+        response = client.get('/api/v1/genres/')
+        assert response['X-Cache'] == 'MISS'
+        assert response.json()['count'] == 2
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_write_in_other_process(self, client, admin_client):
+        create_categories(admin_client)
+        client.get('/api/v1/categories/')
+        # Запись другого процесса: сигналы этого процесса не срабатывают.
+        Category.objects.filter(slug='films').update(
+            name='Кино', modified=timezone.now()
+        )
+        response = client.get('/api/v1/categories/')
+        assert response['X-Cache'] == 'MISS'
+        assert 'Кино' in [item['name'] for item in response.json()['results']], (
+            'Проверьте, что версия списка берётся из базы, а не из памяти '
+            'процесса'
+        )
+        # Счётчики видны из другого процесса, например из cache_stats.
+        store.flush()
+        store.reset()
+        assert get_stats() == {'hits': 0, 'misses': 2}, (
+            'Проверьте, что счётчики кеша пишутся в общее хранилище метрик'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_memcached_safe_keys(self, client, admin_client):
+        create_categories(admin_client)
+        url = '/api/v1/categories/?search=' + 'ф' * 300
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', CacheKeyWarning)
+            assert client.get(url)['X-Cache'] == 'MISS'
+            assert client.get(url)['X-Cache'] == 'HIT', (
+                'Проверьте, что ключ кеша подходит для memcached: без '
+                'пробелов и не длиннее 250 символов'
+            )
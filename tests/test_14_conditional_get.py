@@ -0,0 +1,85 @@
+import pytest
+from django.utils import timezone
+from django.utils.http import http_date
+
+from reviews.models import Genre, Title
+
+from .common import create_comments, create_reviews, create_titles
+
+
+class Test14ConditionalGet:
+
+    def assert_not_modified(self, client, url):
+        response = client.get(url)
+        assert response.status_code == 200
+        etag = response['ETag']
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304, (
+            f'Проверьте, что `{url}` отвечает 304 на совпадающий If-None-Match'
+        )
+        return etag
+
+    def assert_modified(self, client, url, etag):
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            f'Проверьте, что после изменения данных `{url}` отдаёт новый ответ'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_titles(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        detail = f'/api/v1/titles/{titles[0]["id"]}/'
+        list_etag = self.assert_not_modified(client, '/api/v1/titles/')
+        detail_etag = self.assert_not_modified(client, detail)
+        admin_client.patch(detail, data={
+            'name': 'Новое название', 'category': titles[0]['category']
+        })
+        self.assert_modified(client, '/api/v1/titles/', list_etag)
+        self.assert_modified(client, detail, detail_etag)
+
+        detail_etag = self.assert_not_modified(client, detail)
+        admin_client.delete(f'/api/v1/categories/{titles[0]["category"]}/')
+        self.assert_modified(client, detail, detail_etag)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_reviews(self, client, admin_client, admin):
+        reviews, titles, user, _ = create_reviews(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        response = client.get(url)
+        assert 'Last-Modified' not in response
+        response = client.get(url, HTTP_IF_MODIFIED_SINCE=http_date())
+        assert response.status_code == 200, (
+            'Проверьте, что If-Modified-Since с точностью до секунды не '
+            'даёт ответ 304: изменение в ту же секунду было бы пропущено'
+        )
+        etag = self.assert_not_modified(client, url)
+        admin_client.patch(f'{url}{reviews[0]["id"]}/', data={'text': 'new'})
+        self.assert_modified(client, url, etag)
+        assert client.get(
+            f'/api/v1/titles/{titles[1]["id"]}/reviews/{reviews[0]["id"]}/'
+        ).status_code == 404
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_comments(self, client, admin_client, admin):
+        comments, reviews, titles, _, _ = create_comments(admin_client, admin)
+        url = (f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+               f'{reviews[0]["id"]}/comments/')
+        etag = self.assert_not_modified(client, url)
+        admin_client.delete(f'{url}{comments[0]["id"]}/')
+        self.assert_modified(client, url, etag)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_titles_write_in_other_process(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        url = '/api/v1/titles/'
+        etag = self.assert_not_modified(client, url)
+        # Записи другого процесса: сигналы этого процесса не срабатывают.
+        Title.objects.filter(pk=titles[0]['id']).update(
+            name='Другое название', modified=timezone.now()
+        )
+        self.assert_modified(client, url, etag)
+        etag = self.assert_not_modified(client, url)
+        Genre.objects.filter(slug='drama').update(
+            name='Трагедия', modified=timezone.now()
+        )
+        self.assert_modified(client, url, etag)
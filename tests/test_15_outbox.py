@@ -0,0 +1,111 @@
+import pytest
+from django.core import mail
+from django.core.management import call_command
+from django.utils import timezone
+
+from users.models import OutgoingEmail
+from users.outbox import (claim, claim_deadline, claim_each, due_messages,
+                          enqueue_email)
+
+
+class FailingBackend:
+    """Почтовый бэкенд, который не может отправить письмо."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def send_messages(self, messages):
+        raise ConnectionError('почтовый сервер недоступен')
+
+
+SIGNUP_DATA = {'username': 'newuser', 'email': 'newuser@yamdb.fake'}
+
+
+class Test15Outbox:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_signup_enqueues(self, client, settings):
+        settings.EMAIL_OUTBOX_EAGER = False
+        response = client.post('/api/v1/auth/signup/', data=SIGNUP_DATA)
+        assert response.status_code == 200
+        assert len(mail.outbox) == 0, (
+            'Проверьте, что регистрация только ставит письмо в очередь'
+        )
+        message = OutgoingEmail.objects.get()
+        assert message.status == OutgoingEmail.STATUS_PENDING
+        assert message.recipients == SIGNUP_DATA['email']
+
+        call_command('send_emails')
+        assert len(mail.outbox) == 1, (
+            'Проверьте, что команда send_emails отправляет письма из очереди'
+        )
+        assert mail.outbox[0].to == [SIGNUP_DATA['email']]
+        message.refresh_from_db()
+        assert message.status == OutgoingEmail.STATUS_SENT
+        assert message.attempts == 1
+        assert message.sent_at is not None
+
+        call_command('send_emails')
+        assert len(mail.outbox) == 1, (
+            'Проверьте, что отправленное письмо не отправляется повторно'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_retry_with_backoff(self, client, settings):
+        settings.EMAIL_BACKEND = 'tests.test_15_outbox.FailingBackend'
+        response = client.post('/api/v1/auth/signup/', data=SIGNUP_DATA)
+        assert response.status_code == 200, (
+            'Проверьте, что ошибка почтового сервера не ломает регистрацию'
+        )
+        message = OutgoingEmail.objects.get()
+        assert message.status == OutgoingEmail.STATUS_PENDING
+        assert message.attempts == 1
+        assert 'ConnectionError' in message.last_error
+        first_delay = message.next_attempt_at - timezone.now()
+        assert first_delay.total_seconds() > 0, (
+            'Проверьте, что следующая попытка откладывается'
+        )
+
+        OutgoingEmail.objects.update(next_attempt_at=timezone.now())
+        call_command('send_emails')
+        message.refresh_from_db()
+        assert message.attempts == 2
+        assert message.next_attempt_at - timezone.now() > first_delay, (
+            'Проверьте, что пауза между попытками растёт'
+        )
+
+        for attempt in range(3, settings.EMAIL_OUTBOX_MAX_ATTEMPTS + 1):
+            OutgoingEmail.objects.update(next_attempt_at=timezone.now())
+            call_command('send_emails')
+            message.refresh_from_db()
+            assert message.attempts == attempt
+        assert message.status == OutgoingEmail.STATUS_FAILED, (
+            'Проверьте, что после последней попытки письмо помечается '
+            'неотправленным'
+        )
+
+        settings.EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+        OutgoingEmail.objects.update(next_attempt_at=timezone.now())
+        call_command('send_emails')
+        assert len(mail.outbox) == 0
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_claimed_once(self, settings):
+        settings.EMAIL_OUTBOX_EAGER = False
+        for number in range(3):
+            enqueue_email('Тема', 'Текст', 'from@yamdb.fake',
+                          [f'user{number}@yamdb.fake'])
+        # Второй обработчик прочитал очередь до того, как первый её забрал.
+        stale = list(due_messages())
+        assert len(claim(10)) == 3
+        assert claim_each(stale, claim_deadline()) == [], (
+            'Проверьте, что письмо, забранное другим обработчиком, не '
+            'отправляется повторно'
+        )
+        assert claim(10) == []
@@ -0,0 +1,64 @@
+import pytest
+from django.contrib.auth import get_user_model
+
+from api.authentication import EVENTS, user_cache
+from api.cache import get_stats
+
+User = get_user_model()
+
+
+class Test16UserCache:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_user_query_is_cached(
+            self, user_client, user, django_assert_num_queries):
+        user_client.get('/api/v1/users/me/')
+        with django_assert_num_queries(0):
+            response = user_client.get('/api/v1/users/me/')
+        assert response.status_code == 200, (
+            'Проверьте, что повторный запрос аутентифицируется без обращения '
+            'к базе'
+        )
+        assert response.json()['username'] == user.username
+        user_cache.flush_stats()
+        assert get_stats(EVENTS) == {'user-hits': 1, 'user-misses': 1}
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_role_change_invalidates(self, admin_client, user_client, user):
+        assert user_client.get('/api/v1/users/').status_code == 403
+        response = admin_client.patch(
+            f'/api/v1/users/{user.username}/', data={'role': 'admin'}
+        )
+        assert response.status_code == 200
+        assert user_client.get('/api/v1/users/').status_code == 200, (
+            'Проверьте, что смена роли сбрасывает кеш пользователя'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_profile_change_and_delete(self, user_client, user):
+        user_client.patch('/api/v1/users/me/', data={'bio': 'новое о себе'})
+        assert user_client.get('/api/v1/users/me/').json()['bio'] == (
+            'новое о себе'
+        ), 'Проверьте, что изменения профиля сбрасывают кеш пользователя'
+
+        User.objects.get(pk=user.pk).delete()
+        assert user_client.get('/api/v1/users/me/').status_code == 401, (
+            'Проверьте, что удалённый пользователь не аутентифицируется'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_lru_bounds(self, settings, admin, user, moderator):
+        settings.USER_CACHE = {'MAX_SIZE': 2, 'TIMEOUT': 60}
+        for cached in (admin, user, moderator):
+            user_cache.set(cached)
+        assert user_cache.get(User, admin.pk) is None, (
+            'Проверьте, что кеш вытесняет давно не использованные записи'
+        )
+        cached = user_cache.get(User, user.pk)
+        assert cached == user and cached is not user
+        assert cached.role == user.role
+
+        settings.USER_CACHE = {'MAX_SIZE': 2, 'TIMEOUT': -1}
+        user_cache.clear()
+        user_cache.set(user)
+        assert user_cache.get(User, user.pk) is None
@@ -0,0 +1,155 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.contrib.auth.tokens import default_token_generator
+from django.core.cache.backends import locmem
+from django.db.models import F
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from reviews.models import Review
+
+from .common import create_titles
+
+User = get_user_model()
+
+
+def claims_client(user):
+    """Клиент с токеном, полученным через /auth/token/."""
+
+    client = APIClient()
+    response = client.post('/api/v1/auth/token/', data={
+        'username': user.username,
+        'confirmation_code': default_token_generator.make_token(user),
+    })
+    assert response.status_code == 200
+    token = response.json()['token']
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+    return client, AccessToken(token)
+
+
+class Test17RoleClaims:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_permissions_without_user_query(
+            self, settings, admin, user, django_assert_num_queries):
+        settings.JWT_ROLE_CLAIMS = True
+        admin_client, token = claims_client(admin)
+        assert token['role'] == 'admin'
+        assert 'ver' in token
+        user_client, _ = claims_client(user)
+
+        admin_client.post('/api/v1/categories/', data={})
+        with django_assert_num_queries(0):
+            response = admin_client.post('/api/v1/categories/', data={})
+        assert response.status_code == 400, (
+            'Проверьте, что права администратора проверяются по токену '
+            'без обращения к базе'
+        )
+        user_client.post('/api/v1/categories/', data={})
+        with django_assert_num_queries(0):
+            response = user_client.post('/api/v1/categories/', data={})
+        assert response.status_code == 403
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_role_change_revokes_token(self, settings, admin, user):
+        settings.JWT_ROLE_CLAIMS = True
+        admin_client, _ = claims_client(admin)
+        user_client, _ = claims_client(user)
+        assert user_client.get('/api/v1/users/').status_code == 403
+
+        response = admin_client.patch(
+            f'/api/v1/users/{user.username}/', data={'role': 'admin'}
+        )
+        assert response.status_code == 200
+        assert user_client.get('/api/v1/users/').status_code == 401, (
+            'Проверьте, что смена роли отзывает выданные токены'
+        )
+        user.refresh_from_db()
+        user_client, token = claims_client(user)
+        assert token['role'] == 'admin'
+        assert user_client.get('/api/v1/users/').status_code == 200
+
+        response = admin_client.patch(
+            f'/api/v1/users/{user.username}/', data={'bio': 'о себе'}
+        )
+        assert response.status_code == 200
+        assert user_client.get('/api/v1/users/').status_code == 200, (
+            'Проверьте, что изменения профиля не отзывают токены'
+        )
+
+        user.delete()
+        assert user_client.get('/api/v1/users/').status_code == 401
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_reviews_with_token_user(
+            self, settings, admin_client, user, moderator):
+        settings.JWT_ROLE_CLAIMS = True
+        titles, _, _ = create_titles(admin_client)
+        user_client, _ = claims_client(user)
+        moderator_client, _ = claims_client(moderator)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+
+        response = user_client.post(url, data={'text': 'отзыв', 'score': 7})
+        assert response.status_code == 201
+        assert response.json()['author'] == user.username
+        review = Review.objects.get()
+        assert review.author == user
+        response = user_client.post(url, data={'text': 'ещё', 'score': 5})
+        assert response.status_code == 400
+
+        response = user_client.patch(
+            f'{url}{review.id}/', data={'text': 'правка'}
+        )
+        assert response.status_code == 200, (
+            'Проверьте, что автор может изменить свой отзыв по токену с ролью'
+        )
+        response = user_client.get('/api/v1/users/me/')
+        assert response.json()['username'] == user.username
+        assert moderator_client.delete(f'{url}{review.id}/').status_code == 204
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_deferred_access_fields(self, user):
+        deferred = User.objects.defer('role').get(pk=user.pk)
+        deferred.bio = 'о себе'
+        deferred.save()
+        assert User.objects.get(pk=user.pk).token_version == 0
+
+        deferred = User.objects.only('id', 'username').get(pk=user.pk)
+        deferred.role = User.ROLE_ADMIN
+        deferred.save()
+        assert deferred.token_version == 1, (
+            'Проверьте, что смена роли у загруженного с only() пользователя '
+            'отзывает токены'
+        )
+        assert User.objects.get(pk=user.pk).token_version == 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_revoked_in_other_process(self, settings, monkeypatch, user):
+        settings.JWT_ROLE_CLAIMS = True
+        user_client, _ = claims_client(user)
+        assert user_client.get('/api/v1/users/me/').status_code == 200
+        # Смена роли в другом процессе: сигналы этого процесса не
+        # срабатывают, и версия в кеше остаётся старой.
+        User.objects.filter(pk=user.pk).update(
+            token_version=F('token_version') + 1
+        )
+        monkeypatch.setattr(locmem, 'time', SimpleNamespace(
+            time=lambda: time.time() + settings.TOKEN_VERSION_CACHE_TIMEOUT
+        ))
+        assert user_client.get('/api/v1/users/me/').status_code == 401, (
+            'Проверьте, что версия токенов хранится в кеше ограниченное время'
+        )
+        monkeypatch.undo()
+
+        settings.JWT_ROLE_CLAIMS = True
+        settings.TOKEN_VERSION_CACHE_TIMEOUT = 0
+        user_client, _ = claims_client(user)
+        User.objects.filter(pk=user.pk).update(
+            token_version=F('token_version') + 1
+        )
+        assert user_client.get('/api/v1/users/me/').status_code == 401, (
+            'Проверьте, что без кеша версия читается из базы'
+        )
@@ -0,0 +1,69 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .common import create_reviews, create_titles
+
+
+def count_selects(queries, table):
+    return sum(
+        query['sql'].startswith('SELECT') and f'FROM "{table}"' in query['sql']
+        for query in queries
+    )
+
+
+class Test18NestedResources:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_review_parent_loaded_once(self, admin_client, user_client):
+        titles, _, _ = create_titles(admin_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.post(url, data={'text': 'a', 'score': 5})
+        assert response.status_code == 201
+        assert response.json()['title'] == titles[0]['name']
+        assert count_selects(context.captured_queries, 'reviews_title') == 1, (
+            'Проверьте, что произведение загружается один раз за запрос'
+        )
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.get(url)
+        assert response.status_code == 200
+        assert count_selects(context.captured_queries, 'reviews_title') == 1
+
+        response = user_client.post(
+            '/api/v1/titles/999/reviews/', data={'text': 'a', 'score': 5}
+        )
+        assert response.status_code == 404
+        response = user_client.post(
+            '/api/v1/titles/999/reviews/', data={'score': 50}
+        )
+        assert response.status_code == 404, (
+            'Проверьте, что несуществующее произведение даёт 404 раньше '
+            'проверки данных отзыва'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_comment_nesting_checked(self, admin_client, admin):
+        reviews, titles, _, _ = create_reviews(admin_client, admin)
+        review = reviews[0]
+        other_title = titles[1]
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/{review["id"]}/'
+        response = admin_client.post(f'{url}comments/', data={'text': 'a'})
+        assert response.status_code == 201
+
+        wrong_url = (
+            f'/api/v1/titles/{other_title["id"]}/reviews/{review["id"]}/'
+            f'comments/'
+        )
+        assert admin_client.get(wrong_url).status_code == 404, (
+            'Проверьте, что отзыв из другого произведения даёт 404'
+        )
+        response = admin_client.post(wrong_url, data={'text': 'a'})
+        assert response.status_code == 404
+
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.get(f'{url}comments/')
+        assert response.json()['count'] == 1
+        assert count_selects(
+            context.captured_queries, 'reviews_review'
+        ) == 1, 'Проверьте, что отзыв загружается один раз за запрос'
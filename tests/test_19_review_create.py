@@ -0,0 +1,53 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from reviews.models import Review, Title
+
+from .common import create_titles
+
+
+class Test19ReviewCreate:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_insert_first(self, admin_client, user_client):
+        titles, _, _ = create_titles(admin_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.post(url, data={'text': 'a', 'score': 4})
+        assert response.status_code == 201
+        assert not any(
+            query['sql'].startswith('SELECT')
+            and 'FROM "reviews_review"' in query['sql']
+            for query in context.captured_queries
+        ), 'Проверьте, что перед вставкой отзыва нет проверочного запроса'
+
+        response = user_client.post(url, data={'text': 'b', 'score': 10})
+        assert response.status_code == 400, (
+            'Проверьте, что повторный отзыв на произведение возвращает 400'
+        )
+        assert response.json() == {
+            'non_field_errors': [
+                'Можно оставить только один отзыв на произведение'
+            ]
+        }
+        title = Title.objects.get(pk=titles[0]['id'])
+        assert (title.rating, title.review_count) == (4, 1), (
+            'Проверьте, что отклонённый отзыв не меняет рейтинг'
+        )
+        assert Review.objects.count() == 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_concurrent_duplicate(self, admin_client, user_client, user):
+        titles, _, _ = create_titles(admin_client)
+        title = Title.objects.get(pk=titles[0]['id'])
+        # Отзыв, вставленный параллельным запросом уже после того, как
+        # этот запрос прошёл бы проверку exists().
+        Review.objects.create(title=title, author=user, text='a', score=6)
+        response = user_client.post(
+            f'/api/v1/titles/{title.id}/reviews/',
+            data={'text': 'b', 'score': 2}
+        )
+        assert response.status_code == 400
+        title.refresh_from_db()
+        assert (title.rating, title.review_count) == (6, 1)
@@ -0,0 +1,48 @@
+import pytest
+
+from api.optimizer import optimize_queryset
+from api.serializers import ReviewSerializer, TitleSerializer
+from reviews.models import Review, Title
+
+from .common import create_comments, create_titles
+
+
+class Test20QueryOptimizer:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_constant_queries_per_page(
+            self, admin_client, admin, django_assert_num_queries):
+        _, reviews, titles, _, _ = create_comments(admin_client, admin)
+        title_url = f'/api/v1/titles/{titles[0]["id"]}/'
+        urls = (
+            ('/api/v1/titles/', 4),
+            (title_url, 4),
+            (f'{title_url}reviews/', 3),
+            (f'{title_url}reviews/{reviews[0]["id"]}/comments/', 3),
+            ('/api/v1/users/', 2),
+            ('/api/v1/categories/', 3),
+            ('/api/v1/genres/', 3),
+        )
+        admin_client.get('/api/v1/users/me/')
+        for url, queries in urls:
+            with django_assert_num_queries(queries):
+                response = admin_client.get(url)
+            assert response.status_code == 200, url
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_deferred_fields(self, admin_client):
+        create_titles(admin_client)
+        title = optimize_queryset(Title.objects.all(), TitleSerializer)[0]
+        assert {'rating_sum', 'review_count', 'modified'} <= (
+            title.get_deferred_fields()
+        ), 'Проверьте, что поля вне сериализатора не загружаются'
+        assert 'category' in title._state.fields_cache, (
+            'Проверьте, что вложенная категория загружается через join'
+        )
+        assert 'genre' in title._prefetched_objects_cache
+
+        queryset = optimize_queryset(
+            Review.objects.all(), ReviewSerializer, restrict_fields=False
+        )
+        assert not queryset.query.deferred_loading[0]
+        assert set(queryset.query.select_related) == {'title', 'author'}
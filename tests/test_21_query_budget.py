@@ -0,0 +1,123 @@
+import pytest
+from django.db import transaction
+
+from api.querylog import (QueryBudgetExceeded, QueryLog, assert_max_queries,
+                          fingerprint)
+from api.views import CategoryViewSet
+from reviews.models import Category, Genre, Title
+from reviews.search import title_index
+
+from .common import create_categories, create_titles
+
+
+class Test21QueryBudget:
+
+    def test_01_fingerprint(self):
+        assert fingerprint(
+            'SELECT * FROM t WHERE id = 1 AND name = \'a\''
+        ) == fingerprint('SELECT * FROM t WHERE id = 25 AND name = \'b\'')
+        assert fingerprint(
+            'SELECT * FROM t WHERE id IN (%s, %s)'
+        ) == fingerprint('SELECT * FROM t WHERE id IN (%s, %s, %s)'), (
+            'Проверьте, что длина списка IN не меняет отпечаток запроса'
+        )
+        assert fingerprint('SELECT a FROM t') != fingerprint('SELECT b FROM t')
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_n_plus_one_detected(self, admin_client):
+        create_titles(admin_client)
+        for number in range(5):
+            Title.objects.create(
+                name=f'Произведение {number}', year=2000,
+                category=Category.objects.first()
+            )
+        with pytest.raises(AssertionError, match='N\\+1'):
+            with assert_max_queries():
+                [title.category.name for title in Title.objects.all()]
+        with assert_max_queries(1):
+            [
+                title.category.name
+                for title in Title.objects.select_related('category')
+            ]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_viewset_budget(
+            self, admin_client, client, settings, monkeypatch, caplog):
+        create_categories(admin_client)
+        monkeypatch.setattr(CategoryViewSet, 'query_budget', {'list': 1})
+        with pytest.raises(QueryBudgetExceeded, match='CategoryViewSet.list'):
+            client.get('/api/v1/categories/')
+
+        settings.QUERY_BUDGET = {**settings.QUERY_BUDGET, 'RAISE': False}
+        response = client.get('/api/v1/categories/?page=1')
+        assert response.status_code == 200, (
+            'Проверьте, что без RAISE превышение бюджета только логируется'
+        )
+        assert 'запросов при бюджете 1' in caplog.text
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_savepoints_not_counted(self):
+        with QueryLog().capture() as query_log:
+            Category.objects.count()
+        with transaction.atomic(), QueryLog().capture() as nested_log:
+            with transaction.atomic():
+                Category.objects.count()
+        assert any(
+            'SAVEPOINT' in query.sql for query in nested_log.queries
+        )
+        assert nested_log.count == query_log.count == 1, (
+            'Проверьте, что точки сохранения не входят в число запросов'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_title_write_budget(self, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        for number in range(10):
+            Genre.objects.create(
+                name=f'Жанр {number}', slug=f'genre-{number}'
+            )
+        slugs = list(Genre.objects.values_list('slug', flat=True))
+        response = admin_client.post('/api/v1/titles/', data={
+            'name': 'Много жанров', 'year': 2000, 'category': 'films',
+            'genre': slugs,
+        })
+        assert response.status_code == 201, (
+            'Проверьте, что число запросов создания произведения не зависит '
+            'от числа жанров'
+        )
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        response = admin_client.patch(url, data={
+            'name': titles[0]['name'], 'category': 'books', 'genre': slugs[5:],
+        })
+        assert response.status_code == 200
+        response = admin_client.patch(url, data={
+            'name': titles[0]['name'], 'category': 'books', 'genre': ['nope'],
+        })
+        assert response.status_code == 400
+
+    @pytest.mark.django_db(transaction=True)
+    def test_06_reindex_once_per_transaction(self, admin_client,
+                                             monkeypatch):
+        titles, _, _ = create_titles(admin_client)
+        calls = []
+        reindex = title_index.reindex
+
+        def count_reindex(ids):
+            calls.append(list(ids))
+            reindex(ids)
+
+        monkeypatch.setattr(title_index, 'reindex', count_reindex)
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        response = admin_client.patch(url, data={
+            'name': titles[0]['name'], 'category': 'books',
+            'genre': ['comedy'],
+        })
+        assert response.status_code == 200
+        assert calls == [[titles[0]['id']]], (
+            'Проверьте, что запись произведения и его жанров переиндексирует '
+            'поиск один раз, после фиксации транзакции'
+        )
+        calls.clear()
+        response = admin_client.delete('/api/v1/genres/comedy/')
+        assert response.status_code == 204
+        assert len(calls) == 1
@@ -0,0 +1,51 @@
+import logging
+import re
+
+import pytest
+
+from .common import create_comments
+
+
+def parse_server_timing(header):
+    return {
+        item.split(';')[0].strip(): item for item in header.split(',')
+    }
+
+
+class Test22ServerTiming:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_header_and_log(self, admin_client, admin, settings, caplog):
+        settings.SERVER_TIMING = True
+        _, reviews, titles, _, _ = create_comments(admin_client, admin)
+        caplog.set_level(logging.INFO, logger='api.timing')
+        response = admin_client.get('/api/v1/titles/')
+        assert response.status_code == 200
+        metrics = parse_server_timing(response['Server-Timing'])
+        assert set(metrics) == {'total', 'db', 'serialize', 'render'}, (
+            'Проверьте, что Server-Timing содержит total, db, serialize и '
+            'render'
+        )
+        assert re.search(r'dur=[\d.]+;desc="\d+ queries"', metrics['db'])
+
+        record = caplog.records[-1]
+        assert record.route == 'titles-list'
+        assert record.status == 200
+        assert record.queries >= 1
+        assert record.total_ms >= record.db_ms
+
+        url = (
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/'
+            f'comments/'
+        )
+        admin_client.get(url)
+        assert caplog.records[-1].route == 'comments-list', (
+            'Проверьте, что имя маршрута берётся из router_v1'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_disabled(self, client, settings):
+        settings.SERVER_TIMING = False
+        response = client.get('/api/v1/categories/')
+        assert response.status_code == 200
+        assert not response.has_header('Server-Timing')
@@ -0,0 +1,139 @@
+import json
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+
+from api.metrics import store
+
+from .common import create_categories
+
+
+def parse_metrics(text):
+    samples = {}
+    for line in text.splitlines():
+        if line.startswith('#'):
+            continue
+        name, value = line.rsplit(' ', 1)
+        samples[name] = float(value)
+    return samples
+
+
+class Test23Metrics:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_metrics_endpoint(self, client, admin_client, metrics_dir):
+        create_categories(admin_client)
+        client.get('/api/v1/categories/')
+        client.get('/api/v1/categories/')
+        client.get('/api/v1/titles/999/')
+
+        response = admin_client.get('/metrics')
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('text/plain; version=0.0.4')
+        text = response.content.decode()
+        samples = parse_metrics(text)
+        key = (
+            'yamdb_http_requests_total{method="GET",'
+            'route="categories-list",status="200"}'
+        )
+        assert samples[key] == 2, (
+            'Проверьте, что запросы считаются по маршрутам router_v1'
+        )
+        assert samples[
+            'yamdb_http_requests_total{method="GET",'
+            'route="titles-detail",status="404"}'
+        ] == 1
+        histogram = (
+            'yamdb_http_request_duration_seconds_count'
+            '{method="GET",route="categories-list"}'
+        )
+        assert samples[histogram] == 2
+        assert samples[
+            'yamdb_http_request_duration_seconds_bucket'
+            '{method="GET",route="categories-list",le="+Inf"}'
+        ] == 2
+        assert samples['yamdb_db_queries_total{route="categories-list"}'] > 0
+        assert samples[
+            'yamdb_cache_events_total{cache="list",event="hit"}'
+        ] == 1, 'Проверьте, что в метриках есть счётчики кеша'
+        assert re.search(r'# TYPE yamdb_http_errors_total counter', text)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_multiprocess_aggregation(self, client, admin_client,
+                                         metrics_dir):
+        client.get('/api/v1/categories/')
+        store.flush()
+        # Файл другого процесса WSGI-сервера.
+        with open(os.path.join(metrics_dir, '1-1.json'), 'w') as file:
+            json.dump({
+                'counters': [[
+                    'yamdb_http_requests_total',
+                    [['method', 'GET'], ['route', 'categories-list'],
+                     ['status', '200']],
+                    5
+                ]],
+                'histograms': [],
+            }, file)
+        samples = parse_metrics(
+            admin_client.get('/metrics').content.decode()
+        )
+        assert samples[
+            'yamdb_http_requests_total{method="GET",'
+            'route="categories-list",status="200"}'
+        ] == 6, 'Проверьте, что метрики процессов складываются'
+
+        store._pid = -1
+        store.inc('yamdb_http_errors_total', {'route': 'x', 'method': 'GET'})
+        files = [name for name in os.listdir(metrics_dir) if '.json' in name]
+        assert len(files) == 2
+        store.flush()
+        files = [name for name in os.listdir(metrics_dir) if '.json' in name]
+        assert len(files) == 3, (
+            'Проверьте, что после fork процесс пишет метрики в свой файл'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_access(self, client, user_client, admin_client, settings):
+        assert client.get('/metrics').status_code == 403, (
+            'Проверьте, что /metrics недоступен анонимным пользователям'
+        )
+        assert user_client.get('/metrics').status_code == 403
+        assert admin_client.get('/metrics').status_code == 200
+
+        settings.METRICS = {**settings.METRICS, 'TOKEN': 'secret'}
+        response = client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        assert response.status_code == 200, (
+            'Проверьте, что /metrics доступен по токену METRICS_TOKEN'
+        )
+        response = client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong')
+        assert response.status_code == 403
+
+        settings.METRICS = {**settings.METRICS, 'ALLOWED_IPS': ('127.0.0.1',)}
+        assert client.get('/metrics').status_code == 200, (
+            'Проверьте, что /metrics доступен адресам METRICS_ALLOWED_IPS'
+        )
+
+    def test_04_dead_process_files(self, metrics_dir):
+        process = subprocess.Popen([sys.executable, '-c', ''])
+        process.wait()
+        os.makedirs(metrics_dir)
+        with open(os.path.join(metrics_dir, f'{process.pid}-1.json'),
+                  'w') as file:
+            json.dump({
+                'counters': [['yamdb_http_errors_total', [['route', 'x']], 5]],
+                'histograms': [],
+            }, file)
+        key = ('yamdb_http_errors_total', (('route', 'x'),))
+        store.inc('yamdb_http_errors_total', {'route': 'x'})
+        for _ in range(2):
+            counters, _ = store.collect()
+            assert counters[key] == 6, (
+                'Проверьте, что метрики завершённых процессов не теряются '
+                'и не складываются дважды'
+            )
+        assert f'{process.pid}-1.json' not in os.listdir(metrics_dir), (
+            'Проверьте, что файлы завершённых процессов удаляются'
+        )
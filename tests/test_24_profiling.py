@@ -0,0 +1,100 @@
+import os
+import subprocess
+import sys
+import time
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from api.profiling import get_profiles, save_profile
+from api.views import CategoryViewSet
+
+
+@pytest.fixture
+def profiling(settings, tmp_path):
+    settings.PROFILING = {
+        **settings.PROFILING, 'ENABLED': True, 'SAMPLE_RATE': 0,
+        'SLOW_THRESHOLD': None, 'SAMPLER_INTERVAL': 0.001, 'KEEP': 2,
+        'DIR': str(tmp_path / 'profiles'),
+    }
+    return settings.PROFILING
+
+
+class Test24Profiling:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_sampled_cprofile(self, client, profiling, settings):
+        profiling['SAMPLE_RATE'] = 1
+        for _ in range(3):
+            assert client.get('/api/v1/categories/').status_code == 200
+        profiles = get_profiles()
+        assert list(profiles) == ['categories-list']
+        assert len(profiles['categories-list']) == 2, (
+            'Проверьте, что для маршрута хранится KEEP самых медленных '
+            'профилей'
+        )
+        profile = profiles['categories-list'][0]
+        assert profile['kind'] == 'cprofile'
+        assert profile['status'] == 200
+        own = [frame['own'] for frame in profile['frames']]
+        assert own and own == sorted(own, reverse=True), (
+            'Проверьте, что функции профиля упорядочены по собственному '
+            'времени'
+        )
+        assert all(frame['calls'] >= 1 for frame in profile['frames'])
+        durations = [item['duration'] for item in profiles['categories-list']]
+        assert durations == sorted(durations, reverse=True)
+
+        out = StringIO()
+        call_command('profile_report', stdout=out)
+        assert 'categories-list' in out.getvalue()
+        # Команду запускают отдельным процессом.
+        report = subprocess.run(
+            [sys.executable, 'manage.py', 'profile_report'],
+            cwd=settings.BASE_DIR, capture_output=True, check=True,
+            env={
+                **os.environ, 'SECRET_KEY': settings.SECRET_KEY,
+                'PROFILING_DIR': profiling['DIR'],
+            },
+        )
+        assert 'categories-list' in report.stdout.decode(), (
+            'Проверьте, что профили видны из другого процесса'
+        )
+        call_command('profile_report', '--clear', stdout=StringIO())
+        assert get_profiles() == {}
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_slow_request_stacks(self, client, profiling, monkeypatch):
+        profiling['SLOW_THRESHOLD'] = 0.05
+        assert client.get('/api/v1/categories/').status_code == 200
+        assert get_profiles() == {}, (
+            'Проверьте, что быстрые запросы не сохраняются'
+        )
+
+        list_view = CategoryViewSet.list
+
+        def slow_list(self, request, *args, **kwargs):
+            time.sleep(0.1)
+            return list_view(self, request, *args, **kwargs)
+
+        monkeypatch.setattr(CategoryViewSet, 'list', slow_list)
+        assert client.get('/api/v1/categories/').status_code == 200
+        profile = get_profiles()['categories-list'][0]
+        assert profile['kind'] == 'sampler'
+        assert profile['duration'] >= 0.1
+        assert profile['samples'] > 0
+        assert 'slow_list' in profile['frames'][0]['function'], (
+            'Проверьте, что снимки стеков показывают, где запрос провёл '
+            'время'
+        )
+
+    def test_03_old_profiles_expire(self, profiling):
+        profile = {
+            'route': 'titles-list', 'duration': 1.0, 'frames': [],
+            'captured': time.time() - profiling['TIMEOUT'] - 1,
+        }
+        save_profile('titles-list', profile)
+        assert get_profiles() == {}, (
+            'Проверьте, что профили старше TIMEOUT не показываются'
+        )
@@ -0,0 +1,54 @@
+import logging
+import os
+
+import pytest
+
+from api import slowlog
+
+from .common import create_titles
+
+
+class Test25SlowQueries:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_slow_query_log(self, admin_client, settings, caplog):
+        create_titles(admin_client)
+        settings.SLOW_QUERY = {**settings.SLOW_QUERY, 'THRESHOLD': 0}
+        slowlog._plans.clear()
+        caplog.set_level(logging.WARNING, logger='api.slowlog')
+        response = admin_client.get('/api/v1/titles/?name=поезд')
+        assert response.status_code == 200
+
+        records = [
+            record for record in caplog.records if record.name == 'api.slowlog'
+        ]
+        assert records, 'Проверьте, что медленные запросы пишутся в лог'
+        assert {record.view for record in records} == {'TitleViewSet.list'}
+        record = next(
+            record for record in records
+            if 'LIKE' in record.sql and 'reviews_title' in record.sql
+        )
+        assert '<str>' in record.params, (
+            'Проверьте, что строковые параметры скрыты в логе'
+        )
+        assert 'поезд' not in record.getMessage()
+        assert record.frame.startswith('api' + os.sep), (
+            'Проверьте, что в логе указано место вызова в коде проекта'
+        )
+        assert record.duration_ms >= 0
+        assert 'reviews_title' in record.plan, (
+            'Проверьте, что для медленного запроса выполняется EXPLAIN'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_threshold(self, admin_client, settings, caplog):
+        create_titles(admin_client)
+        settings.SLOW_QUERY = {**settings.SLOW_QUERY, 'THRESHOLD': 10}
+        caplog.set_level(logging.WARNING, logger='api.slowlog')
+        admin_client.get('/api/v1/titles/')
+        assert not [
+            record for record in caplog.records if record.name == 'api.slowlog'
+        ]
+        assert slowlog.redact({'email': 'a@b.c', 'id': 1}) == {
+            'email': '<str>', 'id': 1
+        }
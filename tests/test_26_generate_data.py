@@ -0,0 +1,65 @@
+import csv
+import filecmp
+from collections import Counter
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from reviews.models import Comment, Review, Title
+
+OPTIONS = {
+    'users': 40, 'titles': 30, 'reviews': 300, 'comments': 150,
+    'categories': 3, 'genres': 5, 'seed': 7,
+}
+
+
+def read_rows(directory, file_name):
+    with open(directory / file_name, encoding='utf-8', newline='') as file:
+        return list(csv.DictReader(file))
+
+
+class Test26GenerateData:
+
+    def test_01_deterministic_files(self, tmp_path):
+        first, second = tmp_path / 'first', tmp_path / 'second'
+        call_command('generate_data', path=str(first), stdout=StringIO(),
+                     **OPTIONS)
+        call_command('generate_data', path=str(second), stdout=StringIO(),
+                     **OPTIONS)
+        names = sorted(path.name for path in first.iterdir())
+        assert names == [
+            'category.csv', 'comments.csv', 'genre.csv', 'genre_title.csv',
+            'review.csv', 'titles.csv', 'users.csv',
+        ]
+        _, mismatch, errors = filecmp.cmpfiles(
+            first, second, names, shallow=False
+        )
+        assert not mismatch and not errors, (
+            'Проверьте, что одно зерно даёт одинаковые данные'
+        )
+
+        reviews = read_rows(first, 'review.csv')
+        assert len(reviews) == OPTIONS['reviews']
+        pairs = {(row['author'], row['title_id']) for row in reviews}
+        assert len(pairs) == len(reviews), (
+            'Проверьте, что пары автор-произведение в отзывах не повторяются'
+        )
+        per_title = Counter(row['title_id'] for row in reviews)
+        mean = OPTIONS['reviews'] / OPTIONS['titles']
+        assert max(per_title.values()) > 3 * mean, (
+            'Проверьте, что число отзывов на произведение распределено '
+            'неравномерно'
+        )
+        assert max(per_title.values()) <= OPTIONS['users']
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_load(self, tmp_path):
+        call_command('generate_data', path=str(tmp_path), load=True,
+                     stdout=StringIO(), **OPTIONS)
+        assert Title.objects.count() == OPTIONS['titles']
+        assert Review.objects.count() == OPTIONS['reviews']
+        assert Comment.objects.count() == len(
+            read_rows(tmp_path, 'comments.csv')
+        )
+        call_command('rebuild_ratings', '--check', stdout=StringIO())
@@ -0,0 +1,82 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+
+from reviews.models import Review, Title
+
+ROUTES = {
+    'titles-list', 'titles-filter', 'titles-search', 'titles-detail',
+    'titles-autocomplete', 'titles-create', 'categories-list',
+    'categories-create', 'categories-delete', 'genres-list', 'genres-create',
+    'genres-delete', 'reviews-list', 'reviews-detail', 'reviews-create',
+    'comments-list', 'comments-detail', 'comments-create', 'users-list',
+    'users-detail', 'users-me', 'users-create', 'auth-signup', 'auth-token',
+}
+OPTIONS = {
+    'generate': True, 'users': 20, 'titles': 5, 'reviews': 30,
+    'comments': 30, 'requests': 3, 'warmup': 1, 'alloc_requests': 1,
+}
+
+
+class Test27BenchmarkApi:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_baseline(self, tmp_path):
+        baseline = tmp_path / 'baseline.json'
+        call_command('benchmark_api', output=str(baseline),
+                     stdout=StringIO(), **OPTIONS)
+        routes = json.loads(baseline.read_text())['routes']
+        assert set(routes) == ROUTES, (
+            'Проверьте, что замеряются все маршруты API'
+        )
+        for result in routes.values():
+            assert result['requests'] == OPTIONS['requests']
+            assert result['p50'] <= result['p95'] <= result['p99']
+            assert result['alloc_kb'] > 0
+        assert routes['titles-list']['queries'] >= 1
+        assert not Title.objects.exists() and not Review.objects.exists(), (
+            'Проверьте, что данные замера не остаются в базе'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_compare(self, tmp_path):
+        baseline = tmp_path / 'baseline.json'
+        routes = {
+            'titles-list': {
+                'p50': 1e6, 'p95': 1e6, 'alloc_kb': 1e6, 'queries': 100,
+            },
+        }
+        baseline.write_text(json.dumps({'routes': routes}))
+        options = {**OPTIONS, 'routes': ['titles-list']}
+        out = StringIO()
+        call_command('benchmark_api', compare=str(baseline), stdout=out,
+                     **options)
+        assert 'Регрессий нет' in out.getvalue()
+
+        routes['titles-list']['queries'] = 0
+        baseline.write_text(json.dumps({'routes': routes}))
+        with pytest.raises(CommandError, match='titles-list: запросов'):
+            call_command('benchmark_api', compare=str(baseline),
+                         stdout=StringIO(), **options)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_on_commit_and_cache(self):
+        options = {
+            **OPTIONS, 'routes': ['titles-list', 'auth-signup'],
+            'alloc_requests': 0,
+        }
+        call_command('benchmark_api', stdout=StringIO(), **options)
+        assert len(mail.outbox) == OPTIONS['warmup'] + OPTIONS['requests'], (
+            'Проверьте, что обработчики on_commit выполняются после каждого '
+            'запроса замера'
+        )
+        assert not any('api:list' in key for key in cache._cache), (
+            'Проверьте, что ответы замера не остаются в кеше сервера'
+        )
+        with pytest.raises(CommandError, match='--requests'):
+            call_command('benchmark_api', stdout=StringIO(),
+                         **{**options, 'requests': 0})
@@ -0,0 +1,58 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from rest_framework.renderers import JSONRenderer
+
+from api.fast_serializers import get_fast_serializer
+from api.optimizer import optimize_queryset
+from api.serializers import (CategorySerializer, CommentSerializer,
+                             GenreSerializer, ReviewSerializer,
+                             TitleSerializer, UserSerializer)
+from reviews.models import Category, Comment, Genre, Review, Title
+
+from .common import create_comments
+
+SERIALIZERS = (
+    (Title, TitleSerializer),
+    (Review, ReviewSerializer),
+    (Comment, CommentSerializer),
+    (Category, CategorySerializer),
+    (Genre, GenreSerializer),
+)
+
+
+class Test28FastSerializers:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_identical_json(self, admin_client, admin,
+                               django_user_model):
+        create_comments(admin_client, admin)
+        Title.objects.create(name='Без категории и жанров', year=1999)
+        Title.objects.filter(pk=Title.objects.first().pk).update(rating=7.6)
+        renderer = JSONRenderer()
+        for model, serializer_class in SERIALIZERS + (
+            (django_user_model, UserSerializer),
+        ):
+            queryset = model.objects.order_by('pk')
+            expected = renderer.render(serializer_class(
+                optimize_queryset(queryset, serializer_class), many=True
+            ).data)
+            fast = get_fast_serializer(serializer_class)
+            assert renderer.render(fast.serialize(queryset)) == expected, (
+                f'Проверьте, что быстрый {serializer_class.__name__} даёт '
+                f'тот же JSON'
+            )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_benchmark_command(self, admin_client, admin):
+        create_comments(admin_client, admin)
+        out = StringIO()
+        call_command('benchmark_serializers', rows=5, repeat=2, stdout=out)
+        output = out.getvalue()
+        for name in ('TitleSerializer', 'TitleWriteSerializer',
+                     'CreateTokenSerializer', 'UserSerializerReadOnly'):
+            assert name in output, (
+                f'Проверьте, что замеряется {name}'
+            )
+        assert 'не совпадает' not in output
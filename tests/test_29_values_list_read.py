@@ -0,0 +1,85 @@
+from contextlib import contextmanager
+
+import pytest
+from django.core.cache import cache
+from django.db.models.signals import post_init
+
+from reviews.models import Category, Comment, Genre, Review, Title
+
+from .common import create_comments
+
+ROW_MODELS = (Category, Comment, Genre, Review, Title)
+
+
+@contextmanager
+def count_instances():
+    counts = {}
+
+    def receiver(sender, **kwargs):
+        if sender in ROW_MODELS:
+            counts[sender] = counts.get(sender, 0) + 1
+
+    post_init.connect(receiver)
+    try:
+        yield counts
+    finally:
+        post_init.disconnect(receiver)
+
+
+class Test29ValuesListRead:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_same_responses(self, admin_client, admin, settings):
+        _, reviews, titles, _, _ = create_comments(admin_client, admin)
+        Title.objects.create(name='Без категории', year=1999)
+        title_id, review_id = titles[0]['id'], reviews[0]['id']
+        urls = (
+            '/api/v1/titles/',
+            '/api/v1/titles/?genre=comedy&page=1',
+            '/api/v1/titles/?search=поворот',
+            f'/api/v1/titles/{title_id}/reviews/',
+            f'/api/v1/titles/{title_id}/reviews/?pagination=keyset'
+            f'&page_size=2',
+            f'/api/v1/titles/{title_id}/reviews/{review_id}/comments/',
+            '/api/v1/categories/',
+            '/api/v1/genres/?search=драма',
+        )
+        for url in urls:
+            settings.VALUES_LIST_READ = False
+            expected = admin_client.get(url)
+            settings.VALUES_LIST_READ = True
+            # Списки категорий и жанров иначе отдаются из кеша.
+            cache.clear()
+            response = admin_client.get(url)
+            assert response.status_code == expected.status_code == 200
+            assert response.content == expected.content, (
+                f'Проверьте, что {url} отдаёт тот же JSON без моделей'
+            )
+
+        keyset = admin_client.get(
+            f'/api/v1/titles/{title_id}/reviews/?pagination=keyset'
+            f'&page_size=2'
+        ).json()
+        next_page = admin_client.get(keyset['next']).json()
+        assert len(keyset['results']) == 2
+        assert len(next_page['results']) == 1, (
+            'Проверьте курсорную пагинацию по строкам values_list'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_no_model_instances(self, admin_client, admin):
+        _, reviews, titles, _, _ = create_comments(admin_client, admin)
+        title_id, review_id = titles[0]['id'], reviews[0]['id']
+        with count_instances() as counts:
+            assert admin_client.get('/api/v1/titles/').status_code == 200
+            assert admin_client.get('/api/v1/genres/').status_code == 200
+        assert counts == {}, (
+            'Проверьте, что list не создаёт экземпляры моделей'
+        )
+        with count_instances() as counts:
+            admin_client.get(f'/api/v1/titles/{title_id}/reviews/')
+            admin_client.get(
+                f'/api/v1/titles/{title_id}/reviews/{review_id}/comments/'
+            )
+        # Загружаются только родительские объекты из URL.
+        assert counts == {Title: 1, Review: 1}